@@ -1,4 +1,7 @@
-from flask import Flask, request, jsonify, render_template_string, send_file, make_response
+import time
+_INICIO_BOOT = time.perf_counter()  # Orçamento de boot (medir_boot)
+
+from flask import Flask, request, jsonify, render_template_string, send_file, make_response, g
 from flask import render_template
 from flask_cors import CORS
 import math
@@ -7,22 +10,107 @@ import os
 import io
 import json
 import base64
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.platypus.flowables import PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
 import numpy as np
 import pytz  # Para timezone São Paulo
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections.abc import Sequence
+from functools import cached_property, lru_cache
+import atexit
+import click
+import contextvars
+import copy
+import gzip
+import hashlib
+import logging
+import logging.handlers
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import uuid
+import zlib
 
 app = Flask(__name__)
 CORS(app)
 
+# ================ LOGGING ================
+# Nível padrão via CIMO_LOG_LEVEL (WARNING se ausente). Uma requisição com
+# ?debug=1 ou o header X-Cimo-Debug: 1 recebe os traces DEBUG só para ela.
+LOG_FORMATO = '%(asctime)s %(levelname)s [%(threadName)s] %(message)s'
+LOG_NIVEL_PADRAO = 'WARNING'
+
+_diagnostico_requisicao = contextvars.ContextVar('diagnostico_requisicao', default=False)
+
+
+class LoggerCimo(logging.Logger):
+    """Logger que libera o DEBUG quando a requisição atual pediu diagnóstico"""
+    
+    def isEnabledFor(self, level):
+        return _diagnostico_requisicao.get() or super().isEnabledFor(level)
+
+
+def configurar_logging(nivel=None):
+    """
+    Configura o logger 'cimo' com handler em fila (não bloqueante)
+    
+    As chamadas de log apenas enfileiram o registro; um QueueListener em
+    thread própria escreve no stderr, fora do caminho da requisição.
+    
+    Args:
+        nivel (str): Nível do logger (padrão: CIMO_LOG_LEVEL ou WARNING)
+    
+    Returns:
+        logging.Logger: Logger da aplicação
+    """
+    global _log_listener
+    
+    classe_anterior = logging.getLoggerClass()
+    logging.setLoggerClass(LoggerCimo)
+    try:
+        cimo_logger = logging.getLogger('cimo')
+    finally:
+        logging.setLoggerClass(classe_anterior)
+    
+    cimo_logger.setLevel((nivel or os.environ.get('CIMO_LOG_LEVEL', LOG_NIVEL_PADRAO)).upper())
+    cimo_logger.propagate = False
+    
+    if _log_listener is not None:
+        _log_listener.stop()
+    for handler in list(cimo_logger.handlers):
+        cimo_logger.removeHandler(handler)
+    
+    fila = queue.SimpleQueue()
+    saida = logging.StreamHandler()
+    saida.setFormatter(logging.Formatter(LOG_FORMATO))
+    
+    cimo_logger.addHandler(logging.handlers.QueueHandler(fila))
+    _log_listener = logging.handlers.QueueListener(fila, saida)
+    _log_listener.start()
+    
+    return cimo_logger
+
+
+def _encerrar_logging():
+    """Esvazia a fila de log no encerramento do processo"""
+    if _log_listener is not None:
+        _log_listener.stop()
+
+
+def _reiniciar_logging_apos_fork():
+    """Workers criados por fork (gunicorn --preload) não herdam a thread do listener"""
+    global _log_listener
+    _log_listener = None
+    configurar_logging(logging.getLevelName(logger.level))
+
+
+_log_listener = None
+logger = configurar_logging()
+atexit.register(_encerrar_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_logging_apos_fork)
+
 #================ CONSTANTES E CONFIGURAÇÕES CORRIGIDAS ================
 PATRIMONIO = 65_000_000  # R$ 65 milhões LÍQUIDOS (conforme case)
 IDADE_ANA = 53           # Idade atual de Ana
@@ -40,6 +128,24 @@ EXPECTATIVA_ANA_DEFAULT = 90    # Expectativa base para Ana
 EXPECTATIVA_FILHOS = 85         # Expectativa conservadora dos filhos
 IDADE_ESTIMADA_FILHOS = 30     # Filhos já adultos e formados
 
+# Constantes que mudam de uma família para outra (carteira multi-cliente).
+# O motor de compromissos e projeção as recebe explicitamente (`cliente`);
+# CLIENTE_PADRAO é o case de Ana, montado com as constantes acima.
+ConstantesCliente = namedtuple('ConstantesCliente', (
+    'patrimonio', 'idade', 'despesas', 'renda_filhos', 'doacoes',
+    'periodo_doacoes', 'idade_filhos', 'expectativa_filhos'
+))
+CLIENTE_PADRAO = ConstantesCliente(
+    patrimonio=PATRIMONIO,
+    idade=IDADE_ANA,
+    despesas=DESPESAS_BASE,
+    renda_filhos=RENDA_FILHOS,
+    doacoes=DOACOES,
+    periodo_doacoes=PERIODO_DOACOES,
+    idade_filhos=IDADE_ESTIMADA_FILHOS,
+    expectativa_filhos=EXPECTATIVA_FILHOS
+)
+
 # Timezone para relatórios
 SAO_PAULO_TZ = pytz.timezone('America/Sao_Paulo')
 
@@ -54,6 +160,10 @@ FASES_LIQUIDEZ = {
     'liquidez_final': 15     # Fase final antes da compra
 }
 
+# Nome de cada fase pelo id usado no cronograma compilado (1, 2, 3)
+NOMES_FASES_LIQUIDEZ = (None, 'fase1', 'fase2', 'fase3')
+NOMES_FASES_LIQUIDEZ_NP = np.array(NOMES_FASES_LIQUIDEZ, dtype=object)
+
 
 
 # ================ ESTRUTURA DE ASSET ALLOCATION ================
@@ -100,6 +210,139 @@ STATUS_THRESHOLDS = {
     'viavel_minimo': 15           # >= 15% do patrimônio = viável
 }
 
+# ================ PARÂMETROS DA ANÁLISE DE SENSIBILIDADE ================
+SENSIBILIDADE_CONFIG = {
+    'passos': 50,              # Pontos por eixo (grade 50×50)
+    'passos_max': 200,         # Limite por eixo por requisição
+    'taxa_min': 0.1,           # Limites de validar_inputs
+    'taxa_max': 15.0,
+    'despesas_min': 50_000,
+    'despesas_max': 1_000_000
+}
+
+# ================ PARÂMETROS DO SOLVER DE METAS ================
+SOLVER_CONFIG = {
+    'tolerancia_reais': 1.0,     # Precisão na fazenda disponível (R$)
+    'iteracoes_max': 50,
+    'passo_derivada': 1e-6       # Passo da diferença finita na taxa (p.p.)
+}
+
+# ================ CACHE DE COMPROMISSOS ================
+CACHE_CONFIG = {
+    'compromissos_max': 512,   # Combinações de parâmetros mantidas em memória (LRU)
+    'casas_taxa': 4,           # Arredondamento da taxa na chave do cache
+    'casas_valores': 2,        # Arredondamento de despesas/custo da fazenda (centavos)
+    'nos_vp_max': 1024         # Entradas por nó de VP (grafo incremental dos compromissos)
+}
+
+# PDFs gerados ficam em disco (CIMO_PDF_CACHE_DIR) até o limite de tamanho ou de idade
+PDF_CACHE_CONFIG = {
+    'diretorio': os.environ.get('CIMO_PDF_CACHE_DIR',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache_relatorios')),
+    'tamanho_max_mb': 100,
+    'idade_max_horas': 24   # PDF mais antigo que isso é gerado de novo (data do relatório em dia)
+}
+
+# Cache L2 compartilhado pelos workers (SQLite em modo WAL no disco local).
+# Opcional: só liga com CIMO_CACHE_COMPARTILHADO=/caminho/arquivo.sqlite3;
+# sem ela cada worker fica só com o LRU em memória
+L2_CACHE_CONFIG = {
+    'arquivo': os.environ.get('CIMO_CACHE_COMPARTILHADO', ''),
+    'ttl_segundos': 6 * 3600,            # Validade de um resultado
+    'tamanho_max_mb': 64,                # Acima disso saem os usados há mais tempo
+    'publicar_estatisticas_segundos': 5  # Intervalo de publicação dos contadores de cada worker
+}
+
+# ================ CONFIGURAÇÃO HTTP ================
+# Versão dos modelos de cálculo: entra no ETag, então mudar qualquer fórmula
+# exige incrementá-la para invalidar os caches dos navegadores
+VERSAO_MODELO = '4.4-MOTOR-MENSAL'
+
+HTTP_CONFIG = {
+    'compressao_min_bytes': 1024,                          # Abaixo disso não compensa comprimir
+    'compressao_nivel': 6,
+    'tipos_comprimidos': ('application/json', 'application/pdf'),
+    'parametros_ignorados': ('debug',),                    # Não mudam o resultado
+    'parametros_decimais': ('taxa', 'despesas', 'custo_fazenda'),  # float(): 4 == 4.0
+    'batch_max_cenarios': 500                              # POST /api/dados/batch
+}
+
+# Endpoints cujo resultado é função pura da query string (recebem ETag)
+ENDPOINTS_CONDICIONAIS = frozenset({
+    'api_dados_v43', 'projecoes_detalhadas', 'preview_relatorio', 'gerar_relatorio_api',
+    'api_sensibilidade', 'api_stress_tests', 'api_periodos_compra_fazenda',
+    'api_solver_metas', 'api_timing_renda_filhos', 'api_varredura'
+})
+
+# ================ CENÁRIOS DE STRESS TEST ================
+STRESS_TEST_CENARIOS = {
+    'crise_financeira': {
+        'descricao': 'Crise financeira severa (-{queda_patrimonio}% patrimônio no ano {ano_choque})',
+        'queda_patrimonio': 30,   # % do patrimônio perdido
+        'ano_choque': 1
+    },
+    'inflacao_alta': {
+        'descricao': 'Inflação alta persistente (+{inflacao_excedente} p.p. a.a. sobre as saídas)',
+        'inflacao_excedente': 2.0  # Crescimento real extra das saídas, % a.a.
+    },
+    'longevidade_extrema': {
+        'descricao': 'Longevidade extrema ({expectativa} anos)',
+        'expectativa': 100        # Piso; nunca abaixo da expectativa do cenário base
+    },
+    'mudanca_regime': {
+        'descricao': 'Mudança de regime de juros (-{reducao_taxa} p.p. a partir do ano {ano_choque})',
+        'reducao_taxa': 1.5,      # Queda da taxa real, p.p.
+        'ano_choque': 10
+    }
+}
+
+# ================ PARÂMETROS DA SIMULAÇÃO MONTE CARLO ================
+MONTE_CARLO_CONFIG = {
+    'caminhos_padrao': 10_000,    # Trajetórias por simulação
+    'caminhos_max': 100_000,      # Limite por requisição
+    'caminhos_relatorio': 5_000,  # Versão reduzida usada nos relatórios
+    'lote': 25_000,               # Caminhos por matriz (limita memória)
+    'percentis': [5, 10, 25, 50, 75, 90, 95],
+    'faixas_histograma': 20,
+    'lote_inicial_progresso': 1_000,  # Primeiro lote do stream SSE (os seguintes dobram)
+    'z_confianca': 1.96               # IC de 95% da probabilidade de sucesso
+}
+
+# ================ PARÂMETROS DA VARREDURA (NDJSON) ================
+VARREDURA_CONFIG = {
+    'bloco': 4096,                # Linhas calculadas (e enviadas) por vez
+    'linhas_max': 2_000_000,      # Tamanho máximo da grade por requisição
+    'passos_max': 1000            # Pontos de um eixo no formato inicio:fim:passos
+}
+
+# ================ ORÇAMENTO DE BOOT ================
+# reportlab e matplotlib só são importados no primeiro relatório/gráfico;
+# CIMO_PRECARREGAR_RELATORIOS=1 carrega no boot (worker dedicado a relatórios)
+BOOT_CONFIG = {
+    'orcamento_ms': float(os.environ.get('CIMO_BOOT_ORCAMENTO_MS', 1000)),
+    'precarregar_relatorios': os.environ.get('CIMO_PRECARREGAR_RELATORIOS') == '1'
+}
+
+# ================ PARÂMETROS DA FILA DE RELATÓRIOS ================
+# Estado dos jobs e PDFs prontos em SQLite, visível a todos os workers do gunicorn
+JOBS_CONFIG = {
+    'banco': os.environ.get('CIMO_JOBS_DB', os.path.join(PDF_CACHE_CONFIG['diretorio'], 'jobs.sqlite3')),
+    'workers': 2,                  # PDFs gerados em paralelo (fora das threads de requisição)
+    'fila_max': 32,                # Jobs aguardando/em execução antes de recusar (503)
+    'jobs_max': 256,               # Jobs concluídos mantidos para consulta/download
+    'expiracao_segundos': 3600     # Tempo que um job concluído fica disponível
+}
+
+# ================ PARÂMETROS DA CARTEIRA MULTI-CLIENTE ================
+# Cadastro das famílias em SQLite; o lote noturno roda com
+# `flask --app app avaliar-clientes` (cron) em um ProcessPoolExecutor
+CLIENTES_CONFIG = {
+    'banco': os.environ.get('CIMO_CLIENTES_DB',
+                            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'clientes.sqlite3')),
+    'workers': int(os.environ.get('CIMO_LOTE_WORKERS', os.cpu_count() or 1)),
+    'historico': 30                # Avaliações por cliente devolvidas pela API
+}
+
 # ================ SISTEMA DE RELATÓRIOS DETALHADOS ================
 
 # ================ VERSÃO EMERGENCY SAFE DA CLASSE ================
@@ -119,7 +362,7 @@ class RelatorioGenerator:
             self.percentual_fazenda = self.dados.get('percentual_fazenda', 0)
             
         except Exception as e:
-            print(f"⚠️ Erro na inicialização RelatorioGenerator: {e}")
+            logger.warning(f"⚠️ Erro na inicialização RelatorioGenerator: {e}")
             # Inicialização mínima de emergência
             self.params = parametros_usuario or {
                 'taxa': 4.0, 'expectativa': 90, 'despesas': 150000,
@@ -142,7 +385,7 @@ class RelatorioGenerator:
                 'cenarios_rapidos': self._gerar_cenarios_rapidos_safe()
             }
         except Exception as e:
-            print(f"⚠️ Erro em gerar_dados_executivo: {e}")
+            logger.warning(f"⚠️ Erro em gerar_dados_executivo: {e}")
             return self._dados_executivo_fallback()
     
     def gerar_dados_tecnico(self):
@@ -157,7 +400,7 @@ class RelatorioGenerator:
                 'asset_allocation_detalhado': self._analisar_asset_allocation_safe()
             }
         except Exception as e:
-            print(f"⚠️ Erro em gerar_dados_tecnico: {e}")
+            logger.warning(f"⚠️ Erro em gerar_dados_tecnico: {e}")
             return self._dados_tecnico_fallback()
     
     def gerar_dados_simulacao(self):
@@ -171,7 +414,7 @@ class RelatorioGenerator:
                 'monte_carlo_basico': self._simular_monte_carlo_safe()
             }
         except Exception as e:
-            print(f"⚠️ Erro em gerar_dados_simulacao: {e}")
+            logger.warning(f"⚠️ Erro em gerar_dados_simulacao: {e}")
             return self._dados_simulacao_fallback()
     
     # ================ MÉTODOS SAFE (SEMPRE FUNCIONAM) ================
@@ -202,7 +445,7 @@ class RelatorioGenerator:
             return insights
             
         except Exception as e:
-            print(f"⚠️ Erro em _gerar_insights_safe: {e}")
+            logger.warning(f"⚠️ Erro em _gerar_insights_safe: {e}")
             return ["📊 Análise de insights em processamento", "💡 Recomendações baseadas nos parâmetros configurados"]
     
     def _gerar_recomendacoes_safe(self):
@@ -227,7 +470,7 @@ class RelatorioGenerator:
             return recomendacoes
             
         except Exception as e:
-            print(f"⚠️ Erro em _gerar_recomendacoes_safe: {e}")
+            logger.warning(f"⚠️ Erro em _gerar_recomendacoes_safe: {e}")
             return ["📋 Manter monitoramento contínuo do plano", "🎯 Revisar periodicamente conforme mudanças"]
     
     def _gerar_status_textual_safe(self):
@@ -258,7 +501,7 @@ class RelatorioGenerator:
                     'acao_requerida': 'Monitoramento regular'
                 }
         except Exception as e:
-            print(f"⚠️ Erro em _gerar_status_textual_safe: {e}")
+            logger.warning(f"⚠️ Erro em _gerar_status_textual_safe: {e}")
             return {
                 'status': 'EM ANÁLISE',
                 'cor': '#6b7280',
@@ -293,7 +536,7 @@ class RelatorioGenerator:
             return marcos
             
         except Exception as e:
-            print(f"⚠️ Erro em _calcular_marcos_safe: {e}")
+            logger.warning(f"⚠️ Erro em _calcular_marcos_safe: {e}")
             return [{
                 'ano': 2026,
                 'idade_ana': 54,
@@ -336,7 +579,7 @@ class RelatorioGenerator:
                 }
             }
         except Exception as e:
-            print(f"⚠️ Erro em _gerar_resumo_patrimonial_safe: {e}")
+            logger.warning(f"⚠️ Erro em _gerar_resumo_patrimonial_safe: {e}")
             return {
                 'patrimonio_total': 65000000,
                 'observacao': 'Cálculo detalhado em processamento'
@@ -368,7 +611,7 @@ class RelatorioGenerator:
                 }
             }
         except Exception as e:
-            print(f"⚠️ Erro em _gerar_cenarios_rapidos_safe: {e}")
+            logger.warning(f"⚠️ Erro em _gerar_cenarios_rapidos_safe: {e}")
             return {
                 'base': {
                     'taxa': 4.0,
@@ -421,61 +664,70 @@ class RelatorioGenerator:
                 }
             }
         except Exception as e:
-            print(f"⚠️ Erro em _detalhar_calculos_safe: {e}")
+            logger.warning(f"⚠️ Erro em _detalhar_calculos_safe: {e}")
             return {'observacao': 'Cálculos detalhados em processamento'}
     
     # ================ MÉTODOS DE SIMULAÇÃO SAFE ================
     
     def _calcular_sensibilidade_safe(self):
-        """Sensibilidade básica simulada"""
+        """Sensibilidade à taxa recalculada com o modelo completo (vetorizado)"""
         try:
-            fazenda_base = self.fazenda_disponivel
-            percentual_base = self.percentual_fazenda
+            taxas = np.array([2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0])
+            idade_inicio, imediato = _codificar_inicio_renda_filhos(
+                self.params.get('inicio_renda_filhos', 'falecimento'), self.params.get('expectativa', 90)
+            )
+            resultado = calcular_compromissos_vetorizado(
+                taxas, self.params.get('expectativa', 90), self.params.get('despesas', 150000),
+                idade_inicio, self.params.get('custo_fazenda', 2000000), imediato
+            )
             
-            sensibilidade_taxa = []
-            for taxa in [2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]:
-                fator = taxa / self.params.get('taxa', 4.0)
-                sensibilidade_taxa.append({
-                    'taxa': taxa,
-                    'fazenda': fazenda_base * fator,
-                    'percentual': percentual_base * fator
-                })
+            sensibilidade_taxa = [
+                {'taxa': taxa, 'fazenda': fazenda, 'percentual': percentual}
+                for taxa, fazenda, percentual in zip(
+                    taxas.tolist(), resultado['fazenda_disponivel'].tolist(), resultado['percentual_fazenda'].tolist()
+                )
+            ]
             
             return {
                 'por_taxa': sensibilidade_taxa,
-                'observacao': 'Análise baseada em correlação estimada'
+                'observacao': 'Modelo de compromissos recalculado para cada taxa'
             }
         except Exception as e:
-            print(f"⚠️ Erro em _calcular_sensibilidade_safe: {e}")
+            logger.warning(f"⚠️ Erro em _calcular_sensibilidade_safe: {e}")
             return {'observacao': 'Análise de sensibilidade em desenvolvimento'}
     
     def _executar_stress_tests_safe(self):
-        """Stress tests básicos simulados"""
+        """Stress tests recalculados com o modelo completo (todos os cenários em lote)"""
         try:
-            fazenda_base = self.fazenda_disponivel
+            resultados = executar_stress_tests(
+                self.params.get('taxa', 4.0),
+                self.params.get('expectativa', 90),
+                self.params.get('despesas', 150000),
+                self.params.get('inicio_renda_filhos', 'falecimento'),
+                self.params.get('custo_fazenda', 2000000)
+            )
+            base = resultados.pop('base')
             
-            return {
-                'crise_financeira': {
-                    'cenario': 'Crise financeira severa (-30% patrimônio)',
-                    'fazenda_resultante': fazenda_base * 0.7,
-                    'impacto': 'Redução significativa na disponibilidade',
-                    'viabilidade': 'Crítica' if fazenda_base * 0.7 < 0 else 'Baixa'
-                },
-                'inflacao_alta': {
-                    'cenario': 'Inflação alta persistente (+20% despesas)',
-                    'fazenda_resultante': fazenda_base * 0.85,
-                    'impacto': 'Redução moderada na disponibilidade',
-                    'viabilidade': 'Moderada'
-                },
-                'longevidade_extrema': {
-                    'cenario': 'Longevidade extrema (100 anos)',
-                    'fazenda_resultante': fazenda_base * 0.75,
-                    'impacto': 'Aumento nos compromissos de longo prazo',
-                    'viabilidade': 'Baixa'
-                }
+            for dados in resultados.values():
+                variacao = dados['variacao_fazenda']
+                if dados['ano_esgotamento']:
+                    dados['impacto'] = f"Patrimônio se esgota em {dados['ano_esgotamento']} (Ana com {dados['idade_esgotamento']} anos)"
+                elif round(variacao) < 0:
+                    dados['impacto'] = f"Redução de {format_currency(-variacao, True)} na disponibilidade"
+                else:
+                    dados['impacto'] = 'Sem redução na disponibilidade'
+                dados['viabilidade'] = {
+                    'viável': 'Alta', 'atenção': 'Moderada', 'crítico': 'Baixa'
+                }.get(dados['status'], 'Crítica')
+            
+            resultados['base'] = {
+                'fazenda_resultante': base['fazenda_resultante'],
+                'arte_resultante': base['arte_resultante'],
+                'status': base['status']
             }
+            return resultados
         except Exception as e:
-            print(f"⚠️ Erro em _executar_stress_tests_safe: {e}")
+            logger.warning(f"⚠️ Erro em _executar_stress_tests_safe: {e}")
             return {'observacao': 'Stress tests em desenvolvimento'}
     
     def _identificar_otimizacoes_safe(self):
@@ -512,7 +764,7 @@ class RelatorioGenerator:
             
             return otimizacoes
         except Exception as e:
-            print(f"⚠️ Erro em _identificar_otimizacoes_safe: {e}")
+            logger.warning(f"⚠️ Erro em _identificar_otimizacoes_safe: {e}")
             return [{'estrategia': 'Análise de otimizações em desenvolvimento'}]
     
     # ================ FALLBACKS DE EMERGÊNCIA ================
@@ -566,7 +818,29 @@ class RelatorioGenerator:
         return {'observacao': 'Cenários múltiplos sendo calculados'}
     
     def _simular_monte_carlo_safe(self):
-        return {'observacao': 'Simulação Monte Carlo em desenvolvimento'}
+        """Monte Carlo reduzido (semente fixa para o relatório ser reprodutível)"""
+        try:
+            resultado = executar_monte_carlo(
+                self.params.get('expectativa', 90),
+                self.params.get('despesas', 150000),
+                self.params.get('inicio_renda_filhos', 'falecimento'),
+                self.params.get('custo_fazenda', 2000000),
+                self.params.get('perfil', 'moderado'),
+                caminhos=MONTE_CARLO_CONFIG['caminhos_relatorio'],
+                semente=42
+            )
+            
+            return {
+                'caminhos': resultado['caminhos'],
+                'retorno_esperado': resultado['parametros']['retorno_esperado'],
+                'volatilidade': resultado['parametros']['volatilidade'],
+                'probabilidade_sucesso': resultado['probabilidade_sucesso'],
+                'ano_mediano_esgotamento': resultado['esgotamento']['ano_mediano'],
+                'patrimonio_final': {p: v for p, v in resultado['patrimonio_final'].items() if p != 'histograma'}
+            }
+        except Exception as e:
+            logger.warning(f"⚠️ Erro em _simular_monte_carlo_safe: {e}")
+            return {'observacao': 'Simulação Monte Carlo em processamento'}
 
 
 def calcular_valor_futuro_fazenda(valor_atual, anos):
@@ -585,10 +859,54 @@ def calcular_valor_futuro_fazenda(valor_atual, anos):
     
     valor_futuro = valor_atual * ((1 + INFLACAO_ESTATICA/100) ** anos)
     
-    print(f"💰 Valor fazenda: R$ {valor_atual:,.0f} hoje → R$ {valor_futuro:,.0f} em {anos} anos (inflação {INFLACAO_ESTATICA}%)")
+    logger.debug(f"💰 Valor fazenda: R$ {valor_atual:,.0f} hoje → R$ {valor_futuro:,.0f} em {anos} anos (inflação {INFLACAO_ESTATICA}%)")
     
     return valor_futuro
 
+def _duracao_fases_liquidez(periodo_compra):
+    """Anos das fases 1 e 2 (a fase 3 vai até o ano da compra)"""
+    fase1_anos = max(1, int(periodo_compra * FASES_LIQUIDEZ['fase1_pct']))
+    fase2_anos = max(1, int(periodo_compra * FASES_LIQUIDEZ['fase2_pct']))
+    fase3_anos = periodo_compra - fase1_anos - fase2_anos
+    
+    # Garantir que fase3 tenha pelo menos 1 ano
+    if fase3_anos <= 0:
+        fase3_anos = 1
+        fase2_anos = periodo_compra - fase1_anos - fase3_anos
+    
+    return fase1_anos, fase2_anos
+
+
+@lru_cache(maxsize=128)
+def compilar_cronograma_liquidez(periodo_compra):
+    """
+    Compila FASES_LIQUIDEZ em tabelas ano a ano para um período de compra
+    
+    Calculado uma vez por período e compartilhado entre requisições; os
+    arrays são somente leitura.
+    
+    Args:
+        periodo_compra (int): Anos até compra da fazenda (> 0)
+    
+    Returns:
+        tuple: (liquidez_pct, fase_id, descricao) - um valor por ano 1..periodo_compra;
+               fase_id é 1, 2 ou 3 (índice em NOMES_FASES_LIQUIDEZ)
+    """
+    fase1_anos, fase2_anos = _duracao_fases_liquidez(periodo_compra)
+    
+    ano = np.arange(1, periodo_compra + 1)
+    fase_id = np.select([ano <= fase1_anos, ano <= fase1_anos + fase2_anos], [1, 2], 3)
+    liquidez_pct = np.array([
+        0, FASES_LIQUIDEZ['liquidez_base'], FASES_LIQUIDEZ['liquidez_fase2'], FASES_LIQUIDEZ['liquidez_final']
+    ])[fase_id]
+    descricao = np.array([f'{pct}% liquidez' for pct in liquidez_pct.tolist()], dtype=object)
+    
+    for tabela in (liquidez_pct, fase_id, descricao):
+        tabela.setflags(write=False)
+    
+    return liquidez_pct, fase_id, descricao
+
+
 def calcular_liquidez_por_fase(periodo_compra):
     """
     Calcula fases de liquidez conforme período de compra
@@ -603,14 +921,7 @@ def calcular_liquidez_por_fase(periodo_compra):
     if periodo_compra <= 0:
         return {}
     
-    fase1_anos = max(1, int(periodo_compra * FASES_LIQUIDEZ['fase1_pct']))
-    fase2_anos = max(1, int(periodo_compra * FASES_LIQUIDEZ['fase2_pct']))
-    fase3_anos = periodo_compra - fase1_anos - fase2_anos
-    
-    # Garantir que fase3 tenha pelo menos 1 ano
-    if fase3_anos <= 0:
-        fase3_anos = 1
-        fase2_anos = periodo_compra - fase1_anos - fase3_anos
+    fase1_anos, fase2_anos = _duracao_fases_liquidez(periodo_compra)
     
     fases = {
         'fase1': {
@@ -635,10 +946,11 @@ def calcular_liquidez_por_fase(periodo_compra):
         'valor_fazenda_necessario': 0  # Será calculado depois
     }
     
-    print(f"📊 Fases de liquidez para {periodo_compra} anos:")
-    for fase_nome, fase in fases.items():
-        if isinstance(fase, dict) and 'descricao' in fase:
-            print(f"   {fase['descricao']} - {fase['liquidez_pct']}% liquidez")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"📊 Fases de liquidez para {periodo_compra} anos:")
+        for fase_nome, fase in fases.items():
+            if isinstance(fase, dict) and 'descricao' in fase:
+                logger.debug(f"   {fase['descricao']} - {fase['liquidez_pct']}% liquidez")
     
     return fases
 
@@ -657,18 +969,11 @@ def calcular_liquidez_necessaria_ano(ano, periodo_compra, valor_fazenda_futuro):
     if periodo_compra <= 0 or ano > periodo_compra:
         return {'liquidez_pct': 2, 'valor_absoluto': 0, 'fase': 'normal'}
     
-    fases = calcular_liquidez_por_fase(periodo_compra)
-    
-    # Determinar em que fase estamos
-    if ano <= fases['fase1']['anos_fim']:
-        liquidez_pct = fases['fase1']['liquidez_pct']
-        fase = 'fase1'
-    elif ano <= fases['fase2']['anos_fim']:
-        liquidez_pct = fases['fase2']['liquidez_pct']
-        fase = 'fase2'
-    else:
-        liquidez_pct = fases['fase3']['liquidez_pct']
-        fase = 'fase3'
+    # Consulta ao cronograma compilado do período
+    tabela_pct, tabela_fase, _ = compilar_cronograma_liquidez(periodo_compra)
+    indice = max(ano, 1) - 1
+    liquidez_pct = tabela_pct[indice].item()
+    fase = NOMES_FASES_LIQUIDEZ[tabela_fase[indice]]
     
     # No ano da compra, adicionar valor da fazenda
     valor_fazenda_necessario = valor_fazenda_futuro if ano == periodo_compra else 0
@@ -681,132 +986,407 @@ def calcular_liquidez_necessaria_ano(ano, periodo_compra, valor_fazenda_futuro):
     }
 
 
-def gerar_projecao_fluxo_com_fazenda(taxa, expectativa, despesas, anos, inicio_renda_filhos, periodo_compra_fazenda=None, valor_fazenda_futuro=0):
+# ================ MOTOR DE PROJEÇÃO VETORIZADO ================
+class ProjecaoAnual(Sequence):
     """
-    Versão estendida da projeção que inclui compra da fazenda
+    Projeção anual armazenada em colunas (arrays NumPy)
+    
+    Mantém o contrato histórico de lista de dicionários (len, índice, fatias,
+    iteração e projecao[i]['patrimonio']), mas os dicionários só são montados
+    quando alguém efetivamente os pede. Os motores internos leem direto de
+    `colunas`.
     
     Args:
-        Parâmetros existentes + periodo_compra_fazenda e valor_fazenda_futuro
+        colunas (dict): Nome do campo → array com um valor por ano
+    """
+    
+    def __init__(self, colunas):
+        self.colunas = colunas
+        self._anos = len(next(iter(colunas.values()))) if colunas else 0
+    
+    def __len__(self):
+        return self._anos
+    
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self._registro(i) for i in range(*indice.indices(self._anos))]
+        
+        if indice < 0:
+            indice += self._anos
+        if not 0 <= indice < self._anos:
+            raise IndexError('Índice fora da projeção')
+        
+        return self._registro(indice)
+    
+    def _registro(self, indice):
+        """Materializa um ano da projeção como dicionário com tipos Python nativos"""
+        registro = {}
+        for nome, valores in self.colunas.items():
+            valor = valores[indice]
+            registro[nome] = valor.item() if isinstance(valor, np.generic) else valor
+        return registro
+    
+    def registros(self):
+        """Lista de dicionários completa (formato de resposta da API)"""
+        return self[:]
+
+    def colunar(self, casas=None, campo_eventos='marco_especial'):
+        """
+        Formato compacto de resposta: um array por campo
+        
+        Os marcos (strings esparsas) saem das colunas e viram uma lista de
+        eventos com o índice do ano. Com `casas`, os campos float são
+        arredondados (casas=0 devolve inteiros).
+        
+        Args:
+            casas (int): Casas decimais dos floats (None = sem arredondar)
+            campo_eventos (str): Coluna convertida em lista de eventos
+        
+        Returns:
+            dict: {'anos', 'colunas': {campo: lista}, 'eventos': [...]}
+        """
+        colunas = {}
+        for nome, valores in self.colunas.items():
+            if nome == campo_eventos:
+                continue
+            if casas is not None and valores.dtype.kind == 'f':
+                valores = np.round(valores, casas)
+                if casas <= 0:
+                    valores = valores.astype(np.int64)
+            colunas[nome] = valores.tolist()
+        
+        eventos = []
+        if campo_eventos in self.colunas:
+            marcos = self.colunas[campo_eventos]
+            eventos = [
+                {'indice': indice, 'ano': colunas['ano'][indice], 'idade_ana': colunas['idade_ana'][indice], 'evento': marcos[indice]}
+                for indice in np.flatnonzero(np.not_equal(marcos, None)).tolist()
+            ]
+        
+        return {'anos': self._anos, 'colunas': colunas, 'eventos': eventos}
+
+
+class ProjecaoMensal(ProjecaoAnual):
+    """
+    Projeção mês a mês (12 × anos passos) nas mesmas colunas contíguas
+    
+    Cada linha é um mês; agregar_anual soma os fluxos de cada bloco de 12
+    meses e toma o patrimônio do último mês do ano.
+    """
+    
+    CAMPOS_FLUXO = ('rendimentos', 'saidas', 'despesas_ana', 'doacoes', 'renda_filhos', 'valor_gasto_fazenda')
+    
+    def agregar_anual(self):
+        """
+        Returns:
+            dict: Arrays anuais (ano, idade_ana, patrimonio e fluxos somados)
+        """
+        colunas = self.colunas
+        agregado = {
+            'ano': colunas['ano'][::12],
+            'idade_ana': colunas['idade_ana'][::12],
+            'patrimonio': colunas['patrimonio'][11::12]
+        }
+        for campo in self.CAMPOS_FLUXO:
+            agregado[campo] = colunas[campo].reshape(-1, 12).sum(axis=1)
+        return agregado
+
+
+def _resolver_idade_inicio_filhos(inicio_renda_filhos, expectativa, cliente=CLIENTE_PADRAO):
+    """
+    Idade de Ana em que a renda dos filhos começa nas projeções anuais
+    
+    Mesma leitura do motor mensal (_codificar_inicio_renda_filhos): idades
+    vindas da query string ("70") valem como idade, não como o default.
+    
+    Raises:
+        ValueError: Se não for 'falecimento', 'imediato' ou uma idade
+    """
+    return _codificar_inicio_renda_filhos(inicio_renda_filhos, expectativa, cliente)[0]
+
+
+def _recursao_patrimonio(patrimonio_inicial, fatores_crescimento, saidas):
+    """
+    Resolve P[t] = max(P[t-1] × (1 + r[t]) - S[t], 0) sem laço em Python
+    
+    Sem o piso em zero a recursão é linear e tem forma fechada:
+    
+    P[t] = G[t] × (P0 - Σ S[k] / G[k]),  com G[t] = Π (1 + r[k])
+    
+    Como as saídas nunca são negativas, o patrimônio zerado não volta a ficar
+    positivo - o piso vira um simples np.maximum sobre a forma fechada.
+    O último eixo é o tempo; os demais eixos são broadcast (cenários, caminhos).
+    
+    Args:
+        patrimonio_inicial (float/ndarray): Patrimônio no início da projeção (R$)
+        fatores_crescimento (ndarray): Fator (1 + r) de cada ano
+        saidas (ndarray): Saídas totais de cada ano (R$)
+    
+    Returns:
+        tuple: (patrimônio ao fim de cada ano, patrimônio no início de cada ano)
+    """
+    patrimonio_inicial = np.asarray(patrimonio_inicial, dtype=float)
+    crescimento = np.cumprod(fatores_crescimento, axis=-1)
+    saidas_descontadas = np.cumsum(saidas / crescimento, axis=-1)
+    
+    patrimonio = np.maximum(crescimento * (patrimonio_inicial[..., None] - saidas_descontadas), 0.0)
+    
+    inicio = np.broadcast_to(patrimonio_inicial[..., None], patrimonio.shape[:-1] + (1,))
+    patrimonio_anterior = np.concatenate([inicio, patrimonio[..., :-1]], axis=-1)
+    
+    return patrimonio, patrimonio_anterior
+
+
+def _cronograma_saidas_com_fazenda(expectativa, despesas, anos, inicio_renda_filhos, periodo_compra_fazenda=None, valor_fazenda_futuro=0,
+                                   cliente=CLIENTE_PADRAO):
+    """
+    Monta de uma vez os vetores anuais de saídas do plano (inclui a fazenda)
     
     Returns:
-        list: Projeção anual incluindo eventos da fazenda
+        dict: Arrays por ano - despesas_ana, doacoes, renda_filhos,
+              valor_gasto_fazenda, saidas (total) e máscaras auxiliares
     """
-    patrimonio_atual = PATRIMONIO
-    fluxo = []
+    idade_inicio_filhos = _resolver_idade_inicio_filhos(inicio_renda_filhos, expectativa, cliente)
+    
+    indice_ano = np.arange(anos)
+    idade_ana = cliente.idade + indice_ano + 1
     
-    # Determinar quando inicia renda dos filhos
+    ana_viva = idade_ana <= expectativa
+    doacoes_ativas = indice_ano < cliente.periodo_doacoes
+    
+    # 🔧 RENDA DOS FILHOS CORRIGIDA
     if inicio_renda_filhos == 'falecimento':
-        idade_inicio_filhos = expectativa
+        renda_filhos_ativa = idade_ana > expectativa
     elif inicio_renda_filhos == 'imediato':
-        idade_inicio_filhos = IDADE_ANA
-    elif isinstance(inicio_renda_filhos, int):
-        idade_inicio_filhos = int(inicio_renda_filhos)
+        renda_filhos_ativa = np.ones(anos, dtype=bool)
     else:
-        idade_inicio_filhos = 65  # default
+        # CORREÇÃO: Dois períodos
+        renda_filhos_ativa = idade_ana >= idade_inicio_filhos
+    
+    # COMPRA DA FAZENDA
+    if periodo_compra_fazenda and periodo_compra_fazenda > 0:
+        compra_fazenda = indice_ano + 1 == periodo_compra_fazenda
+    else:
+        compra_fazenda = np.zeros(anos, dtype=bool)
+    
+    despesas_ana = np.where(ana_viva, despesas * 12, 0)
+    doacoes = np.where(doacoes_ativas, cliente.doacoes * 12, 0)
+    renda_filhos = np.where(renda_filhos_ativa, cliente.renda_filhos * 12, 0)
+    valor_gasto_fazenda = np.where(compra_fazenda, valor_fazenda_futuro, 0)
+    
+    return {
+        'idade_ana': idade_ana,
+        'idade_inicio_filhos': idade_inicio_filhos,
+        'ana_viva': ana_viva,
+        'doacoes_ativas': doacoes_ativas,
+        'renda_filhos_ativa': renda_filhos_ativa,
+        'compra_fazenda': compra_fazenda,
+        'despesas_ana': despesas_ana,
+        'doacoes': doacoes,
+        'renda_filhos': renda_filhos,
+        'valor_gasto_fazenda': valor_gasto_fazenda,
+        'saidas': despesas_ana + doacoes + renda_filhos + valor_gasto_fazenda
+    }
+
+
+def _cronograma_saidas_mensal(expectativa, despesas, anos, inicio_renda_filhos, periodo_compra_fazenda=None, valor_fazenda_futuro=0,
+                              cliente=CLIENTE_PADRAO):
+    """
+    Vetores mensais de saídas no mesmo cronograma dos VPs da v4.2
+    
+    Despesas enquanto Ana vive, doações nos 15 primeiros anos e renda dos
+    filhos nas janelas do modelo de dois períodos (_janelas_renda_filhos),
+    todos como fluxos mensais. A fazenda sai no último mês do ano da compra.
+    
+    Returns:
+        dict: Arrays por mês - ano do plano (1 = primeiro ano), despesas_ana,
+              doacoes, renda_filhos, valor_gasto_fazenda e saidas (total)
+    """
+    idade_inicio, imediato = _codificar_inicio_renda_filhos(inicio_renda_filhos, expectativa, cliente)
+    (inicio_1, fim_1), (inicio_2, fim_2) = _janelas_renda_filhos(expectativa, idade_inicio, imediato, cliente)
+    
+    mes = np.arange(1, 12 * anos + 1)
+    ano = (mes - 1) // 12 + 1
+    
+    despesas_ana = np.where(ano <= expectativa - cliente.idade, float(despesas), 0.0)
+    doacoes = np.where(ano <= cliente.periodo_doacoes, float(cliente.doacoes), 0.0)
+    renda_filhos = cliente.renda_filhos * (
+        ((ano >= inicio_1) & (ano <= fim_1)).astype(float) + ((ano >= inicio_2) & (ano <= fim_2))
+    )
+    
+    if periodo_compra_fazenda and periodo_compra_fazenda > 0:
+        valor_gasto_fazenda = np.where(mes == 12 * periodo_compra_fazenda, float(valor_fazenda_futuro), 0.0)
+    else:
+        valor_gasto_fazenda = np.zeros(len(mes))
+    
+    return {
+        'mes': mes,
+        'ano_plano': ano,
+        'despesas_ana': despesas_ana,
+        'doacoes': doacoes,
+        'renda_filhos': renda_filhos,
+        'valor_gasto_fazenda': valor_gasto_fazenda,
+        'saidas': despesas_ana + doacoes + renda_filhos + valor_gasto_fazenda
+    }
+
+
+def gerar_projecao_mensal(taxa, expectativa, despesas, anos, inicio_renda_filhos, periodo_compra_fazenda=None, valor_fazenda_futuro=0,
+                          cliente=CLIENTE_PADRAO):
+    """
+    Motor mensal da projeção patrimonial (12 × anos passos)
+    
+    Usa a mesma taxa mensal equivalente de valor_presente,
+    i = (1 + taxa)^(1/12) - 1, e o mesmo cronograma de fluxos mensais dos
+    VPs da v4.2. Assim, descontando as saídas da projeção mês a mês,
+    chega-se ao total de compromissos de calcular_compromissos_v42_corrigido.
+    A recursão roda sobre os arrays contíguos (ver _recursao_patrimonio).
+    
+    Args:
+        taxa (float): Taxa de retorno real anual (%)
+        expectativa (int): Expectativa de vida de Ana (anos)
+        despesas (float): Despesas mensais de Ana (R$)
+        anos (int): Horizonte da projeção (anos)
+        inicio_renda_filhos (str/int): Timing da renda dos filhos
+        periodo_compra_fazenda (int): Ano da compra da fazenda (None = sem compra)
+        valor_fazenda_futuro (float): Valor da fazenda no ano da compra (R$)
+        cliente (ConstantesCliente): Constantes da família (padrão: Ana)
+    
+    Returns:
+        ProjecaoMensal: Uma linha por mês
+    """
+    cronograma = _cronograma_saidas_mensal(expectativa, despesas, anos, inicio_renda_filhos,
+                                           periodo_compra_fazenda, valor_fazenda_futuro, cliente)
+    saidas = cronograma['saidas']
+    
+    taxa_mensal = (1 + taxa / 100) ** (1 / 12) - 1
+    patrimonio, patrimonio_anterior = _recursao_patrimonio(cliente.patrimonio, np.full(len(saidas), 1 + taxa_mensal), saidas)
+    rendimentos = patrimonio_anterior * taxa_mensal
+    
+    return ProjecaoMensal({
+        'mes': cronograma['mes'],
+        'ano': 2024 + cronograma['ano_plano'],
+        'idade_ana': cliente.idade + cronograma['ano_plano'],
+        'patrimonio': patrimonio,
+        'rendimentos': rendimentos,
+        'saidas': saidas,
+        'saldo_liquido': rendimentos - saidas,
+        'despesas_ana': cronograma['despesas_ana'],
+        'doacoes': cronograma['doacoes'],
+        'renda_filhos': cronograma['renda_filhos'],
+        'valor_gasto_fazenda': cronograma['valor_gasto_fazenda']
+    })
+
 
-    for ano in range(anos):
-        idade_ana = IDADE_ANA + ano + 1
-        ano_calendario = 2025 + ano
+def gerar_projecao_fluxo_com_fazenda(taxa, expectativa, despesas, anos, inicio_renda_filhos, periodo_compra_fazenda=None, valor_fazenda_futuro=0, mensal=False,
+                                     cliente=CLIENTE_PADRAO):
+    """
+    Versão estendida da projeção que inclui compra da fazenda
+    
+    Motor colunar: os vetores de saídas são montados de uma vez e a recursão
+    do patrimônio roda sobre os arrays (ver _recursao_patrimonio).
+    
+    Com mensal=True os anos são a agregação do motor mensal
+    (gerar_projecao_mensal): mesmo cronograma e mesmo desconto dos VPs de
+    compromissos. Sem ele, o modelo anual histórico (saídas × 12 no ano).
+    
+    Args:
+        Parâmetros existentes + periodo_compra_fazenda e valor_fazenda_futuro
+        mensal (bool/ProjecaoMensal): Usa o motor mensal (aceita uma
+            projeção mensal já calculada para o mesmo cenário)
+        cliente (ConstantesCliente): Constantes da família (padrão: Ana)
+    
+    Returns:
+        ProjecaoAnual: Projeção anual incluindo eventos da fazenda
+    """
+    if mensal:
+        if not isinstance(mensal, ProjecaoMensal):
+            mensal = gerar_projecao_mensal(taxa, expectativa, despesas, anos, inicio_renda_filhos,
+                                           periodo_compra_fazenda, valor_fazenda_futuro, cliente)
+        cronograma = mensal.agregar_anual()
+        cronograma['renda_filhos_ativa'] = cronograma['renda_filhos'] > 0
+        cronograma['doacoes_ativas'] = cronograma['doacoes'] > 0
+        cronograma['compra_fazenda'] = cronograma['valor_gasto_fazenda'] > 0
+        
+        idade_ana = cronograma['idade_ana']
+        # Primeiro ano com renda: o ano seguinte à idade de início
+        idade_inicio_filhos = _codificar_inicio_renda_filhos(inicio_renda_filhos, expectativa, cliente)[0] + 1
+        patrimonio = cronograma['patrimonio']
+        rendimentos = cronograma['rendimentos']
+    else:
+        cronograma = _cronograma_saidas_com_fazenda(expectativa, despesas, anos, inicio_renda_filhos,
+                                                    periodo_compra_fazenda, valor_fazenda_futuro, cliente)
+        idade_ana = cronograma['idade_ana']
+        idade_inicio_filhos = cronograma['idade_inicio_filhos']
         
         # RENDIMENTOS
-        rendimentos = patrimonio_atual * (taxa / 100)
+        fatores = np.full(anos, 1 + taxa / 100)
+        patrimonio, patrimonio_anterior = _recursao_patrimonio(cliente.patrimonio, fatores, cronograma['saidas'])
+        rendimentos = patrimonio_anterior * (taxa / 100)
+    
+    ana_viva = idade_ana <= expectativa
+    renda_filhos_ativa = cronograma['renda_filhos_ativa']
+    saidas = cronograma['saidas']
+    saldo_liquido = rendimentos - saidas
+    
+    # Período da renda dos filhos
+    periodo_renda = np.full(anos, None, dtype=object)
+    if inicio_renda_filhos == 'falecimento':
+        periodo_renda[renda_filhos_ativa] = 'heranca'
+    elif inicio_renda_filhos == 'imediato':
+        periodo_renda[renda_filhos_ativa] = 'imediato'
+    else:
+        periodo_renda[renda_filhos_ativa & ana_viva] = 'periodo1_vida_ana'
+        periodo_renda[renda_filhos_ativa & ~ana_viva] = 'periodo2_heranca'
+    
+    # LIQUIDEZ NECESSÁRIA (uma única montagem das fases)
+    liquidez_pct = np.full(anos, FASES_LIQUIDEZ['liquidez_base'])
+    liquidez_fase = np.full(anos, 'normal', dtype=object)
+    liquidez_descricao = np.full(anos, '', dtype=object)
+    
+    if periodo_compra_fazenda and periodo_compra_fazenda > 0:
+        tabela_pct, tabela_fase, tabela_descricao = compilar_cronograma_liquidez(periodo_compra_fazenda)
+        no_periodo = min(anos, periodo_compra_fazenda)
         
-        # SAÍDAS ANUAIS
-        saidas_anuais = 0
+        liquidez_pct[:no_periodo] = tabela_pct[:no_periodo]
+        liquidez_fase[:no_periodo] = NOMES_FASES_LIQUIDEZ_NP[tabela_fase[:no_periodo]]
+        liquidez_descricao[:no_periodo] = tabela_descricao[:no_periodo]
         
-        # Despesas de Ana (apenas se viva)
-        if idade_ana <= expectativa:
-            saidas_anuais += despesas * 12
-            ana_viva = True
-        else:
-            ana_viva = False
+        if periodo_compra_fazenda <= anos and valor_fazenda_futuro > 0:
+            liquidez_descricao[periodo_compra_fazenda - 1] += f' + R$ {valor_fazenda_futuro:,.0f} fazenda'
+    
+    # Marcos especiais
+    # (atribuídos da menor para a maior prioridade)
+    marco_especial = np.full(anos, None, dtype=object)
+    marco_especial[(idade_ana == expectativa + 1) & (periodo_renda == 'periodo2_heranca')] = "👨‍👩‍👧‍👦 Renda filhos vira herança (PERÍODO 2)"
+    if inicio_renda_filhos not in ['falecimento', 'imediato']:
+        marco_especial[idade_ana == idade_inicio_filhos] = "👨‍👩‍👧‍👦 Início renda filhos (PERÍODO 1)"
+    marco_especial[(idade_ana == expectativa + 1) & (np.arange(anos) > 0)] = "🕊️ Falecimento de Ana"
+    
+    return ProjecaoAnual({
+        'ano': 2025 + np.arange(anos),
+        'idade_ana': idade_ana,
+        'patrimonio': patrimonio,
+        'rendimentos': rendimentos,
+        'saidas': saidas,
+        'saldo_liquido': saldo_liquido,
+        'ana_viva': ana_viva,
+        'renda_filhos_ativa': renda_filhos_ativa,
+        'periodo_renda': periodo_renda,  # 🔧 NOVO: Indica qual período
+        'doacoes_ativas': cronograma['doacoes_ativas'],
         
-        # Doações (primeiros 15 anos)
-        if ano < PERIODO_DOACOES:
-            saidas_anuais += DOACOES * 12
-            
-        # 🔧 RENDA DOS FILHOS CORRIGIDA
-        renda_filhos_ativa = False
-        periodo_renda = None
-        
-        if inicio_renda_filhos == 'falecimento':
-            # Só após morte de Ana
-            if idade_ana > expectativa:
-                saidas_anuais += RENDA_FILHOS * 12
-                renda_filhos_ativa = True
-                periodo_renda = 'heranca'
-        elif inicio_renda_filhos == 'imediato':
-            # Durante toda vida dos filhos
-            saidas_anuais += RENDA_FILHOS * 12
-            renda_filhos_ativa = True
-            periodo_renda = 'imediato'
-        else:
-            # CORREÇÃO: Dois períodos
-            if idade_ana >= idade_inicio_filhos:
-                saidas_anuais += RENDA_FILHOS * 12
-                renda_filhos_ativa = True
-                
-                if ana_viva:
-                    periodo_renda = 'periodo1_vida_ana'
-                else:
-                    periodo_renda = 'periodo2_heranca'
-
-        # COMPRA DA FAZENDA
-        compra_fazenda = False
-        valor_gasto_fazenda = 0
-        if periodo_compra_fazenda and ano + 1 == periodo_compra_fazenda:
-            compra_fazenda = True
-            valor_gasto_fazenda = valor_fazenda_futuro
-            saidas_anuais += valor_gasto_fazenda
-
-        # LIQUIDEZ NECESSÁRIA
-        liquidez_info = {}
-        if periodo_compra_fazenda and ano + 1 <= periodo_compra_fazenda:
-            liquidez_info = calcular_liquidez_necessaria_ano(ano + 1, periodo_compra_fazenda, valor_fazenda_futuro)
-        else:
-            liquidez_info = {'liquidez_pct': 2, 'valor_fazenda_necessario': 0, 'fase': 'normal'}
-        
-        # SALDO LÍQUIDO
-        saldo_liquido = rendimentos - saidas_anuais
-        patrimonio_atual += saldo_liquido
-        patrimonio_atual = max(patrimonio_atual, 0)
-        
-        # Marco especial
-        marco_especial = None
-        if idade_ana == expectativa + 1 and ano > 0:
-            marco_especial = f"🕊️ Falecimento de Ana"
-        elif idade_ana == idade_inicio_filhos and inicio_renda_filhos not in ['falecimento', 'imediato']:
-            marco_especial = f"👨‍👩‍👧‍👦 Início renda filhos (PERÍODO 1)"
-        elif idade_ana == expectativa + 1 and periodo_renda == 'periodo2_heranca':
-            marco_especial = f"👨‍👩‍👧‍👦 Renda filhos vira herança (PERÍODO 2)"
-        
-        fluxo.append({
-            'ano': ano_calendario,
-            'idade_ana': idade_ana,
-            'patrimonio': patrimonio_atual,
-            'rendimentos': rendimentos,
-            'saidas': saidas_anuais,
-            'saldo_liquido': saldo_liquido,
-            'ana_viva': ana_viva,
-            'renda_filhos_ativa': renda_filhos_ativa,
-            'periodo_renda': periodo_renda,  # 🔧 NOVO: Indica qual período
-            'doacoes_ativas': ano < PERIODO_DOACOES,
-            
-            # Campos da fazenda
-            'compra_fazenda': compra_fazenda,
-            'valor_gasto_fazenda': valor_gasto_fazenda,
-            'liquidez_necessaria_pct': liquidez_info['liquidez_pct'],
-            'liquidez_fase': liquidez_info['fase'],
-            'liquidez_descricao': liquidez_info.get('descricao', ''),
-            
-            # Despesas detalhadas
-            'despesas_ana': despesas * 12 if ana_viva else 0,
-            'doacoes': DOACOES * 12 if ano < PERIODO_DOACOES else 0,
-            'renda_filhos': RENDA_FILHOS * 12 if renda_filhos_ativa else 0,
-            'marco_especial': marco_especial
-        })
-    
-    return fluxo
+        # Campos da fazenda
+        'compra_fazenda': cronograma['compra_fazenda'],
+        'valor_gasto_fazenda': cronograma['valor_gasto_fazenda'],
+        'liquidez_necessaria_pct': liquidez_pct,
+        'liquidez_fase': liquidez_fase,
+        'liquidez_descricao': liquidez_descricao,
+        
+        # Despesas detalhadas
+        'despesas_ana': cronograma['despesas_ana'],
+        'doacoes': cronograma['doacoes'],
+        'renda_filhos': cronograma['renda_filhos'],
+        'marco_especial': marco_especial
+    })
 
 
 def calcular_patrimonio_disponivel_periodo(periodo_compra, valor_fazenda_atual, taxa, expectativa, despesas, inicio_renda_filhos, perfil_investimento):
@@ -824,48 +1404,102 @@ def calcular_patrimonio_disponivel_periodo(periodo_compra, valor_fazenda_atual,
     if periodo_compra <= 0:
         return {'disponivel': 0, 'necessario': valor_fazenda_atual, 'viavel': False}
     
-    # Valor futuro da fazenda
-    valor_fazenda_futuro = calcular_valor_futuro_fazenda(valor_fazenda_atual, periodo_compra)
+    contexto = ContextoCenario(taxa, expectativa, despesas, inicio_renda_filhos, valor_fazenda_atual,
+                               perfil_investimento, periodo_compra)
+    return contexto.viabilidade_periodo
+
+
+# ================ VARREDURA DO ANO DE COMPRA DA FAZENDA ================
+def _patrimonio_sem_fazenda(taxa, expectativa, despesas, inicio_renda_filhos, anos):
+    """
+    Patrimônio ao fim de cada ano sem a fazenda e sem piso em zero
     
-    # Gerar projeção completa
-    projecao = gerar_projecao_fluxo_com_fazenda(taxa, expectativa, despesas, 
-                                               periodo_compra + 5, inicio_renda_filhos, 
-                                               periodo_compra, valor_fazenda_futuro)
+    U[N] = G[N] × (P0 - Σ S[k] / G[k]) sobre o cronograma mensal
+    (gerar_projecao_mensal), amostrado no último mês de cada ano; comprar a
+    fazenda no ano N por V[N] deixa max(U[N] - V[N], 0) (ver _recursao_patrimonio).
     
-    # Patrimônio no ano da compra
-    if len(projecao) >= periodo_compra:
-        item_ano_compra = projecao[periodo_compra - 1]
-        patrimonio_disponivel = item_ano_compra['patrimonio']
-        
-        # Liquidez necessária no ano
-        liquidez_info = calcular_liquidez_necessaria_ano(periodo_compra, periodo_compra, valor_fazenda_futuro)
-        liquidez_minima_pos_compra = patrimonio_disponivel * (liquidez_info['liquidez_pct'] / 100)
-        
-        # Valor realmente disponível = patrimônio - liquidez mínima pós-compra
-        valor_disponivel_fazenda = patrimonio_disponivel - liquidez_minima_pos_compra
-    else:
-        patrimonio_disponivel = 0
-        valor_disponivel_fazenda = 0
-    
-    viabilidade = {
-        'disponivel': valor_disponivel_fazenda,
-        'necessario': valor_fazenda_futuro,
-        'viavel': valor_disponivel_fazenda >= valor_fazenda_futuro,
-        'patrimonio_total_periodo': patrimonio_disponivel,
-        'liquidez_minima_pos_compra': liquidez_minima_pos_compra if 'liquidez_minima_pos_compra' in locals() else 0,
-        'periodo_compra': periodo_compra,
-        'valor_atual': valor_fazenda_atual,
-        'valor_futuro': valor_fazenda_futuro
-    }
+    Returns:
+        tuple: (fatores de crescimento acumulados G, patrimônio U) por ano
+    """
+    saidas = _cronograma_saidas_mensal(expectativa, despesas, anos, inicio_renda_filhos)['saidas']
+    taxa_mensal = (1 + taxa / 100) ** (1 / 12) - 1
+    crescimento = np.cumprod(np.full(len(saidas), 1 + taxa_mensal))
+    patrimonio = crescimento * (PATRIMONIO - np.cumsum(saidas / crescimento))
+    return crescimento[11::12], patrimonio[11::12]
+
+
+def varrer_periodos_compra_fazenda(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda, anos=None):
+    """
+    Avalia a compra da fazenda em todos os anos 1..N de uma vez
+    
+    Mesma regra de calcular_patrimonio_disponivel_periodo, sem uma projeção
+    por ano: sem a fazenda, o patrimônio livre de piso é
+    U[N] = G[N] × (P0 - Σ S[k] / G[k]); comprando no ano N por V[N], o
+    patrimônio nesse ano é max(U[N] - V[N], 0). A liquidez mínima vem do
+    cronograma compilado de cada período.
+    
+    O melhor ano para a arte compara a sobra trazida a valor presente,
+    já que valores de anos diferentes não são comparáveis diretamente.
+    
+    Args:
+        taxa, expectativa, despesas, inicio_renda_filhos: Parâmetros do plano
+        custo_fazenda (float): Valor atual da fazenda (R$)
+        anos (int): Último ano avaliado (padrão: fim da vida de Ana)
     
-    print(f"🎯 Viabilidade compra em {periodo_compra} anos:")
-    print(f"   Disponível: R$ {valor_disponivel_fazenda:,.0f}")
-    print(f"   Necessário: R$ {valor_fazenda_futuro:,.0f}")
-    print(f"   Status: {'✅ VIÁVEL' if viabilidade['viavel'] else '❌ INVIÁVEL'}")
+    Returns:
+        dict: Avaliação por ano, primeiro ano viável e melhor ano para a arte
+    """
+    if anos is None:
+        anos = expectativa - IDADE_ANA
+    anos = max(0, int(anos))
+    
+    periodo = np.arange(1, anos + 1)
+    crescimento, patrimonio_sem_fazenda = _patrimonio_sem_fazenda(taxa, expectativa, despesas, inicio_renda_filhos, anos)
+    
+    valor_fazenda_futuro = custo_fazenda * (1 + INFLACAO_ESTATICA / 100) ** periodo
+    patrimonio_periodo = np.maximum(patrimonio_sem_fazenda - valor_fazenda_futuro, 0.0)
+    
+    # Liquidez no ano da compra (último ano do cronograma de cada período)
+    liquidez_pct = np.array([compilar_cronograma_liquidez(n)[0][-1] for n in periodo.tolist()], dtype=float)
+    liquidez_minima = patrimonio_periodo * (liquidez_pct / 100)
+    disponivel = patrimonio_periodo - liquidez_minima
+    
+    viavel = disponivel >= valor_fazenda_futuro
+    arte = np.where(viavel, np.maximum(0, disponivel - valor_fazenda_futuro), 0.0)
+    arte_valor_presente = arte / crescimento
+    
+    primeiro_ano_viavel = int(periodo[viavel.argmax()]) if viavel.any() else None
+    melhor_ano_arte = int(periodo[arte_valor_presente.argmax()]) if (arte_valor_presente > 0).any() else None
+    
+    por_ano = [
+        {
+            'periodo_compra': n,
+            'ano': 2025 + n,
+            'idade_ana': IDADE_ANA + n,
+            'valor_fazenda_futuro': vf,
+            'patrimonio_total_periodo': pt,
+            'liquidez_pct': lp,
+            'liquidez_minima_pos_compra': lm,
+            'disponivel': d,
+            'viavel': v,
+            'arte': a,
+            'arte_valor_presente': avp
+        }
+        for n, vf, pt, lp, lm, d, v, a, avp in zip(
+            periodo.tolist(), valor_fazenda_futuro.tolist(), patrimonio_periodo.tolist(), liquidez_pct.tolist(),
+            liquidez_minima.tolist(), disponivel.tolist(), viavel.tolist(), arte.tolist(), arte_valor_presente.tolist()
+        )
+    ]
     
-    return viabilidade
+    return {
+        'periodos': por_ano,
+        'primeiro_ano_viavel': primeiro_ano_viavel,
+        'melhor_ano_arte': melhor_ano_arte,
+        'anos_avaliados': anos
+    }
+
 # ================ VALIDAÇÕES DE SANIDADE ================
-def validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos=None):
+def validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos=None, cliente=CLIENTE_PADRAO):
     """
     Valida todos os inputs do usuário para garantir consistência
     
@@ -874,28 +1508,29 @@ def validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos=None):
         expectativa (int): Expectativa de vida de Ana (anos)
         despesas (float): Despesas mensais de Ana (R$)
         inicio_renda_filhos (str/int): Quando inicia renda dos filhos
+        cliente (ConstantesCliente): Constantes da família (padrão: Ana)
     
     Raises:
         ValueError: Se algum parâmetro estiver fora dos limites esperados
     """
     
     # Validação da expectativa de vida
-    assert expectativa >= IDADE_ANA, f"Expectativa de vida ({expectativa}) não pode ser menor que idade atual de Ana ({IDADE_ANA})"
+    assert expectativa >= cliente.idade, f"Expectativa de vida ({expectativa}) não pode ser menor que idade atual de Ana ({cliente.idade})"
     assert expectativa <= 120, f"Expectativa de vida ({expectativa}) parece irrealisticamente alta (máximo 120 anos)"
     
     # Validação da taxa de retorno real
     assert 0 < taxa <= 15, f"Taxa de retorno real ({taxa}%) fora de intervalo razoável (0.1% a 15%)"
     if taxa > 8:
-        print(f"⚠️  ATENÇÃO: Taxa de retorno real de {taxa}% é muito otimista para perfil conservador-moderado")
+        logger.info(f"⚠️  ATENÇÃO: Taxa de retorno real de {taxa}% é muito otimista para perfil conservador-moderado")
     
     # Validação das despesas mensais
     assert 50_000 <= despesas <= 1_000_000, f"Despesas mensais ({despesas:,.0f}) fora de intervalo razoável (R$ 50k a R$ 1M)"
     
     # Validação do início da renda dos filhos
     if inicio_renda_filhos and isinstance(inicio_renda_filhos, int):
-        assert IDADE_ANA <= inicio_renda_filhos <= expectativa, f"Início renda filhos ({inicio_renda_filhos}) deve estar entre idade atual ({IDADE_ANA}) e expectativa ({expectativa})"
+        assert cliente.idade <= inicio_renda_filhos <= expectativa, f"Início renda filhos ({inicio_renda_filhos}) deve estar entre idade atual ({cliente.idade}) e expectativa ({expectativa})"
     
-    print(f"✅ Validações OK - Taxa: {taxa}%, Expectativa: {expectativa} anos, Despesas: R$ {despesas:,.0f}/mês")
+    logger.debug(f"✅ Validações OK - Taxa: {taxa}%, Expectativa: {expectativa} anos, Despesas: R$ {despesas:,.0f}/mês")
 
 # ================ FÓRMULAS FINANCEIRAS DOCUMENTADAS ================
 def valor_presente(fluxo_mensal, anos, taxa_anual):
@@ -954,18 +1589,19 @@ def valor_presente(fluxo_mensal, anos, taxa_anual):
     
     return vp
 
-def obter_patrimonio_disponivel(perfil_investimento='moderado'):
+def obter_patrimonio_disponivel(perfil_investimento='moderado', cliente=CLIENTE_PADRAO):
     """
     CORREÇÃO CRÍTICA: Ana já possui R$ 65M LÍQUIDOS conforme case
     Não aplicar desconto adicional de liquidez
     """
-    patrimonio_integral = PATRIMONIO
+    patrimonio_integral = cliente.patrimonio
     
     # INFO: Perfil afeta apenas estratégia de investimento, não valor disponível
     perfil_info = ASSET_ALLOCATION_PROFILES.get(perfil_investimento, ASSET_ALLOCATION_PROFILES['moderado'])
     
-    print(f"💰 Patrimônio integral disponível: {format_currency(patrimonio_integral)} (perfil: {perfil_investimento})")
-    print(f"📊 Retorno esperado: {perfil_info['retorno_esperado']}% a.a. real")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"💰 Patrimônio integral disponível: {format_currency(patrimonio_integral)} (perfil: {perfil_investimento})")
+        logger.debug(f"📊 Retorno esperado: {perfil_info['retorno_esperado']}% a.a. real")
     
     return patrimonio_integral
 
@@ -1002,13 +1638,56 @@ def calcular_renda_vitalicia_corrigida(inicio_renda_filhos, expectativa_ana):
         idade_filhos_ao_inicio = IDADE_ESTIMADA_FILHOS + anos_ate_inicio
         anos_duracao = max(0, EXPECTATIVA_FILHOS - idade_filhos_ao_inicio)
     
-    print(f"👨‍👩‍👧‍👦 Renda vitalícia CORRIGIDA: {anos_duracao} anos (início em {anos_ate_inicio} anos)")
-    print(f"   📅 Filhos terão {IDADE_ESTIMADA_FILHOS + anos_ate_inicio} anos quando renda inicia")
-    print(f"   🏁 Renda até os {EXPECTATIVA_FILHOS} anos dos filhos")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"👨‍👩‍👧‍👦 Renda vitalícia CORRIGIDA: {anos_duracao} anos (início em {anos_ate_inicio} anos)")
+        logger.debug(f"   📅 Filhos terão {IDADE_ESTIMADA_FILHOS + anos_ate_inicio} anos quando renda inicia")
+        logger.debug(f"   🏁 Renda até os {EXPECTATIVA_FILHOS} anos dos filhos")
     
     return anos_ate_inicio, anos_duracao
 
 # ================ CORREÇÃO #4: TIMING OTIMIZADO DOS COMPROMISSOS ================
+def curva_vp_renda_filhos(taxa, expectativa):
+    """
+    VP da renda dos filhos para cada idade de início, de IDADE_ANA à expectativa
+    
+    Uma única avaliação vetorizada do modelo de dois períodos
+    (calcular_renda_vitalicia_corrigida_v44): início durante a vida de Ana
+    paga o período 1 até a expectativa e segue como herança no período 2;
+    início na expectativa equivale a 'falecimento'.
+    
+    Args:
+        taxa (float): Taxa de retorno real anual (%)
+        expectativa (int): Expectativa de vida de Ana
+    
+    Returns:
+        dict: Curva (idades, vp, anos_ate_inicio, anos_duracao) e a opção de menor VP
+    """
+    idades = np.arange(IDADE_ANA, expectativa + 1)
+    vp = _vp_renda_filhos_np(taxa, expectativa, idades)
+    
+    anos_ate_inicio = idades - IDADE_ANA
+    anos_vida_ana = expectativa - IDADE_ANA
+    anos_periodo2 = max(0, EXPECTATIVA_FILHOS - (IDADE_ESTIMADA_FILHOS + anos_vida_ana))
+    anos_duracao = np.where(
+        idades < expectativa,
+        expectativa - idades + anos_periodo2,
+        np.maximum(0, EXPECTATIVA_FILHOS - (IDADE_ESTIMADA_FILHOS + anos_ate_inicio))
+    )
+    
+    indice_otimo = int(np.argmin(vp))
+    idade_otima = int(idades[indice_otimo])
+    
+    return {
+        'idades': idades.tolist(),
+        'vp': vp.tolist(),
+        'anos_ate_inicio': anos_ate_inicio.tolist(),
+        'anos_duracao': anos_duracao.tolist(),
+        'idade_otima': idade_otima,
+        'melhor_opcao': 'falecimento' if idade_otima == expectativa else idade_otima,
+        'vp_minimo': float(vp[indice_otimo])
+    }
+
+
 def otimizar_timing_compromissos(taxa, expectativa, inicio_renda_filhos='imediato'):
     """
     CORREÇÃO: Otimizar QUANDO iniciar cada compromisso para minimizar VP
@@ -1017,53 +1696,33 @@ def otimizar_timing_compromissos(taxa, expectativa, inicio_renda_filhos='imediat
     - Renda filhos: começar MAIS TARDE reduz VP significativamente
     - Doações: podem começar imediatamente (são apenas 15 anos)
     - Despesas Ana: obrigatoriamente imediatas
-    """
     
-    timing_otimizado = {}
+    Todas as idades de início (IDADE_ANA até a expectativa) são avaliadas de
+    uma vez com o modelo de dois períodos - ver curva_vp_renda_filhos.
     
-    # Avaliar diferentes idades para início da renda dos filhos
-    opcoes_inicio = [53, 60, 65, 70, 'falecimento']  # Ana tem 53 hoje
-    menor_vp = float('inf')
-    melhor_opcao = inicio_renda_filhos
+    Returns:
+        tuple: (VP por opção 'inicio_<idade>' / 'inicio_falecimento',
+                início escolhido - 'otimizado' vira a opção de menor VP)
+    """
+    curva = curva_vp_renda_filhos(taxa, expectativa)
     
-    for opcao in opcoes_inicio:
-        if opcao == 'falecimento':
-            idade_inicio = expectativa
-        else:
-            idade_inicio = opcao
-            
-        # Pular se já passou da idade
-        if isinstance(idade_inicio, int) and idade_inicio < IDADE_ANA:
-            continue
-            
-        anos_ate_inicio, anos_duracao = calcular_renda_vitalicia_corrigida(opcao, expectativa)
-        
+    timing_otimizado = {}
+    for idade, vp, anos_ate_inicio, anos_duracao in zip(
+        curva['idades'], curva['vp'], curva['anos_ate_inicio'], curva['anos_duracao']
+    ):
         if anos_duracao <= 0:
             continue
-            
-        # Calcular VP para esta opção
-        if anos_ate_inicio > 0:
-            fator_desconto = (1 + taxa/100) ** (-anos_ate_inicio)
-            vp_opcao = valor_presente(RENDA_FILHOS, anos_duracao, taxa) * fator_desconto
-        else:
-            vp_opcao = valor_presente(RENDA_FILHOS, anos_duracao, taxa)
-        
+        opcao = 'falecimento' if idade == expectativa else idade
         timing_otimizado[f'inicio_{opcao}'] = {
-            'vp': vp_opcao,
+            'vp': vp,
             'anos_ate_inicio': anos_ate_inicio,
             'anos_duracao': anos_duracao
         }
-        
-        # Verificar se é a melhor opção
-        if vp_opcao < menor_vp:
-            menor_vp = vp_opcao
-            melhor_opcao = opcao
     
-    # Use a opção escolhida pelo usuário ou a melhor se não especificada
-    if inicio_renda_filhos not in opcoes_inicio:
-        if inicio_renda_filhos == 'otimizado':
-            inicio_renda_filhos = melhor_opcao
-            print(f"🎯 OTIMIZAÇÃO: Melhor timing para renda filhos = {melhor_opcao}")
+    # Use a opção escolhida pelo usuário ou a melhor se 'otimizado'
+    if inicio_renda_filhos == 'otimizado':
+        inicio_renda_filhos = curva['melhor_opcao']
+        logger.debug(f"🎯 OTIMIZAÇÃO: Melhor timing para renda filhos = {inicio_renda_filhos}")
     
     return timing_otimizado, inicio_renda_filhos
 
@@ -1082,8 +1741,9 @@ def estimar_itcmd_futuro(patrimonio_estimado_heranca, estado='MG'):
     aliquota = aliquotas_itcmd.get(estado, aliquotas_itcmd['default'])
     imposto_estimado = patrimonio_estimado_heranca * aliquota
     
-    print(f"📋 ITCMD estimado futuro ({estado}): {aliquota*100}% = {format_currency(imposto_estimado)}")
-    print(f"   ⚠️  IMPORTANTE: Não reduz patrimônio atual, será pago na herança")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"📋 ITCMD estimado futuro ({estado}): {aliquota*100}% = {format_currency(imposto_estimado)}")
+        logger.debug(f"   ⚠️  IMPORTANTE: Não reduz patrimônio atual, será pago na herança")
     
     return {
         'valor_estimado': imposto_estimado,
@@ -1140,7 +1800,7 @@ def aplicar_tributacao_sucessoria(patrimonio_heranca, estado='MG'):
     imposto = patrimonio_heranca * aliquota
     valor_liquido = patrimonio_heranca - imposto
     
-    print(f"🏛️ ITCMD {estado}: {aliquota*100}% = {format_currency(imposto)}")
+    logger.debug(f"🏛️ ITCMD {estado}: {aliquota*100}% = {format_currency(imposto)}")
     
     return {
         'valor_bruto': patrimonio_heranca,
@@ -1195,7 +1855,7 @@ def validar_capacidade_dual(patrimonio, rendimento_anual, despesas_ana, renda_fi
     }
     
     
-def calcular_renda_vitalicia_corrigida_v44(inicio_renda_filhos, expectativa_ana, taxa):
+def calcular_renda_vitalicia_corrigida_v44(inicio_renda_filhos, expectativa_ana, taxa, cliente=CLIENTE_PADRAO):
     """
     🔧 VERSÃO 4.4 - CORREÇÃO CRÍTICA: Renda filhos em dois períodos
     
@@ -1211,164 +1871,464 @@ def calcular_renda_vitalicia_corrigida_v44(inicio_renda_filhos, expectativa_ana,
         tuple: (anos_ate_inicio, vp_total)
     """
     
-    print(f"\n🔧 RENDA FILHOS v4.4: início={inicio_renda_filhos}, expectativa_ana={expectativa_ana}")
+    logger.debug(f"🔧 RENDA FILHOS v4.4: início={inicio_renda_filhos}, expectativa_ana={expectativa_ana}")
     
     if inicio_renda_filhos == 'falecimento':
         # ✅ MODELO ORIGINAL (CORRETO) - Só após morte
-        anos_ate_inicio = expectativa_ana - IDADE_ANA
-        idade_filhos_ao_inicio = IDADE_ESTIMADA_FILHOS + anos_ate_inicio
-        anos_duracao = max(0, EXPECTATIVA_FILHOS - idade_filhos_ao_inicio)
+        anos_ate_inicio = expectativa_ana - cliente.idade
+        idade_filhos_ao_inicio = cliente.idade_filhos + anos_ate_inicio
+        anos_duracao = max(0, cliente.expectativa_filhos - idade_filhos_ao_inicio)
         
-        print(f"   📊 Falecimento: {anos_duracao} anos de renda")
+        logger.debug(f"   📊 Falecimento: {anos_duracao} anos de renda")
         return anos_ate_inicio, anos_duracao
         
     elif inicio_renda_filhos == 'imediato':
         # ✅ MODELO IMEDIATO (CORRETO)
         anos_ate_inicio = 0
-        anos_duracao = EXPECTATIVA_FILHOS - IDADE_ESTIMADA_FILHOS  # ~55 anos
+        anos_duracao = cliente.expectativa_filhos - cliente.idade_filhos  # ~55 anos
         
-        print(f"   📊 Imediato: {anos_duracao} anos de renda")
+        logger.debug(f"   📊 Imediato: {anos_duracao} anos de renda")
         return anos_ate_inicio, anos_duracao
         
     else:
         # 🔧 CORREÇÃO PRINCIPAL: Idade específica (ex: 65)
         idade_inicio = int(inicio_renda_filhos)
-        anos_ate_inicio = max(0, idade_inicio - IDADE_ANA)
+        anos_ate_inicio = max(0, idade_inicio - cliente.idade)
         
         if idade_inicio < expectativa_ana:
             # ✅ INICIA DURANTE VIDA DE ANA - USAR MODELO COMPLETO
             anos_durante_vida = expectativa_ana - idade_inicio
-            anos_total = anos_durante_vida + max(0, EXPECTATIVA_FILHOS - (IDADE_ESTIMADA_FILHOS + (expectativa_ana - IDADE_ANA)))
+            anos_total = anos_durante_vida + max(0, cliente.expectativa_filhos - (cliente.idade_filhos + (expectativa_ana - cliente.idade)))
             
-            print(f"   🎯 Dois períodos: {anos_durante_vida} anos (vida) + herança = {anos_total} anos total")
+            logger.debug(f"   🎯 Dois períodos: {anos_durante_vida} anos (vida) + herança = {anos_total} anos total")
             return anos_ate_inicio, anos_total
         else:
             # Início após expectativa = igual falecimento
-            anos_duracao = max(0, EXPECTATIVA_FILHOS - (IDADE_ESTIMADA_FILHOS + anos_ate_inicio))
-            print(f"   📊 Após expectativa: {anos_duracao} anos")
+            anos_duracao = max(0, cliente.expectativa_filhos - (cliente.idade_filhos + anos_ate_inicio))
+            logger.debug(f"   📊 Após expectativa: {anos_duracao} anos")
             return anos_ate_inicio, anos_duracao
 
 
-def calcular_compromissos_v42_corrigido(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda=2_000_000, perfil_investimento='moderado'):
-    """
-    VERSÃO 4.2 - TODOS OS ERROS CORRIGIDOS:
-    ✅ #1: Patrimônio integral (R$ 65M, não R$ 45.5M)
-    ✅ #2: ITCMD removido dos cálculos atuais  
-    ✅ #3: Renda vitalícia real dos filhos
-    ✅ #4: Timing otimizado dos compromissos
-    ✅ #5: Sem restrições arbitrárias na fazenda
-    ✅ #6: Inflação já descontada na taxa real
-    ✅ #7: Otimização temporal implementada
-    """
-    print(f"💰 CALCULANDO COMPROMISSOS v4.4 - RENDA FILHOS CORRIGIDA")
-    
-    # 1. Validar inputs
-    validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos)
-    
-    # 2. Patrimônio integral
-    patrimonio_disponivel = obter_patrimonio_disponivel(perfil_investimento)
-    
-    # 3. Calcular anos de vida de Ana
-    anos_vida_ana = expectativa - IDADE_ANA
-    
-    # 4. VP Despesas de Ana
-    vp_despesas = valor_presente(despesas, anos_vida_ana, taxa)
-    
-    # 5. 🔧 VP RENDA FILHOS CORRIGIDO
+# ================ GRAFO INCREMENTAL DOS COMPROMISSOS ================
+# Cada VP é um nó memoizado só pelas próprias entradas: mudar o custo da
+# fazenda não recalcula nenhum, mudar as despesas recalcula só vp_despesas.
+# As constantes do cliente (ConstantesCliente) entram na chave de todos.
+
+@lru_cache(maxsize=CACHE_CONFIG['nos_vp_max'])
+def vp_despesas_no(taxa, expectativa, despesas, cliente):
+    """VP das despesas de Ana até a expectativa de vida"""
+    anos_vida_ana = expectativa - cliente.idade
+    return valor_presente(despesas, anos_vida_ana, taxa)
+
+
+@lru_cache(maxsize=CACHE_CONFIG['nos_vp_max'])
+def vp_filhos_no(taxa, expectativa, inicio_renda_filhos, cliente):
+    """VP da renda dos filhos (modelo v4.4 de dois períodos)"""
     if inicio_renda_filhos == 'falecimento':
         # Modelo original
-        anos_ate_inicio, anos_duracao = calcular_renda_vitalicia_corrigida_v44(inicio_renda_filhos, expectativa, taxa)
+        anos_ate_inicio, anos_duracao = calcular_renda_vitalicia_corrigida_v44(inicio_renda_filhos, expectativa, taxa, cliente)
         
         if anos_duracao > 0:
             fator_desconto = (1 + taxa/100) ** (-anos_ate_inicio)
-            vp_filhos = valor_presente(RENDA_FILHOS, anos_duracao, taxa) * fator_desconto
+            vp_filhos = valor_presente(cliente.renda_filhos, anos_duracao, taxa) * fator_desconto
         else:
             vp_filhos = 0
             
     elif inicio_renda_filhos == 'imediato':
         # Modelo imediato
-        anos_ate_inicio, anos_duracao = calcular_renda_vitalicia_corrigida_v44(inicio_renda_filhos, expectativa, taxa)
-        vp_filhos = valor_presente(RENDA_FILHOS, anos_duracao, taxa)
+        anos_ate_inicio, anos_duracao = calcular_renda_vitalicia_corrigida_v44(inicio_renda_filhos, expectativa, taxa, cliente)
+        vp_filhos = valor_presente(cliente.renda_filhos, anos_duracao, taxa)
         
     else:
         # 🔧 MODELO CORRIGIDO: Dois períodos para idade específica
         idade_inicio = int(inicio_renda_filhos)
-        anos_ate_inicio = max(0, idade_inicio - IDADE_ANA)
+        anos_ate_inicio = max(0, idade_inicio - cliente.idade)
         
         if idade_inicio < expectativa:
             # PERÍODO 1: Durante vida de Ana
             anos_periodo1 = expectativa - idade_inicio
-            vp_periodo1 = valor_presente(RENDA_FILHOS, anos_periodo1, taxa)
+            vp_periodo1 = valor_presente(cliente.renda_filhos, anos_periodo1, taxa)
             
             if anos_ate_inicio > 0:
                 vp_periodo1 *= (1 + taxa/100) ** (-anos_ate_inicio)
             
             # PERÍODO 2: Após morte de Ana
-            idade_filhos_quando_ana_morre = IDADE_ESTIMADA_FILHOS + (expectativa - IDADE_ANA)
-            anos_periodo2 = max(0, EXPECTATIVA_FILHOS - idade_filhos_quando_ana_morre)
+            idade_filhos_quando_ana_morre = cliente.idade_filhos + (expectativa - cliente.idade)
+            anos_periodo2 = max(0, cliente.expectativa_filhos - idade_filhos_quando_ana_morre)
             
             if anos_periodo2 > 0:
-                vp_periodo2 = valor_presente(RENDA_FILHOS, anos_periodo2, taxa)
-                vp_periodo2 *= (1 + taxa/100) ** (-(expectativa - IDADE_ANA))
+                vp_periodo2 = valor_presente(cliente.renda_filhos, anos_periodo2, taxa)
+                vp_periodo2 *= (1 + taxa/100) ** (-(expectativa - cliente.idade))
             else:
                 vp_periodo2 = 0
             
             vp_filhos = vp_periodo1 + vp_periodo2
             
-            print(f"   🎯 DOIS PERÍODOS:")
-            print(f"      Período 1 (vida): {anos_periodo1} anos, VP = R$ {vp_periodo1:,.0f}")
-            print(f"      Período 2 (herança): {anos_periodo2} anos, VP = R$ {vp_periodo2:,.0f}")
-            print(f"      TOTAL: R$ {vp_filhos:,.0f}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"   🎯 DOIS PERÍODOS:")
+                logger.debug(f"      Período 1 (vida): {anos_periodo1} anos, VP = R$ {vp_periodo1:,.0f}")
+                logger.debug(f"      Período 2 (herança): {anos_periodo2} anos, VP = R$ {vp_periodo2:,.0f}")
+                logger.debug(f"      TOTAL: R$ {vp_filhos:,.0f}")
         else:
             # Igual ao modelo falecimento
-            anos_duracao = max(0, EXPECTATIVA_FILHOS - (IDADE_ESTIMADA_FILHOS + anos_ate_inicio))
+            anos_duracao = max(0, cliente.expectativa_filhos - (cliente.idade_filhos + anos_ate_inicio))
             if anos_duracao > 0:
                 fator_desconto = (1 + taxa/100) ** (-anos_ate_inicio)
-                vp_filhos = valor_presente(RENDA_FILHOS, anos_duracao, taxa) * fator_desconto
+                vp_filhos = valor_presente(cliente.renda_filhos, anos_duracao, taxa) * fator_desconto
             else:
                 vp_filhos = 0
     
-    # 6. VP Doações
-    vp_doacoes = valor_presente(DOACOES, PERIODO_DOACOES, taxa)
+    return vp_filhos
+
+
+@lru_cache(maxsize=CACHE_CONFIG['nos_vp_max'])
+def vp_doacoes_no(taxa, cliente):
+    """VP das doações (valor e prazo fixos do cliente, só depende da taxa)"""
+    return valor_presente(cliente.doacoes, cliente.periodo_doacoes, taxa)
+
+
+# Componente -> (atributos do ContextoCenario de que depende, nó memoizado)
+NOS_COMPROMISSOS = {
+    'despesas': (('taxa', 'expectativa', 'despesas', 'cliente'), vp_despesas_no),
+    'filhos': (('taxa', 'expectativa', 'inicio_renda_filhos', 'cliente'), vp_filhos_no),
+    'doacoes': (('taxa', 'cliente'), vp_doacoes_no)
+}
+
+
+def estatisticas_nos_compromissos():
+    """Acertos/falhas de cada nó do grafo de compromissos"""
+    estatisticas = {}
+    for componente, (entradas, no) in NOS_COMPROMISSOS.items():
+        info = no.cache_info()
+        consultas = info.hits + info.misses
+        estatisticas[componente] = {
+            'entradas': list(entradas),
+            'tamanho': info.currsize,
+            'acertos': info.hits,
+            'falhas': info.misses,
+            'taxa_acerto': info.hits / consultas if consultas else 0.0
+        }
+    return estatisticas
+
+
+def limpar_nos_compromissos():
+    """Esvazia os caches de todos os nós"""
+    for _, no in NOS_COMPROMISSOS.values():
+        no.cache_clear()
+
+
+# ================ CONTEXTO DE AVALIAÇÃO DO CENÁRIO ================
+class ContextoCenario:
+    """
+    Avaliação de um cenário em que cada intermediário é calculado uma única vez
+    
+    Validação, patrimônio disponível, VPs dos compromissos, valor futuro e fases
+    da fazenda e a projeção anual são cached_property: quem consome (v4.2, v4.3,
+    viabilidade da compra, rota de projeções) compartilha o mesmo resultado em
+    vez de refazer a conta. A projeção cobre o maior horizonte pedido - o
+    necessário para a viabilidade (periodo + 5) e o da rota (anos_projecao) -
+    e cada consumidor lê o trecho que precisa.
     
-    # 7. Total compromissos
-    total_compromissos = vp_despesas + vp_filhos + vp_doacoes
+    Args:
+        taxa, expectativa, despesas, inicio_renda_filhos: Parâmetros do plano
+        custo_fazenda (float): Valor atual da fazenda (R$)
+        perfil_investimento (str): Perfil de investimento
+        periodo_compra_fazenda (int): Anos até a compra (None/<=0 = imediata)
+        anos_projecao (int): Horizonte mínimo da projeção anual
+        cliente (ConstantesCliente): Patrimônio, idade, renda dos filhos e
+            doações da família avaliada (padrão: Ana)
+    """
     
-    # 8. Valor disponível para fazenda
-    valor_disponivel_fazenda = patrimonio_disponivel - total_compromissos
-    percentual_fazenda = (valor_disponivel_fazenda / PATRIMONIO) * 100
+    def __init__(self, taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda=2_000_000,
+                 perfil_investimento='moderado', periodo_compra_fazenda=None, anos_projecao=0,
+                 cliente=CLIENTE_PADRAO):
+        self.taxa = taxa
+        self.expectativa = expectativa
+        self.despesas = despesas
+        self.inicio_renda_filhos = inicio_renda_filhos
+        self.custo_fazenda = custo_fazenda
+        self.perfil_investimento = perfil_investimento
+        self.periodo_compra_fazenda = periodo_compra_fazenda if periodo_compra_fazenda and periodo_compra_fazenda > 0 else None
+        self.anos_projecao = anos_projecao
+        self.cliente = cliente
+    
+    @cached_property
+    def validado(self):
+        """Executa validar_inputs uma vez por cenário"""
+        validar_inputs(self.taxa, self.expectativa, self.despesas, self.inicio_renda_filhos, self.cliente)
+        return True
+    
+    @cached_property
+    def patrimonio_disponivel(self):
+        return obter_patrimonio_disponivel(self.perfil_investimento, self.cliente)
+    
+    @cached_property
+    def valores_presentes(self):
+        """VPs de despesas, renda dos filhos (modelo v4.4) e doações (ver NOS_COMPROMISSOS)"""
+        logger.debug(f"💰 CALCULANDO COMPROMISSOS v4.4 - RENDA FILHOS CORRIGIDA")
+        
+        return {
+            componente: no(*(getattr(self, entrada) for entrada in entradas))
+            for componente, (entradas, no) in NOS_COMPROMISSOS.items()
+        }
     
-    # 9. Avaliação fazenda
-    avaliacao_fazenda = avaliar_sustentabilidade_fazenda(custo_fazenda, patrimonio_disponivel, valor_disponivel_fazenda)
+    def resultado_compromissos(self, custo_fazenda):
+        """
+        Resultado v4.2 (compromissos, fazenda e arte) para um custo de fazenda
+        
+        Args:
+            custo_fazenda (float): Custo da fazenda considerado na arte/avaliação
+        
+        Returns:
+            dict: Mesmo formato de calcular_compromissos_v42_corrigido
+        """
+        self.validado
+        patrimonio_disponivel = self.patrimonio_disponivel
+        vp = self.valores_presentes
+        vp_despesas, vp_filhos, vp_doacoes = vp['despesas'], vp['filhos'], vp['doacoes']
+        
+        # Total compromissos
+        total_compromissos = vp_despesas + vp_filhos + vp_doacoes
+        
+        # Valor disponível para fazenda
+        valor_disponivel_fazenda = patrimonio_disponivel - total_compromissos
+        percentual_fazenda = (valor_disponivel_fazenda / self.cliente.patrimonio) * 100
+        
+        # Avaliação fazenda
+        avaliacao_fazenda = avaliar_sustentabilidade_fazenda(custo_fazenda, patrimonio_disponivel, valor_disponivel_fazenda)
+        
+        # Valor para arte/galeria
+        valor_arte = max(0, valor_disponivel_fazenda - custo_fazenda) if valor_disponivel_fazenda > 0 else 0
+        percentual_arte = (valor_arte / self.cliente.patrimonio) * 100 if valor_arte > 0 else 0
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"💰 RESULTADO v4.4 CORRIGIDO:")
+            logger.debug(f"   • VP Despesas Ana: {format_currency(vp_despesas)}")
+            logger.debug(f"   • VP Renda Filhos CORRIGIDO: {format_currency(vp_filhos)}")
+            logger.debug(f"   • VP Doações: {format_currency(vp_doacoes)}")
+            logger.debug(f"   • Total Compromissos: {format_currency(total_compromissos)}")
+            logger.debug(f"   • Fazenda disponível: {format_currency(valor_disponivel_fazenda)} ({percentual_fazenda:.1f}%)")
+            logger.debug(f"   • Arte disponível: {format_currency(valor_arte)} ({percentual_arte:.1f}%)")
+        
+        return {
+            'patrimonio_total': self.cliente.patrimonio,
+            'patrimonio_disponivel': patrimonio_disponivel,
+            'despesas': vp_despesas,
+            'filhos': vp_filhos,
+            'doacoes': vp_doacoes,
+            'total_compromissos': total_compromissos,
+            'fazenda_disponivel': valor_disponivel_fazenda,
+            'percentual_fazenda': percentual_fazenda,
+            'arte': valor_arte,
+            'percentual_arte': percentual_arte,
+            'custo_fazenda': custo_fazenda,
+            'avaliacao_fazenda': avaliacao_fazenda,
+            'corrected_version': '4.4-RENDA-FILHOS-DOIS-PERIODOS'
+        }
     
-    # 10. Valor para arte/galeria
-    valor_arte = max(0, valor_disponivel_fazenda - custo_fazenda) if valor_disponivel_fazenda > 0 else 0
-    percentual_arte = (valor_arte / PATRIMONIO) * 100 if valor_arte > 0 else 0
+    @cached_property
+    def compromissos(self):
+        """Resultado v4.2 com o custo da fazenda do cenário"""
+        return self.resultado_compromissos(self.custo_fazenda)
+    
+    @cached_property
+    def valor_fazenda_futuro(self):
+        if self.periodo_compra_fazenda is None:
+            return self.custo_fazenda
+        return calcular_valor_futuro_fazenda(self.custo_fazenda, self.periodo_compra_fazenda)
+    
+    @cached_property
+    def fases_liquidez(self):
+        if self.periodo_compra_fazenda is None:
+            return {}
+        return calcular_liquidez_por_fase(self.periodo_compra_fazenda)
+    
+    @cached_property
+    def projecao_mensal(self):
+        """Projeção mês a mês, no maior horizonte pedido pelos consumidores"""
+        anos = self.anos_projecao
+        if self.periodo_compra_fazenda is not None:
+            anos = max(anos, self.periodo_compra_fazenda + 5)
+        
+        return gerar_projecao_mensal(
+            self.taxa, self.expectativa, self.despesas, anos, self.inicio_renda_filhos,
+            self.periodo_compra_fazenda, self.valor_fazenda_futuro, cliente=self.cliente
+        )
     
-    # 11. Log final
-    print(f"\n💰 RESULTADO v4.4 CORRIGIDO:")
-    print(f"   • VP Despesas Ana: {format_currency(vp_despesas)}")
-    print(f"   • VP Renda Filhos CORRIGIDO: {format_currency(vp_filhos)}")
-    print(f"   • VP Doações: {format_currency(vp_doacoes)}")
-    print(f"   • Total Compromissos: {format_currency(total_compromissos)}")
-    print(f"   • Fazenda disponível: {format_currency(valor_disponivel_fazenda)} ({percentual_fazenda:.1f}%)")
-    print(f"   • Arte disponível: {format_currency(valor_arte)} ({percentual_arte:.1f}%)")
+    @cached_property
+    def projecao(self):
+        """Projeção anual única (agregação da projeção mensal)"""
+        return gerar_projecao_fluxo_com_fazenda(
+            self.taxa, self.expectativa, self.despesas, len(self.projecao_mensal) // 12, self.inicio_renda_filhos,
+            self.periodo_compra_fazenda, self.valor_fazenda_futuro, mensal=self.projecao_mensal, cliente=self.cliente
+        )
     
-    return {
-        'patrimonio_total': PATRIMONIO,
-        'patrimonio_disponivel': patrimonio_disponivel,
-        'despesas': vp_despesas,
-        'filhos': vp_filhos,
-        'doacoes': vp_doacoes,
-        'total_compromissos': total_compromissos,
-        'fazenda_disponivel': valor_disponivel_fazenda,
-        'percentual_fazenda': percentual_fazenda,
-        'arte': valor_arte,
-        'percentual_arte': percentual_arte,
-        'custo_fazenda': custo_fazenda,
-        'avaliacao_fazenda': avaliacao_fazenda,
-        'corrected_version': '4.4-RENDA-FILHOS-DOIS-PERIODOS'
-    }
+    @cached_property
+    def reconciliacao(self):
+        """
+        Confere a projeção mensal contra os VPs dos compromissos
+        
+        Desconta mês a mês, à mesma taxa mensal, as saídas da projeção sem
+        fazenda até o fim do último compromisso. Cada componente deve bater
+        com o VP de valores_presentes e P0 = Σ VP(saídas) + VP(patrimônio final)
+        enquanto o patrimônio não se esgota.
+        """
+        cliente = self.cliente
+        idade_inicio, imediato = _codificar_inicio_renda_filhos(self.inicio_renda_filhos, self.expectativa, cliente)
+        (_, fim_1), (_, fim_2) = _janelas_renda_filhos(self.expectativa, idade_inicio, imediato, cliente)
+        anos = int(max(self.expectativa - cliente.idade, fim_1, fim_2, cliente.periodo_doacoes))
+        
+        colunas = gerar_projecao_mensal(self.taxa, self.expectativa, self.despesas, anos, self.inicio_renda_filhos,
+                                        cliente=cliente).colunas
+        taxa_mensal = (1 + self.taxa / 100) ** (1 / 12) - 1
+        desconto = (1 + taxa_mensal) ** -colunas['mes'].astype(float)
+        
+        vp_fluxo = {
+            'despesas': float(colunas['despesas_ana'] @ desconto),
+            'filhos': float(colunas['renda_filhos'] @ desconto),
+            'doacoes': float(colunas['doacoes'] @ desconto)
+        }
+        vp_modelo = self.valores_presentes
+        diferenca = max(abs(vp_fluxo[campo] - vp_modelo[campo]) for campo in vp_fluxo)
+        
+        total_fluxo = sum(vp_fluxo.values())
+        vp_patrimonio_final = float(colunas['patrimonio'][-1] * desconto[-1])
+        
+        return {
+            'horizonte_meses': len(desconto),
+            'vp_projecao': vp_fluxo,
+            'vp_compromissos': dict(vp_modelo),
+            'total_projecao': total_fluxo,
+            'total_compromissos': sum(vp_modelo.values()),
+            'vp_patrimonio_final': vp_patrimonio_final,
+            'residuo_patrimonio': self.cliente.patrimonio - total_fluxo - vp_patrimonio_final,
+            'diferenca_maxima': diferenca,
+            'confere': diferenca < 0.005
+        }
+    
+    @cached_property
+    def viabilidade_periodo(self):
+        """Patrimônio disponível no ano da compra (ver calcular_patrimonio_disponivel_periodo)"""
+        periodo_compra = self.periodo_compra_fazenda
+        if periodo_compra is None:
+            return {'disponivel': 0, 'necessario': self.custo_fazenda, 'viavel': False}
+        
+        valor_fazenda_futuro = self.valor_fazenda_futuro
+        colunas = self.projecao.colunas
+        
+        # Patrimônio e liquidez mínima no ano da compra
+        patrimonio_disponivel = float(colunas['patrimonio'][periodo_compra - 1])
+        liquidez_pct = colunas['liquidez_necessaria_pct'][periodo_compra - 1].item()
+        liquidez_minima_pos_compra = patrimonio_disponivel * (liquidez_pct / 100)
+        
+        # Valor realmente disponível = patrimônio - liquidez mínima pós-compra
+        valor_disponivel_fazenda = patrimonio_disponivel - liquidez_minima_pos_compra
+        
+        viabilidade = {
+            'disponivel': valor_disponivel_fazenda,
+            'necessario': valor_fazenda_futuro,
+            'viavel': valor_disponivel_fazenda >= valor_fazenda_futuro,
+            'patrimonio_total_periodo': patrimonio_disponivel,
+            'liquidez_minima_pos_compra': liquidez_minima_pos_compra,
+            'periodo_compra': periodo_compra,
+            'valor_atual': self.custo_fazenda,
+            'valor_futuro': valor_fazenda_futuro
+        }
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"🎯 Viabilidade compra em {periodo_compra} anos:")
+            logger.debug(f"   Disponível: R$ {valor_disponivel_fazenda:,.0f}")
+            logger.debug(f"   Necessário: R$ {valor_fazenda_futuro:,.0f}")
+            logger.debug(f"   Status: {'✅ VIÁVEL' if viabilidade['viavel'] else '❌ INVIÁVEL'}")
+        
+        return viabilidade
+    
+    @cached_property
+    def compromissos_com_fazenda(self):
+        """Resultado v4.3 (compra da fazenda com liquidez gradual)"""
+        periodo_compra_fazenda = self.periodo_compra_fazenda
+        custo_fazenda = self.custo_fazenda
+        
+        # Compromissos básicos (sem fazenda)
+        resultado_base = self.resultado_compromissos(0)
+        
+        # ANÁLISE DA FAZENDA
+        if periodo_compra_fazenda is not None:
+            viabilidade = self.viabilidade_periodo
+            
+            fazenda_analysis = {
+                'periodo_compra': periodo_compra_fazenda,
+                'valor_atual': custo_fazenda,
+                'valor_futuro': self.valor_fazenda_futuro,
+                'viabilidade': viabilidade,
+                'fases_liquidez': self.fases_liquidez,
+                'disponivel_periodo': viabilidade['disponivel'],
+                'necessario_periodo': viabilidade['necessario'],
+                'viavel': viabilidade['viavel']
+            }
+            
+            # Card mostra o que está disponível no período (viável ou não)
+            fazenda_disponivel = viabilidade['disponivel']
+            percentual_fazenda = (fazenda_disponivel / self.cliente.patrimonio) * 100
+                
+        else:
+            # Sem compra de fazenda - usar cálculo original
+            fazenda_disponivel = resultado_base['fazenda_disponivel']
+            percentual_fazenda = resultado_base['percentual_fazenda']
+            fazenda_analysis = {
+                'periodo_compra': None,
+                'valor_atual': custo_fazenda,
+                'valor_futuro': custo_fazenda,
+                'viavel': fazenda_disponivel >= custo_fazenda,
+                'disponivel_periodo': fazenda_disponivel,
+                'necessario_periodo': custo_fazenda
+            }
+        
+        # Arte/galeria = sobra após fazenda
+        valor_arte = max(0, fazenda_disponivel - fazenda_analysis['necessario_periodo']) if fazenda_analysis['viavel'] else 0
+        percentual_arte = (valor_arte / self.cliente.patrimonio) * 100 if valor_arte > 0 else 0
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"🏡 ANÁLISE FAZENDA v4.3:")
+            logger.debug(f"   • Período: {periodo_compra_fazenda or 'Imediato'} anos")
+            logger.debug(f"   • Valor hoje: {format_currency(custo_fazenda)}")
+            if periodo_compra_fazenda:
+                logger.debug(f"   • Valor futuro: {format_currency(fazenda_analysis['valor_futuro'])}")
+            logger.debug(f"   • Disponível: {format_currency(fazenda_disponivel)} ({percentual_fazenda:.1f}%)")
+            logger.debug(f"   • Status: {'✅ VIÁVEL' if fazenda_analysis['viavel'] else '❌ INVIÁVEL'}")
+        
+        return {
+            **resultado_base,  # Manter todos os campos existentes
+            
+            # SOBRESCREVER CAMPOS DA FAZENDA
+            'fazenda_disponivel': fazenda_disponivel,
+            'percentual_fazenda': percentual_fazenda,
+            'arte': valor_arte,
+            'percentual_arte': percentual_arte,
+            
+            # NOVOS CAMPOS PARA FAZENDA
+            'fazenda_analysis': fazenda_analysis,
+            'periodo_compra_fazenda': periodo_compra_fazenda,
+            'valor_fazenda_atual': custo_fazenda,
+            'valor_fazenda_futuro': fazenda_analysis.get('valor_futuro', custo_fazenda),
+            
+            'corrected_version': '4.3-FAZENDA-LIQUIDEZ-GRADUAL'
+        }
+
+
+def calcular_compromissos_v42_corrigido(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda=2_000_000, perfil_investimento='moderado'):
+    """
+    VERSÃO 4.2 - TODOS OS ERROS CORRIGIDOS:
+    ✅ #1: Patrimônio integral (R$ 65M, não R$ 45.5M)
+    ✅ #2: ITCMD removido dos cálculos atuais  
+    ✅ #3: Renda vitalícia real dos filhos
+    ✅ #4: Timing otimizado dos compromissos
+    ✅ #5: Sem restrições arbitrárias na fazenda
+    ✅ #6: Inflação já descontada na taxa real
+    ✅ #7: Otimização temporal implementada
+    """
+    contexto = ContextoCenario(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda, perfil_investimento)
+    return contexto.compromissos
 
 
 
@@ -1420,94 +2380,557 @@ def calcular_compromissos_v43_com_fazenda(taxa, expectativa, despesas, inicio_re
     Novos parâmetros:
         periodo_compra_fazenda (int): Anos até compra da fazenda (None = não comprar)
     """
+    contexto = ContextoCenario(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                               perfil_investimento, periodo_compra_fazenda)
+    return contexto.compromissos_com_fazenda
+
+
+# ================ CACHE LRU DE COMPROMISSOS ================
+class CacheLRU:
+    """
+    Cache LRU limitado por tamanho, seguro entre threads, com contadores de acerto
+    
+    Os valores são devolvidos como cópias profundas para que quem consome
+    (rotas, RelatorioGenerator) possa alterar o dict sem contaminar o cache.
+    
+    Com `compartilhado` (CacheCompartilhado) uma falha local consulta o L2
+    dos workers antes de calcular, e o que é calculado vai para os dois.
+    """
+    
+    def __init__(self, capacidade, compartilhado=None, nome='compromissos'):
+        self.capacidade = capacidade
+        self.compartilhado = compartilhado
+        self.nome = nome
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+    
+    def obter(self, chave, calcular):
+        """
+        Retorna o valor em cache para a chave ou calcula e armazena
+        
+        Args:
+            chave (tuple): Chave canônica
+            calcular (callable): Função sem argumentos que produz o valor
+        
+        Returns:
+            Cópia do valor em cache
+        """
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return copy.deepcopy(self._itens[chave])
+            self.falhas += 1
+        
+        # Cálculo fora do lock: requisições com chaves diferentes não se bloqueiam
+        encontrado, valor = False, None
+        if self.compartilhado is not None:
+            encontrado, valor = self.compartilhado.obter((self.nome, chave))
+        if not encontrado:
+            valor = calcular()
+            if self.compartilhado is not None:
+                self.compartilhado.gravar((self.nome, chave), valor)
+        
+        with self._lock:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+        
+        return copy.deepcopy(valor)
+    
+    def limpar(self):
+        """Esvazia o cache e zera os contadores"""
+        with self._lock:
+            self._itens.clear()
+            self.acertos = 0
+            self.falhas = 0
+    
+    def estatisticas(self):
+        """Tamanho, capacidade e taxa de acerto do cache"""
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                'tamanho': len(self._itens),
+                'capacidade': self.capacidade,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0
+            }
+
+
+class CacheCompartilhado:
+    """
+    Cache L2 entre processos (workers do gunicorn, lote de clientes) em SQLite WAL
+    
+    Um resultado calculado por um worker vira uma leitura local para os
+    demais: o WAL deixa leitores e o escritor trabalharem ao mesmo tempo e o
+    arquivo fica no page cache do sistema. Valores são JSON; uma linha
+    ilegível é apagada e conta como falha. A chave inclui VERSAO_MODELO e a
+    assinatura do código (o arquivo sobrevive a reinícios, mas um deploy
+    novo nunca lê resultados do anterior), e a chave de quem consome traz as
+    constantes do cliente (ConstantesCliente): clientes do lote nunca leem
+    resultados alheios.
+    
+    Expiração por TTL e, acima do limite de tamanho, saem as entradas usadas
+    há mais tempo. Cada worker publica periodicamente os próprios contadores
+    (deste cache e das fontes registradas em `fontes_estatisticas`) na tabela
+    `estatisticas`; qualquer worker responde o agregado. Erros de SQLite
+    nunca derrubam a requisição: viram falha do cache e WARNING no log.
     
-    # Validar inputs existentes
-    validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos)
+    Args:
+        caminho (str): Arquivo SQLite
+        ttl_segundos (int): Validade das entradas
+        tamanho_max_bytes (int): Limite da soma dos valores gravados
+        assinatura (str): Identifica o código em execução (ver assinatura_codigo)
+    """
     
-    # Patrimônio disponível
-    patrimonio_disponivel = obter_patrimonio_disponivel(perfil_investimento)
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS entradas (
+            chave TEXT PRIMARY KEY,
+            valor BLOB NOT NULL,
+            tamanho INTEGER NOT NULL,
+            expira_em REAL NOT NULL,
+            acessado_em REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entradas_por_acesso ON entradas (acessado_em);
+        CREATE TABLE IF NOT EXISTS estatisticas (
+            pid INTEGER PRIMARY KEY,
+            contadores TEXT NOT NULL,
+            atualizado_em REAL NOT NULL
+        );
+    """
     
-    # Calcular compromissos básicos (sem fazenda)
-    resultado_base = calcular_compromissos_v42_corrigido(taxa, expectativa, despesas, 
-                                                        inicio_renda_filhos, 0, perfil_investimento)
+    # Leituras só regravam acessado_em depois desse intervalo (ordem do LRU aproximada)
+    INTERVALO_ACESSO_SEGUNDOS = 60
+    
+    def __init__(self, caminho, ttl_segundos, tamanho_max_bytes, assinatura=''):
+        self.caminho = caminho
+        self.ttl_segundos = ttl_segundos
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.assinatura = assinatura
+        self.fontes_estatisticas = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._zerar_contadores()
+    
+    def _zerar_contadores(self):
+        self.acertos = 0
+        self.falhas = 0
+        self.gravacoes = 0
+        self.despejos = 0
+        self.erros = 0
+        self._bytes_desde_despejo = 0
+        self._publicado_em = 0.0
+    
+    def _conexao(self):
+        """Conexão da thread atual (refeita após fork: conexões SQLite não atravessam processos)"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            conexao.executescript(self.ESQUEMA)
+            self._local.conexao, self._local.pid = conexao, os.getpid()
+        return conexao
+    
+    def _chave(self, chave):
+        return hashlib.sha256(repr((VERSAO_MODELO, self.assinatura, chave)).encode('utf-8')).hexdigest()
+    
+    def _contar(self, contador, quantidade=1):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + quantidade)
+    
+    def obter(self, chave):
+        """
+        Returns:
+            tuple: (encontrado, valor)
+        """
+        agora = time.time()
+        try:
+            conexao = self._conexao()
+            chave_hash = self._chave(chave)
+            linha = conexao.execute(
+                "SELECT valor, expira_em, acessado_em FROM entradas WHERE chave = ?", (chave_hash,)
+            ).fetchone()
+            if linha is not None and linha[1] > agora:
+                try:
+                    valor = json.loads(linha[0])
+                except Exception as e:
+                    # Gravação truncada ou formato antigo: a linha sai e o valor é recalculado
+                    logger.warning(f"⚠️ Entrada ilegível no cache compartilhado (removida): {e}")
+                    conexao.execute("DELETE FROM entradas WHERE chave = ?", (chave_hash,))
+                    self._contar('erros')
+                else:
+                    if agora - linha[2] > self.INTERVALO_ACESSO_SEGUNDOS:
+                        conexao.execute("UPDATE entradas SET acessado_em = ? WHERE chave = ?", (agora, chave_hash))
+                    self._contar('acertos')
+                    self.publicar_estatisticas()
+                    return True, valor
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Erro lendo cache compartilhado: {e}")
+            self._contar('erros')
+        
+        self._contar('falhas')
+        return False, None
     
-    # ANÁLISE DA FAZENDA
-    fazenda_analysis = {}
+    def gravar(self, chave, valor):
+        agora = time.time()
+        try:
+            dados = json.dumps(valor, ensure_ascii=False).encode('utf-8')
+            self._conexao().execute(
+                "INSERT OR REPLACE INTO entradas (chave, valor, tamanho, expira_em, acessado_em) VALUES (?, ?, ?, ?, ?)",
+                (self._chave(chave), dados, len(dados), agora + self.ttl_segundos, agora)
+            )
+            self._contar('gravacoes')
+            
+            # A soma dos tamanhos só é conferida a cada ~5% do limite gravado
+            with self._lock:
+                self._bytes_desde_despejo += len(dados)
+                conferir = self._bytes_desde_despejo >= self.tamanho_max_bytes // 20
+                if conferir:
+                    self._bytes_desde_despejo = 0
+            if conferir:
+                self._despejar()
+            self.publicar_estatisticas()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Erro gravando cache compartilhado: {e}")
+            self._contar('erros')
+    
+    def _despejar(self):
+        """Remove expirados e, acima do limite, os usados há mais tempo até 90% dele"""
+        conexao = self._conexao()
+        removidos = conexao.execute("DELETE FROM entradas WHERE expira_em <= ?", (time.time(),)).rowcount
+        total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()[0]
+        excesso = total - int(self.tamanho_max_bytes * 0.9)
+        if total > self.tamanho_max_bytes:
+            removidos += conexao.execute("""
+                DELETE FROM entradas WHERE chave IN (
+                    SELECT chave FROM (
+                        SELECT chave, tamanho, SUM(tamanho) OVER (ORDER BY acessado_em, chave) AS acumulado
+                        FROM entradas
+                    ) WHERE acumulado - tamanho < ?
+                )
+            """, (excesso,)).rowcount
+        self._contar('despejos', removidos)
+    
+    def _contadores(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            proprios = {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'gravacoes': self.gravacoes,
+                'despejos': self.despejos,
+                'erros': self.erros,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0
+            }
+        return {'compartilhado': proprios, **{nome: fonte() for nome, fonte in self.fontes_estatisticas.items()}}
+    
+    def publicar_estatisticas(self, forcar=False):
+        """Grava os contadores deste worker (no máximo a cada publicar_estatisticas_segundos)"""
+        agora = time.time()
+        if not forcar and agora - self._publicado_em < L2_CACHE_CONFIG['publicar_estatisticas_segundos']:
+            return
+        self._publicado_em = agora
+        
+        try:
+            conexao = self._conexao()
+            conexao.execute(
+                "INSERT OR REPLACE INTO estatisticas (pid, contadores, atualizado_em) VALUES (?, ?, ?)",
+                (os.getpid(), json.dumps(self._contadores()), agora)
+            )
+            # Workers encerrados somem depois de um TTL sem publicar
+            conexao.execute("DELETE FROM estatisticas WHERE atualizado_em < ?", (agora - self.ttl_segundos,))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Erro publicando estatísticas do cache compartilhado: {e}")
     
-    if periodo_compra_fazenda and periodo_compra_fazenda > 0:
-        # Valor futuro da fazenda
-        valor_fazenda_futuro = calcular_valor_futuro_fazenda(custo_fazenda, periodo_compra_fazenda)
+    def limpar(self):
+        """Esvazia o L2 de todos os workers e zera os contadores publicados"""
+        try:
+            conexao = self._conexao()
+            conexao.execute("DELETE FROM entradas")
+            conexao.execute("DELETE FROM estatisticas")
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Erro limpando cache compartilhado: {e}")
+        with self._lock:
+            self._zerar_contadores()
+    
+    def estatisticas(self):
+        """Contadores deste worker, de cada worker publicado e o agregado por cache"""
+        self.publicar_estatisticas(forcar=True)
+        try:
+            conexao = self._conexao()
+            entradas, tamanho = conexao.execute("SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM entradas").fetchone()
+            linhas = conexao.execute("SELECT pid, contadores, atualizado_em FROM estatisticas ORDER BY pid").fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Erro lendo estatísticas do cache compartilhado: {e}")
+            return {'arquivo': self.caminho, 'erro': str(e), 'worker': {'pid': os.getpid(), **self._contadores()}}
         
-        # Disponibilidade no período
-        viabilidade = calcular_patrimonio_disponivel_periodo(
-            periodo_compra_fazenda, custo_fazenda, taxa, expectativa, 
-            despesas, inicio_renda_filhos, perfil_investimento
-        )
+        workers = [
+            {'pid': pid, 'atualizado_em': datetime.fromtimestamp(atualizado_em, SAO_PAULO_TZ).isoformat(),
+             **json.loads(contadores)}
+            for pid, contadores, atualizado_em in linhas
+        ]
         
-        # Fases de liquidez
-        fases_liquidez = calcular_liquidez_por_fase(periodo_compra_fazenda)
-        
-        fazenda_analysis = {
-            'periodo_compra': periodo_compra_fazenda,
-            'valor_atual': custo_fazenda,
-            'valor_futuro': valor_fazenda_futuro,
-            'viabilidade': viabilidade,
-            'fases_liquidez': fases_liquidez,
-            'disponivel_periodo': viabilidade['disponivel'],
-            'necessario_periodo': viabilidade['necessario'],
-            'viavel': viabilidade['viavel']
-        }
+        agregado = {}
+        for worker in workers:
+            for cache, contadores in worker.items():
+                if not isinstance(contadores, dict):
+                    continue
+                soma = agregado.setdefault(cache, {'acertos': 0, 'falhas': 0})
+                soma['acertos'] += contadores.get('acertos', 0)
+                soma['falhas'] += contadores.get('falhas', 0)
+        for soma in agregado.values():
+            consultas = soma['acertos'] + soma['falhas']
+            soma['taxa_acerto'] = soma['acertos'] / consultas if consultas else 0.0
         
-        # Atualizar resultado para mostrar no card
-        if viabilidade['viavel']:
-            fazenda_disponivel = viabilidade['disponivel']
-            percentual_fazenda = (fazenda_disponivel / PATRIMONIO) * 100
-        else:
-            fazenda_disponivel = viabilidade['disponivel']  # Mostrar o que está disponível
-            percentual_fazenda = (fazenda_disponivel / PATRIMONIO) * 100
-            
-    else:
-        # Sem compra de fazenda - usar cálculo original
-        fazenda_disponivel = resultado_base['fazenda_disponivel']
-        percentual_fazenda = resultado_base['percentual_fazenda']
-        fazenda_analysis = {
-            'periodo_compra': None,
-            'valor_atual': custo_fazenda,
-            'valor_futuro': custo_fazenda,
-            'viavel': fazenda_disponivel >= custo_fazenda,
-            'disponivel_periodo': fazenda_disponivel,
-            'necessario_periodo': custo_fazenda
+        return {
+            'arquivo': self.caminho,
+            'entradas': entradas,
+            'bytes': tamanho,
+            'limite_bytes': self.tamanho_max_bytes,
+            'ttl_segundos': self.ttl_segundos,
+            'worker': {'pid': os.getpid(), **self._contadores()},
+            'workers': workers,
+            'agregado': agregado
         }
+
+
+@lru_cache(maxsize=1)
+def assinatura_codigo():
+    """sha256 do código deste módulo (parte da chave do L2)"""
+    try:
+        with open(os.path.abspath(__file__), 'rb') as arquivo:
+            return hashlib.sha256(arquivo.read()).hexdigest()
+    except OSError as e:
+        logger.warning(f"⚠️ Sem assinatura do código para o cache compartilhado: {e}")
+        return ''
+
+
+_cache_compartilhado = CacheCompartilhado(
+    L2_CACHE_CONFIG['arquivo'], L2_CACHE_CONFIG['ttl_segundos'], L2_CACHE_CONFIG['tamanho_max_mb'] * 1024 * 1024,
+    assinatura=assinatura_codigo()
+) if L2_CACHE_CONFIG['arquivo'] else None
+
+if _cache_compartilhado is not None and hasattr(os, 'register_at_fork'):
+    # Workers de gunicorn --preload não herdam os contadores do processo mestre
+    os.register_at_fork(after_in_child=_cache_compartilhado._zerar_contadores)
+
+_cache_compromissos = CacheLRU(CACHE_CONFIG['compromissos_max'], compartilhado=_cache_compartilhado)
+
+
+class CachePDFDisco:
+    """
+    Cache de relatórios PDF em disco, endereçado pelo sha256 da chave canônica
     
-    # Arte/galeria = sobra após fazenda
-    valor_arte = max(0, fazenda_disponivel - fazenda_analysis['necessario_periodo']) if fazenda_analysis['viavel'] else 0
-    percentual_arte = (valor_arte / PATRIMONIO) * 100 if valor_arte > 0 else 0
+    Um arquivo por relatório. O mtime marca a geração e o atime o último
+    uso: PDFs com mais de idade_max_segundos são gerados de novo e, quando o
+    diretório passa do limite, os arquivos usados há mais tempo saem
+    primeiro (LRU). O diretório sobrevive a reinícios, então a chave inclui
+    a assinatura do código (ver gerar_relatorio_pdf). Falha de disco nunca
+    impede o download - o relatório é gerado em memória.
     
-    print(f"\n🏡 ANÁLISE FAZENDA v4.3:")
-    print(f"   • Período: {periodo_compra_fazenda or 'Imediato'} anos")
-    print(f"   • Valor hoje: {format_currency(custo_fazenda)}")
-    if periodo_compra_fazenda:
-        print(f"   • Valor futuro: {format_currency(fazenda_analysis['valor_futuro'])}")
-    print(f"   • Disponível: {format_currency(fazenda_disponivel)} ({percentual_fazenda:.1f}%)")
-    print(f"   • Status: {'✅ VIÁVEL' if fazenda_analysis['viavel'] else '❌ INVIÁVEL'}")
+    Args:
+        diretorio (str): Pasta dos arquivos (criada sob demanda)
+        tamanho_max_bytes (int): Limite total do diretório
+        idade_max_segundos (float): Validade de um PDF desde a geração
+    """
     
-    return {
-        **resultado_base,  # Manter todos os campos existentes
+    def __init__(self, diretorio, tamanho_max_bytes, idade_max_segundos):
+        self.diretorio = diretorio
+        self.tamanho_max_bytes = tamanho_max_bytes
+        self.idade_max_segundos = idade_max_segundos
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+    
+    def _caminho(self, chave):
+        resumo = hashlib.sha256(json.dumps(chave, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+        return os.path.join(self.diretorio, f'{resumo}.pdf')
+    
+    def obter(self, chave, gerar):
+        """
+        Bytes do PDF da chave, lidos do disco ou gerados e gravados
         
-        # SOBRESCREVER CAMPOS DA FAZENDA
-        'fazenda_disponivel': fazenda_disponivel,
-        'percentual_fazenda': percentual_fazenda,
-        'arte': valor_arte,
-        'percentual_arte': percentual_arte,
+        Args:
+            chave (tuple): Tipo do relatório + parâmetros canônicos + versão do código
+            gerar (callable): Função sem argumentos que produz os bytes do PDF
         
-        # NOVOS CAMPOS PARA FAZENDA
-        'fazenda_analysis': fazenda_analysis,
-        'periodo_compra_fazenda': periodo_compra_fazenda,
-        'valor_fazenda_atual': custo_fazenda,
-        'valor_fazenda_futuro': fazenda_analysis.get('valor_futuro', custo_fazenda),
+        Returns:
+            bytes: Conteúdo do PDF
+        """
+        caminho = self._caminho(chave)
         
-        'corrected_version': '4.3-FAZENDA-LIQUIDEZ-GRADUAL'
-    }
+        try:
+            agora = time.time()
+            gerado_em = os.stat(caminho).st_mtime
+            if agora - gerado_em <= self.idade_max_segundos:
+                with open(caminho, 'rb') as arquivo:
+                    dados = arquivo.read()
+                os.utime(caminho, (agora, gerado_em))  # Último uso (ordem do LRU); mtime segue sendo a geração
+                with self._lock:
+                    self.acertos += 1
+                return dados
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"⚠️ Erro lendo cache de PDF {caminho}: {e}")
+        
+        with self._lock:
+            self.falhas += 1
+        
+        dados = gerar()
+        
+        try:
+            self._gravar(caminho, dados)
+            self._despejar()
+        except OSError as e:
+            logger.warning(f"⚠️ Erro gravando cache de PDF {caminho}: {e}")
+        
+        return dados
+    
+    def _gravar(self, caminho, dados):
+        """Escrita atômica: arquivo temporário na mesma pasta + os.replace"""
+        os.makedirs(self.diretorio, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'wb') as arquivo:
+                arquivo.write(dados)
+            os.replace(temporario, caminho)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+    
+    def _arquivos(self):
+        """(último uso, tamanho, caminho, geração) dos PDFs do diretório"""
+        arquivos = []
+        with os.scandir(self.diretorio) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith('.pdf'):
+                    try:
+                        info = entrada.stat()
+                    except FileNotFoundError:
+                        continue
+                    arquivos.append((info.st_atime, info.st_size, entrada.path, info.st_mtime))
+        return arquivos
+    
+    def _despejar(self):
+        """Remove os PDFs vencidos e os menos usados até o diretório caber no limite"""
+        with self._lock:
+            limite_geracao = time.time() - self.idade_max_segundos
+            arquivos = sorted(self._arquivos())
+            total = sum(tamanho for _, tamanho, _, _ in arquivos)
+            for _, tamanho, caminho, gerado_em in arquivos:
+                if total <= self.tamanho_max_bytes and gerado_em >= limite_geracao:
+                    continue
+                try:
+                    os.unlink(caminho)
+                except FileNotFoundError:
+                    pass
+                total -= tamanho
+    
+    def limpar(self):
+        """Remove todos os PDFs e zera os contadores"""
+        with self._lock:
+            if os.path.isdir(self.diretorio):
+                for _, _, caminho, _ in self._arquivos():
+                    try:
+                        os.unlink(caminho)
+                    except FileNotFoundError:
+                        pass
+            self.acertos = 0
+            self.falhas = 0
+    
+    def estatisticas(self):
+        """Arquivos, bytes ocupados e taxa de acerto do cache em disco"""
+        with self._lock:
+            arquivos = self._arquivos() if os.path.isdir(self.diretorio) else []
+            consultas = self.acertos + self.falhas
+            return {
+                'arquivos': len(arquivos),
+                'bytes': sum(tamanho for _, tamanho, _, _ in arquivos),
+                'limite_bytes': self.tamanho_max_bytes,
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / consultas if consultas else 0.0
+            }
+
+
+_cache_relatorios_pdf = CachePDFDisco(PDF_CACHE_CONFIG['diretorio'], PDF_CACHE_CONFIG['tamanho_max_mb'] * 1024 * 1024,
+                                     PDF_CACHE_CONFIG['idade_max_horas'] * 3600)
+
+if _cache_compartilhado is not None:
+    # Contadores por worker publicados junto com os do L2
+    _cache_compartilhado.fontes_estatisticas.update({
+        'compromissos': lambda: {'acertos': _cache_compromissos.acertos, 'falhas': _cache_compromissos.falhas},
+        'relatorios_pdf': lambda: {'acertos': _cache_relatorios_pdf.acertos, 'falhas': _cache_relatorios_pdf.falhas}
+    })
+
+
+def normalizar_parametros_compromissos(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda=2_000_000,
+                                       perfil_investimento='moderado', periodo_compra_fazenda=None):
+    """
+    Converte os parâmetros do plano em uma tupla canônica (chave de cache)
+    
+    Taxa e valores são arredondados, textos perdem espaços nas pontas e
+    períodos de compra <= 0 viram None (compra imediata), como nas rotas.
+    
+    Returns:
+        tuple: (taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                perfil_investimento, periodo_compra_fazenda)
+    """
+    periodo = int(periodo_compra_fazenda) if periodo_compra_fazenda else None
+    if periodo is not None and periodo <= 0:
+        periodo = None
+    
+    return (
+        round(float(taxa), CACHE_CONFIG['casas_taxa']),
+        int(expectativa),
+        round(float(despesas), CACHE_CONFIG['casas_valores']),
+        inicio_renda_filhos.strip() if isinstance(inicio_renda_filhos, str) else inicio_renda_filhos,
+        round(float(custo_fazenda), CACHE_CONFIG['casas_valores']),
+        str(perfil_investimento).strip(),
+        periodo
+    )
+
+
+def calcular_compromissos_cache(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda=2_000_000,
+                                perfil_investimento='moderado', periodo_compra_fazenda=None, analise_fazenda=False,
+                                contexto=None, cliente=CLIENTE_PADRAO):
+    """
+    Compromissos do plano com memoização LRU sobre parâmetros normalizados
+    
+    Com período de compra (ou analise_fazenda=True) devolve o resultado v4.3;
+    caso contrário, o v4.2. Erros de validação não são cacheados.
+    
+    Args:
+        analise_fazenda (bool): Força o cálculo v4.3 mesmo com compra imediata
+        contexto (ContextoCenario): Contexto da requisição; numa falha do cache
+            o cálculo roda nele, e a rota reaproveita a mesma projeção
+        cliente (ConstantesCliente): Constantes da família (parte da chave)
+    
+    Returns:
+        dict: Cópia do resultado do cálculo
+    """
+    chave = normalizar_parametros_compromissos(
+        taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+        perfil_investimento, periodo_compra_fazenda
+    )
+    taxa, expectativa, despesas, inicio, custo_fazenda, perfil, periodo = chave
+    usar_v43 = periodo is not None or analise_fazenda
+    
+    if contexto is None:
+        contexto = ContextoCenario(taxa, expectativa, despesas, inicio, custo_fazenda, perfil, periodo, cliente=cliente)
+    
+    if usar_v43:
+        calcular = lambda: contexto.compromissos_com_fazenda
+    else:
+        calcular = lambda: contexto.compromissos
+    
+    return _cache_compromissos.obter(chave + (usar_v43, contexto.cliente), calcular)
 
 def determinar_status(fazenda, percentual, thresholds=None):
     """
@@ -1560,84 +2983,1173 @@ def gerar_projecao_fluxo(taxa, expectativa, despesas, anos=20, inicio_renda_filh
         inicio_renda_filhos (str/int): Timing da renda dos filhos
     
     Returns:
-        list: Lista de dicionários com projeção anual
+        ProjecaoAnual: Projeção anual (visão de lista de dicionários)
     """
+    idade_inicio_filhos = _resolver_idade_inicio_filhos(inicio_renda_filhos, expectativa)
+    
+    indice_ano = np.arange(anos)
+    idade_ana = IDADE_ANA + indice_ano + 1
+    ana_viva = idade_ana <= expectativa
+    
+    # SAÍDAS ANUAIS - filhos só pesam no fluxo após o falecimento de Ana
+    despesas_ana = np.where(ana_viva, despesas * 12, 0)
+    doacoes = np.where(indice_ano < PERIODO_DOACOES, DOACOES * 12, 0)
+    renda_filhos = np.where(idade_ana >= idade_inicio_filhos, RENDA_FILHOS * 12, 0)
+    saidas = despesas_ana + doacoes + np.where(~ana_viva, renda_filhos, 0)
+    
+    # RENDIMENTOS E SALDO: Patrimônio × taxa real
+    fatores = np.full(anos, 1 + taxa / 100)
+    patrimonio, patrimonio_anterior = _recursao_patrimonio(PATRIMONIO, fatores, saidas)
+    rendimentos = patrimonio_anterior * (taxa / 100)
+    saldo_liquido = rendimentos - saidas
+    
+    # Determinar marco especial
+    marco_especial = np.full(anos, None, dtype=object)
+    marco_especial[indice_ano == PERIODO_DOACOES - 1] = f"🎁 Último ano de doações (15 anos completos)"
+    marco_especial[idade_ana == idade_inicio_filhos] = f"👨‍👩‍👧‍👦 Início da renda dos filhos"
+    
+    # Anos decorridos desde o falecimento (ano seguinte à expectativa = 1)
+    ano_pos_falecimento = np.full(anos, None, dtype=object)
+    ano_pos_falecimento[~ana_viva] = (idade_ana[~ana_viva] - expectativa).tolist()
+    
+    return ProjecaoAnual({
+        'ano': 2025 + indice_ano,
+        'idade_ana': idade_ana,
+        'ana_viva': ana_viva,
+        'patrimonio': patrimonio,
+        'rendimentos': rendimentos,
+        'saidas': saidas,
+        'saldo_liquido': saldo_liquido,
+        'despesas_ana': despesas_ana,
+        'renda_filhos': renda_filhos,
+        'doacoes': doacoes,
+        'marco_especial': marco_especial,
+        'ano_pos_falecimento': ano_pos_falecimento
+    })
+
+# ================ COMPROMISSOS VETORIZADOS (GRADES DE CENÁRIOS) ================
+def _valor_presente_np(fluxo_mensal, anos, taxa_anual):
+    """
+    Versão NumPy de valor_presente (mesma fórmula, com broadcast)
+    
+    Aceita arrays em qualquer argumento: uma chamada avalia a grade inteira.
+    """
+    taxa_anual = np.asarray(taxa_anual, dtype=float)
+    periodos = np.asarray(anos, dtype=float) * 12
+    taxa_mensal = (1 + taxa_anual / 100) ** (1 / 12) - 1
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vp = fluxo_mensal * (1 - (1 + taxa_mensal) ** (-periodos)) / taxa_mensal
+    
+    return np.where(taxa_mensal > 0, vp, fluxo_mensal * periodos)
+
+
+def _codificar_inicio_renda_filhos(inicio_renda_filhos, expectativa, cliente=CLIENTE_PADRAO):
+    """
+    Traduz inicio_renda_filhos para (idade de início, flag imediato)
     
-    patrimonio_atual = PATRIMONIO
-    fluxo = []
-    ano_falecimento = None  # Para marcar no fluxo
+    'falecimento' equivale a iniciar na própria expectativa de vida (mesmo VP
+    do ramo de idade específica >= expectativa em calcular_compromissos_v42_corrigido).
     
-    # Determinar quando inicia renda dos filhos
+    Raises:
+        ValueError: Se não for 'falecimento', 'imediato' ou uma idade
+    """
     if inicio_renda_filhos == 'falecimento':
-        idade_inicio_filhos = expectativa
+        return expectativa, False
     elif inicio_renda_filhos == 'imediato':
-        idade_inicio_filhos = IDADE_ANA
-    elif isinstance(inicio_renda_filhos, int):
-        idade_inicio_filhos = int(inicio_renda_filhos)
-    else:
-        idade_inicio_filhos = 65  # Default
+        return cliente.idade, True
     
-    for ano in range(anos):
-        idade_ana = IDADE_ANA + ano + 1
-        ano_calendario = 2025 + ano
-        
-        # RENDIMENTOS: Patrimônio × taxa real
-        rendimentos = patrimonio_atual * (taxa / 100)
+    return int(inicio_renda_filhos), False
+
+
+def _vp_renda_filhos_np(taxa, expectativa, idade_inicio, imediato=False):
+    """
+    VP da renda dos filhos com o modelo de dois períodos (v4.4), vetorizado
+    
+    - imediato: renda vitalícia completa a partir de hoje
+    - idade_inicio < expectativa: período 1 (vida de Ana) + período 2 (herança)
+    - idade_inicio >= expectativa: só herança, descontada até o início
+    """
+    taxa = np.asarray(taxa, dtype=float)
+    expectativa = np.asarray(expectativa)
+    idade_inicio = np.asarray(idade_inicio)
+    
+    anos_ate_inicio = np.maximum(0, idade_inicio - IDADE_ANA)
+    anos_vida_ana = expectativa - IDADE_ANA
+    
+    # Dois períodos (início durante a vida de Ana)
+    anos_periodo2 = np.maximum(0, EXPECTATIVA_FILHOS - (IDADE_ESTIMADA_FILHOS + anos_vida_ana))
+    vp_dois_periodos = (
+        _valor_presente_np(RENDA_FILHOS, expectativa - idade_inicio, taxa) * (1 + taxa / 100) ** (-anos_ate_inicio)
+        + _valor_presente_np(RENDA_FILHOS, anos_periodo2, taxa) * (1 + taxa / 100) ** (-anos_vida_ana)
+    )
+    
+    # Início a partir da expectativa (equivale a 'falecimento')
+    anos_heranca = np.maximum(0, EXPECTATIVA_FILHOS - (IDADE_ESTIMADA_FILHOS + anos_ate_inicio))
+    vp_heranca = _valor_presente_np(RENDA_FILHOS, anos_heranca, taxa) * (1 + taxa / 100) ** (-anos_ate_inicio)
+    
+    vp_imediato = _valor_presente_np(RENDA_FILHOS, EXPECTATIVA_FILHOS - IDADE_ESTIMADA_FILHOS, taxa)
+    
+    return np.where(imediato, vp_imediato, np.where(idade_inicio < expectativa, vp_dois_periodos, vp_heranca))
+
+
+def _janelas_renda_filhos(expectativa, idade_inicio, imediato=False, cliente=CLIENTE_PADRAO):
+    """
+    Anos do plano (1 = primeiro ano, intervalos fechados) com renda dos filhos
+    
+    Mesmas durações e descontos de _vp_renda_filhos_np, como janelas no
+    tempo: a janela 1 é a renda iniciada na idade escolhida (ou a herança,
+    se o início é a partir da expectativa) e a janela 2 o período de herança
+    do modelo de dois períodos (vazia nos demais casos).
+    
+    Returns:
+        tuple: ((início 1, fim 1), (início 2, fim 2)) - escalares ou arrays
+    """
+    expectativa = np.asarray(expectativa)
+    idade_inicio = np.asarray(idade_inicio)
+    
+    anos_ate_inicio = np.maximum(0, idade_inicio - cliente.idade)
+    anos_vida_ana = expectativa - cliente.idade
+    duracao_total = cliente.expectativa_filhos - cliente.idade_filhos
+    dois_periodos = (idade_inicio < expectativa) & ~np.asarray(imediato)
+    
+    duracao_1 = np.where(
+        imediato, duracao_total,
+        np.where(dois_periodos, expectativa - idade_inicio, np.maximum(0, duracao_total - anos_ate_inicio))
+    )
+    inicio_1 = np.where(imediato, 1, anos_ate_inicio + 1)
+    
+    duracao_2 = np.where(dois_periodos, np.maximum(0, duracao_total - anos_vida_ana), 0)
+    inicio_2 = anos_vida_ana + 1
+    
+    return (inicio_1, inicio_1 + duracao_1 - 1), (inicio_2, inicio_2 + duracao_2 - 1)
+
+
+def _determinar_status_np(fazenda, percentual, thresholds=None):
+    """Versão vetorizada de determinar_status (array de strings)"""
+    if thresholds is None:
+        thresholds = STATUS_THRESHOLDS
+    
+    fazenda = np.asarray(fazenda)
+    percentual = np.asarray(percentual)
+    
+    return np.select(
+        [
+            (fazenda < thresholds['critico_absoluto']) | (percentual < thresholds['critico_percentual']),
+            percentual < thresholds['atencao_percentual']
+        ],
+        ['crítico', 'atenção'],
+        'viável'
+    )
+
+
+def calcular_compromissos_vetorizado(taxa, expectativa, despesas, idade_inicio_filhos, custo_fazenda=2_000_000, imediato=False):
+    """
+    Avalia calcular_compromissos_v42_corrigido sobre grades de parâmetros
+    
+    Mesmas fórmulas de VP, mas com broadcast NumPy: uma grade 50×50 de
+    taxa × despesas custa algumas operações de array em vez de 2.500 chamadas
+    escalares (cada uma com validação e logs). Não valida os inputs - quem
+    chama valida a região da grade.
+    
+    Args:
+        taxa, expectativa, despesas (array-like): Parâmetros do plano (broadcast)
+        idade_inicio_filhos (array-like): Idade de Ana no início da renda dos filhos
+            (ver _codificar_inicio_renda_filhos)
+        custo_fazenda (array-like): Custo atual da fazenda (R$)
+        imediato (array-like): True onde a renda dos filhos é imediata
+    
+    Returns:
+        dict: Mesmos campos numéricos de calcular_compromissos_v42_corrigido, como arrays,
+              mais 'status'
+    """
+    taxa = np.asarray(taxa, dtype=float)
+    expectativa = np.asarray(expectativa)
+    
+    vp_despesas = _valor_presente_np(despesas, expectativa - IDADE_ANA, taxa)
+    vp_filhos = _vp_renda_filhos_np(taxa, expectativa, idade_inicio_filhos, imediato)
+    vp_doacoes = _valor_presente_np(DOACOES, PERIODO_DOACOES, taxa)
+    
+    total_compromissos = vp_despesas + vp_filhos + vp_doacoes
+    fazenda_disponivel = PATRIMONIO - total_compromissos
+    percentual_fazenda = fazenda_disponivel / PATRIMONIO * 100
+    
+    arte = np.where(fazenda_disponivel > 0, np.maximum(0, fazenda_disponivel - custo_fazenda), 0)
+    percentual_arte = arte / PATRIMONIO * 100
+    
+    return {
+        'despesas': vp_despesas,
+        'filhos': vp_filhos,
+        'doacoes': np.broadcast_to(vp_doacoes, total_compromissos.shape),
+        'total_compromissos': total_compromissos,
+        'fazenda_disponivel': fazenda_disponivel,
+        'percentual_fazenda': percentual_fazenda,
+        'arte': arte,
+        'percentual_arte': percentual_arte,
+        'status': _determinar_status_np(fazenda_disponivel, percentual_fazenda)
+    }
+
+
+def calcular_grade_sensibilidade(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                                 taxas=None, despesas_grade=None):
+    """
+    Superfície de sensibilidade taxa × despesas em uma única avaliação
+    
+    Args:
+        taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda: Cenário base
+        taxas (array-like): Eixo de taxas (% a.a.) - padrão 2% a 8%, 50 pontos
+        despesas_grade (array-like): Eixo de despesas mensais (R$) - padrão ±50% da base
+    
+    Returns:
+        dict: Eixos, superfícies (linhas = taxa, colunas = despesas) e as curvas
+              1D que passam exatamente pelo cenário base
+    """
+    if taxas is None:
+        taxas = np.linspace(2.0, 8.0, SENSIBILIDADE_CONFIG['passos'])
+    if despesas_grade is None:
+        despesas_grade = np.linspace(despesas * 0.5, despesas * 1.5, SENSIBILIDADE_CONFIG['passos'])
+    
+    # Mantém a grade dentro da região aceita por validar_inputs
+    taxas = np.clip(np.asarray(taxas, dtype=float), SENSIBILIDADE_CONFIG['taxa_min'], SENSIBILIDADE_CONFIG['taxa_max'])
+    despesas_grade = np.clip(np.asarray(despesas_grade, dtype=float), SENSIBILIDADE_CONFIG['despesas_min'], SENSIBILIDADE_CONFIG['despesas_max'])
+    
+    idade_inicio, imediato = _codificar_inicio_renda_filhos(inicio_renda_filhos, expectativa)
+    
+    superficie = calcular_compromissos_vetorizado(
+        taxas[:, None], expectativa, despesas_grade[None, :], idade_inicio, custo_fazenda, imediato
+    )
+    por_taxa = calcular_compromissos_vetorizado(taxas, expectativa, despesas, idade_inicio, custo_fazenda, imediato)
+    por_despesas = calcular_compromissos_vetorizado(taxa, expectativa, despesas_grade, idade_inicio, custo_fazenda, imediato)
+    
+    def _curva(eixo, nome, resultado):
+        return [
+            {nome: valor, 'fazenda': fazenda, 'percentual': percentual, 'arte': arte, 'status': status}
+            for valor, fazenda, percentual, arte, status in zip(
+                eixo.tolist(), resultado['fazenda_disponivel'].tolist(), resultado['percentual_fazenda'].tolist(),
+                resultado['arte'].tolist(), resultado['status'].tolist()
+            )
+        ]
+    
+    return {
+        'eixos': {
+            'taxa': taxas.tolist(),
+            'despesas': despesas_grade.tolist()
+        },
+        'superficie': {
+            campo: superficie[campo].tolist()
+            for campo in ['fazenda_disponivel', 'percentual_fazenda', 'arte', 'total_compromissos', 'status']
+        },
+        'por_taxa': _curva(taxas, 'taxa', por_taxa),
+        'por_despesas': _curva(despesas_grade, 'despesas', por_despesas)
+    }
+
+def calcular_compromissos_lote(chaves):
+    """
+    Compromissos de vários cenários numa avaliação só
+    
+    Cenários repetidos são calculados uma vez. Os de compra imediata (v4.2)
+    seguem juntos, como arrays, para calcular_compromissos_vetorizado: os
+    fatores de desconto de todas as taxas saem das mesmas operações. Os com
+    período de compra precisam da projeção e passam por calcular_compromissos_cache.
+    
+    Args:
+        chaves (list): Tuplas de normalizar_parametros_compromissos
+    
+    Returns:
+        list: Na ordem de entrada, o dict de resultado ou a exceção de validação
+    """
+    resultados = {}
+    imediatos = []
+    
+    for chave in dict.fromkeys(chaves):
+        taxa, expectativa, despesas, inicio, custo_fazenda, perfil, periodo = chave
+        try:
+            if periodo is not None:
+                resultados[chave] = calcular_compromissos_cache(*chave)
+            else:
+                validar_inputs(taxa, expectativa, despesas, inicio)
+                imediatos.append((chave,) + _codificar_inicio_renda_filhos(inicio, expectativa))
+        except (AssertionError, ValueError, TypeError) as e:
+            resultados[chave] = e
+    
+    if imediatos:
+        chaves_v42, idades_inicio, flags_imediato = zip(*imediatos)
+        parametros = np.array([chave[:3] + (chave[4],) for chave in chaves_v42], dtype=float)
+        vetor = calcular_compromissos_vetorizado(
+            parametros[:, 0], parametros[:, 1].astype(int), parametros[:, 2],
+            np.array(idades_inicio), parametros[:, 3], np.array(flags_imediato)
+        )
+        campos = ['despesas', 'filhos', 'doacoes', 'total_compromissos', 'fazenda_disponivel',
+                  'percentual_fazenda', 'arte', 'percentual_arte']
+        colunas = {campo: vetor[campo].tolist() for campo in campos}
+        for i, chave in enumerate(chaves_v42):
+            resultados[chave] = {campo: colunas[campo][i] for campo in campos}
+    
+    logger.debug(f"📦 Lote: {len(chaves)} cenários, {len(resultados)} distintos, {len(imediatos)} vetorizados")
+    return [resultados[chave] for chave in chaves]
+
+# Ordem do produto cartesiano da varredura (o último eixo varia mais rápido)
+EIXOS_VARREDURA = ('perfil', 'inicio_renda_filhos', 'expectativa', 'custo_fazenda', 'taxa', 'despesas')
+
+
+def varrer_grade_compromissos(eixos, bloco=None):
+    """
+    Percorre o produto cartesiano dos eixos em blocos vetorizados
+    
+    Cada bloco desfaz os índices lineares da grade (np.unravel_index) e passa
+    por calcular_compromissos_vetorizado; só um bloco existe em memória por
+    vez, qualquer que seja o tamanho da grade. Não valida os inputs.
+    
+    Args:
+        eixos (dict): Valores de cada eixo de EIXOS_VARREDURA
+        bloco (int): Linhas por bloco (padrão VARREDURA_CONFIG['bloco'])
+    
+    Yields:
+        list: Linhas do bloco (dicts com os parâmetros e os compromissos)
+    """
+    bloco = bloco or VARREDURA_CONFIG['bloco']
+    formato = tuple(len(eixos[nome]) for nome in EIXOS_VARREDURA)
+    total = int(np.prod(formato))
+    
+    valores = {nome: np.asarray(eixos[nome], dtype=object if nome in ('perfil', 'inicio_renda_filhos') else float)
+               for nome in EIXOS_VARREDURA}
+    valores['expectativa'] = valores['expectativa'].astype(int)
+    codificados = [_codificar_inicio_renda_filhos(inicio, 0) for inicio in eixos['inicio_renda_filhos']]
+    
+    for inicio in range(0, total, bloco):
+        indices = dict(zip(EIXOS_VARREDURA, np.unravel_index(np.arange(inicio, min(inicio + bloco, total)), formato)))
+        parametros = {nome: valores[nome][indices[nome]] for nome in EIXOS_VARREDURA}
         
-        # SAÍDAS ANUAIS
-        saidas_anuais = 0
+        # 'falecimento' começa na expectativa de cada linha
+        idade_inicio = np.array([idade for idade, _ in codificados])[indices['inicio_renda_filhos']]
+        falecimento = parametros['inicio_renda_filhos'] == 'falecimento'
+        idade_inicio = np.where(falecimento, parametros['expectativa'], idade_inicio)
+        imediato = np.array([flag for _, flag in codificados])[indices['inicio_renda_filhos']]
+        
+        resultado = calcular_compromissos_vetorizado(
+            parametros['taxa'], parametros['expectativa'], parametros['despesas'],
+            idade_inicio, parametros['custo_fazenda'], imediato
+        )
+        
+        colunas = [parametros[nome].tolist() for nome in EIXOS_VARREDURA] + [
+            resultado[campo].tolist() for campo in ('despesas', 'filhos', 'doacoes', 'total_compromissos',
+                                                    'fazenda_disponivel', 'percentual_fazenda', 'arte',
+                                                    'percentual_arte', 'status')
+        ]
+        nomes = EIXOS_VARREDURA + ('vp_despesas', 'vp_filhos', 'vp_doacoes', 'total_compromissos',
+                                   'fazenda_disponivel', 'percentual_fazenda', 'arte', 'percentual_arte', 'status')
+        yield [dict(zip(nomes, linha)) for linha in zip(*colunas)]
+
+# ================ SOLVER DE METAS (GOAL-SEEK) ================
+def _resolver_raiz_crescente(funcao, inferior, superior):
+    """
+    Raiz de uma função crescente por Newton protegido por bracketing
+    
+    Cada iteração avalia x e x + h numa única chamada vetorizada (derivada por
+    diferença finita); passos de Newton que saem do intervalo viram bissecção.
+    
+    Args:
+        funcao (callable): Recebe um array de pontos e devolve um array de valores
+        inferior, superior (float): Intervalo de busca
+    
+    Returns:
+        tuple: (raiz ou None se não houver sinal trocado no intervalo, iterações)
+    """
+    valor_inferior, valor_superior = funcao(np.array([inferior, superior]))
+    if valor_inferior >= 0:
+        return inferior, 0
+    if valor_superior < 0:
+        return None, 0
+    
+    # Ponto inicial por interpolação linear (regula falsi)
+    x = inferior + (superior - inferior) * (-valor_inferior) / (valor_superior - valor_inferior)
+    passo = SOLVER_CONFIG['passo_derivada']
+    
+    for iteracao in range(1, SOLVER_CONFIG['iteracoes_max'] + 1):
+        valor, valor_passo = funcao(np.array([x, x + passo]))
+        if abs(valor) <= SOLVER_CONFIG['tolerancia_reais']:
+            break
         
-        # Despesas de Ana (apenas se ela estiver viva)
-        if idade_ana <= expectativa:
-            saidas_anuais += despesas * 12
-            ana_viva = True
+        if valor < 0:
+            inferior = x
         else:
-            ana_viva = False
-            # MARCAR ANO DO FALECIMENTO (primeira vez que excede expectativa)
-            if ano_falecimento is None and idade_ana == expectativa + 1:
-                ano_falecimento = ano_calendario - 1  # Ano anterior foi último ano de vida
+            superior = x
         
+        derivada = (valor_passo - valor) / passo
+        proximo = x - valor / derivada if derivada > 0 else inferior - 1
+        x = proximo if inferior < proximo < superior else (inferior + superior) / 2
         
-        # Doações (apenas nos primeiros 15 anos)
-        if ano < PERIODO_DOACOES:
-            saidas_anuais += DOACOES * 12
-            
-        if idade_ana >= idade_inicio_filhos and idade_ana > expectativa:
-            saidas_anuais += RENDA_FILHOS * 12
-
-        
-        # SALDO LÍQUIDO
-        saldo_liquido = rendimentos - saidas_anuais
-        patrimonio_atual += saldo_liquido
-        
-        # Não permitir patrimônio negativo
-        patrimonio_atual = max(patrimonio_atual, 0)
-        
-        # Determinar marco especial
-        marco_especial = None
-        if ano_falecimento and ano_calendario == ano_falecimento:
-            marco_especial = f"🕊️ Falecimento de Ana (expectativa: {expectativa} anos)"
-        elif idade_ana == idade_inicio_filhos:
-            marco_especial = f"👨‍👩‍👧‍👦 Início da renda dos filhos"
-        elif ano == PERIODO_DOACOES - 1:
-            marco_especial = f"🎁 Último ano de doações (15 anos completos)"
-        
-        fluxo.append({
-            'ano': ano_calendario,
-            'idade_ana': idade_ana,
-            'ana_viva': ana_viva,
-            'patrimonio': patrimonio_atual,
-            'rendimentos': rendimentos,
-            'saidas': saidas_anuais,
-            'saldo_liquido': saldo_liquido,
-            'despesas_ana': despesas * 12 if ana_viva else 0,
-            'renda_filhos': RENDA_FILHOS * 12 if idade_ana >= idade_inicio_filhos else 0,
-            'doacoes': DOACOES * 12 if ano < PERIODO_DOACOES else 0,
-            'marco_especial': marco_especial,
-            'ano_pos_falecimento': (ano_calendario - ano_falecimento) if ano_falecimento and ano_calendario > ano_falecimento else None
+        if superior - inferior < 1e-12:
+            break
+    
+    return float(x), iteracao
+
+
+def resolver_metas_plano(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                         periodo_compra_fazenda=None, percentual_alvo=None):
+    """
+    Inverte o modelo de compromissos para as três perguntas de ajuste do plano
+    
+    - Taxa real mínima para o status 'viável' (fazenda ≥ percentual_alvo do
+      patrimônio): Newton com bracketing sobre as fórmulas fechadas de VP.
+    - Despesas mensais máximas com o mesmo alvo: o VP das despesas é linear
+      nas despesas, então a resposta é uma divisão.
+    - Custo máximo da fazenda: com compra no ano N, disponível ≥ necessário
+      equivale a V[N] ≤ U[N] × (1 - l) / (2 - l), com U[N] o patrimônio sem a
+      fazenda e l a liquidez mínima do ano; sem período, é a própria
+      fazenda disponível do v4.2.
+    
+    Args:
+        taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda: Cenário atual
+        periodo_compra_fazenda (int): Ano da compra (None = imediata)
+        percentual_alvo (float): % do patrimônio exigido na fazenda
+            (padrão: limite do status 'viável')
+    
+    Returns:
+        dict: taxa_minima, despesas_maximas e custo_fazenda_maximo
+    """
+    if percentual_alvo is None:
+        percentual_alvo = STATUS_THRESHOLDS['viavel_minimo']
+    alvo = PATRIMONIO * percentual_alvo / 100
+    
+    idade_inicio, imediato = _codificar_inicio_renda_filhos(inicio_renda_filhos, expectativa)
+    
+    # 1. Taxa mínima (fazenda é crescente na taxa)
+    def folga_por_taxa(taxas):
+        resultado = calcular_compromissos_vetorizado(taxas, expectativa, despesas, idade_inicio, custo_fazenda, imediato)
+        return resultado['fazenda_disponivel'] - alvo
+    
+    taxa_minima, iteracoes = _resolver_raiz_crescente(
+        folga_por_taxa, SENSIBILIDADE_CONFIG['taxa_min'], SENSIBILIDADE_CONFIG['taxa_max']
+    )
+    
+    # 2. Despesas máximas (fazenda = P0 - despesas × VP unitário - demais compromissos)
+    anos_vida_ana = expectativa - IDADE_ANA
+    vp_unitario = float(_valor_presente_np(1.0, anos_vida_ana, taxa))
+    demais = float(_vp_renda_filhos_np(taxa, expectativa, idade_inicio, imediato)) + float(_valor_presente_np(DOACOES, PERIODO_DOACOES, taxa))
+    folga_sem_despesas = PATRIMONIO - demais - alvo
+    
+    if vp_unitario > 0:
+        despesas_maximas = folga_sem_despesas / vp_unitario
+    else:
+        despesas_maximas = SENSIBILIDADE_CONFIG['despesas_max'] if folga_sem_despesas >= 0 else None
+    if despesas_maximas is not None:
+        if despesas_maximas < SENSIBILIDADE_CONFIG['despesas_min']:
+            despesas_maximas = None
+        else:
+            despesas_maximas = min(despesas_maximas, SENSIBILIDADE_CONFIG['despesas_max'])
+    
+    # 3. Custo máximo da fazenda
+    if periodo_compra_fazenda and periodo_compra_fazenda > 0:
+        crescimento, patrimonio_sem_fazenda = _patrimonio_sem_fazenda(
+            taxa, expectativa, despesas, inicio_renda_filhos, periodo_compra_fazenda
+        )
+        liquidez = compilar_cronograma_liquidez(periodo_compra_fazenda)[0][-1].item() / 100
+        valor_futuro_maximo = max(0.0, float(patrimonio_sem_fazenda[-1]) * (1 - liquidez) / (2 - liquidez))
+        custo_maximo = valor_futuro_maximo / (1 + INFLACAO_ESTATICA / 100) ** periodo_compra_fazenda
+    else:
+        valor_futuro_maximo = None
+        custo_maximo = max(0.0, float(folga_por_taxa(np.array([taxa]))[0] + alvo))
+    
+    return {
+        'percentual_alvo': percentual_alvo,
+        'taxa_minima': {
+            'valor': taxa_minima,
+            'atingivel': taxa_minima is not None,
+            'iteracoes': iteracoes,
+            'atual': taxa
+        },
+        'despesas_maximas': {
+            'valor': despesas_maximas,
+            'atingivel': despesas_maximas is not None,
+            'atual': despesas
+        },
+        'custo_fazenda_maximo': {
+            'valor': custo_maximo,
+            'valor_futuro': valor_futuro_maximo,
+            'periodo_compra_fazenda': periodo_compra_fazenda,
+            'atingivel': custo_maximo > 0,
+            'atual': custo_fazenda
+        }
+    }
+
+
+# ================ STRESS TESTS EM LOTE ================
+def _avaliar_cenarios_anuais(taxas, choques, expectativa, despesas, idade_inicio, imediato, crescimento_saidas, custo_fazenda):
+    """
+    Reavalia o modelo de compromissos para vários cenários de uma vez
+    
+    Cada linha é um cenário e cada coluna um ano. As saídas mensais de cada ano
+    viram um valor equivalente no fim do ano (capitalizado à taxa mensal daquele
+    ano), então com taxa constante e sem choques o resultado coincide com o VP
+    mensal de calcular_compromissos_v42_corrigido - e qualquer caminho de
+    taxa, queda de patrimônio ou crescimento das saídas entra na mesma conta.
+    
+    Args:
+        taxas (ndarray): Taxa real de cada ano, % (cenários × anos)
+        choques (ndarray): Fator multiplicativo extra sobre o patrimônio em cada ano
+        expectativa, despesas, idade_inicio, imediato (ndarray): Um valor por cenário
+        crescimento_saidas (ndarray): Multiplicador das saídas em cada ano
+        custo_fazenda (float): Custo atual da fazenda (R$)
+    
+    Returns:
+        dict: Arrays por cenário (VPs, fazenda, arte, status) e a trajetória
+              do patrimônio com a fazenda comprada hoje
+    """
+    cenarios, anos = taxas.shape
+    ano = np.arange(1, anos + 1)
+    expectativa = np.asarray(expectativa)[:, None]
+    idade_inicio = np.asarray(idade_inicio)[:, None]
+    imediato = np.asarray(imediato)[:, None]
+    
+    # Janelas da renda dos filhos (mesmos períodos do modelo v4.4)
+    anos_vida_ana = expectativa - IDADE_ANA
+    (inicio_1, fim_1), (inicio_2, fim_2) = _janelas_renda_filhos(expectativa, idade_inicio, imediato)
+    fim_filhos = np.maximum(fim_1, fim_2)
+    
+    despesas_mes = np.where(ano <= anos_vida_ana, np.asarray(despesas)[:, None], 0.0)
+    doacoes_mes = np.where(ano <= PERIODO_DOACOES, DOACOES, 0.0)
+    filhos_mes = RENDA_FILHOS * (((ano >= inicio_1) & (ano <= fim_1)).astype(float) + ((ano >= inicio_2) & (ano <= fim_2)))
+    
+    # Fluxo mensal → equivalente no fim do ano
+    taxa_anual = taxas / 100
+    taxa_mensal = (1 + taxa_anual) ** (1 / 12) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        capitalizacao = np.where(np.isclose(taxa_mensal, 0), 12.0, taxa_anual / taxa_mensal)
+    capitalizacao = capitalizacao * crescimento_saidas
+    
+    crescimento = np.cumprod((1 + taxa_anual) * choques, axis=1)
+    
+    vp_despesas = (despesas_mes * capitalizacao / crescimento).sum(axis=1)
+    vp_filhos = (filhos_mes * capitalizacao / crescimento).sum(axis=1)
+    vp_doacoes = (doacoes_mes * capitalizacao / crescimento).sum(axis=1)
+    
+    total_compromissos = vp_despesas + vp_filhos + vp_doacoes
+    fazenda_disponivel = PATRIMONIO - total_compromissos
+    percentual_fazenda = fazenda_disponivel / PATRIMONIO * 100
+    arte = np.where(fazenda_disponivel > 0, np.maximum(0, fazenda_disponivel - custo_fazenda), 0)
+    
+    # Trajetória com a fazenda comprada hoje
+    saidas = (despesas_mes + doacoes_mes + filhos_mes) * capitalizacao
+    patrimonio, _ = _recursao_patrimonio(PATRIMONIO - custo_fazenda, (1 + taxa_anual) * choques, saidas)
+    
+    ativo = ano <= np.maximum(anos_vida_ana, fim_filhos)
+    esgotado = (patrimonio <= 0) & ativo
+    ano_esgotamento = np.where(esgotado.any(axis=1), esgotado.argmax(axis=1) + 1, 0)
+    
+    return {
+        'despesas': vp_despesas,
+        'filhos': vp_filhos,
+        'doacoes': vp_doacoes,
+        'total_compromissos': total_compromissos,
+        'fazenda_disponivel': fazenda_disponivel,
+        'percentual_fazenda': percentual_fazenda,
+        'arte': arte,
+        'percentual_arte': arte / PATRIMONIO * 100,
+        'status': _determinar_status_np(fazenda_disponivel, percentual_fazenda),
+        'ano_esgotamento': ano_esgotamento,
+        'patrimonio': patrimonio
+    }
+
+
+def executar_stress_tests(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda, cenarios=None):
+    """
+    Executa todos os stress tests em uma única computação em lote
+    
+    Cada cenário de STRESS_TEST_CENARIOS vira uma linha da matriz (cenário × ano):
+    queda de patrimônio no ano N, inflação persistente sobre as saídas,
+    longevidade estendida e mudança de regime de taxa a partir do ano N.
+    A linha 'base' reproduz calcular_compromissos_v42_corrigido.
+    
+    A longevidade extrema usa max(expectativa do cenário, expectativa base),
+    para que o cenário nunca fique mais curto que o plano avaliado.
+    
+    Args:
+        taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda: Cenário base
+        cenarios (dict): Definições de cenário (padrão STRESS_TEST_CENARIOS)
+    
+    Returns:
+        dict: Nome do cenário → resultados recalculados (base incluída)
+    """
+    if cenarios is None:
+        cenarios = STRESS_TEST_CENARIOS
+    
+    nomes = ['base'] + list(cenarios)
+    definicoes = [{}] + [
+        dict(cenarios[nome], expectativa=max(cenarios[nome]['expectativa'], expectativa))
+        if 'expectativa' in cenarios[nome] else cenarios[nome]
+        for nome in cenarios
+    ]
+    
+    expectativas = np.array([d.get('expectativa', expectativa) for d in definicoes])
+    anos = int(max(expectativas.max() - IDADE_ANA, EXPECTATIVA_FILHOS - IDADE_ESTIMADA_FILHOS))
+    ano = np.arange(1, anos + 1)
+    
+    taxas = np.full((len(nomes), anos), float(taxa))
+    choques = np.ones((len(nomes), anos))
+    crescimento_saidas = np.ones((len(nomes), anos))
+    
+    for linha, definicao in enumerate(definicoes):
+        ano_choque = definicao.get('ano_choque', 1)
+        if 'queda_patrimonio' in definicao:
+            choques[linha, ano_choque - 1] = 1 - definicao['queda_patrimonio'] / 100
+        if 'reducao_taxa' in definicao:
+            taxas[linha, ano >= ano_choque] -= definicao['reducao_taxa']
+        if 'inflacao_excedente' in definicao:
+            crescimento_saidas[linha] = (1 + definicao['inflacao_excedente'] / 100) ** (ano - 1)
+    
+    idades_inicio, imediatos = zip(*[_codificar_inicio_renda_filhos(inicio_renda_filhos, exp) for exp in expectativas.tolist()])
+    
+    resultado = _avaliar_cenarios_anuais(
+        taxas, choques, expectativas, np.full(len(nomes), float(despesas)),
+        np.array(idades_inicio), np.array(imediatos), crescimento_saidas, custo_fazenda
+    )
+    
+    fazenda_base = resultado['fazenda_disponivel'][0]
+    stress = {}
+    for linha, (nome, definicao) in enumerate(zip(nomes, definicoes)):
+        ano_esgotamento = int(resultado['ano_esgotamento'][linha])
+        fazenda = float(resultado['fazenda_disponivel'][linha])
+        
+        stress[nome] = {
+            'cenario': definicao.get('descricao', 'Cenário base').format(**definicao),
+            'fazenda_resultante': fazenda,
+            'percentual_fazenda': float(resultado['percentual_fazenda'][linha]),
+            'arte_resultante': float(resultado['arte'][linha]),
+            'total_compromissos': float(resultado['total_compromissos'][linha]),
+            'variacao_fazenda': fazenda - fazenda_base,
+            'status': str(resultado['status'][linha]),
+            'ano_esgotamento': 2024 + ano_esgotamento if ano_esgotamento else None,
+            'idade_esgotamento': IDADE_ANA + ano_esgotamento if ano_esgotamento else None,
+            'patrimonio_final': float(resultado['patrimonio'][linha, -1])
+        }
+    
+    return stress
+
+# ================ SIMULAÇÃO MONTE CARLO VETORIZADA ================
+def _parametros_lognormais(retorno_esperado, volatilidade):
+    """
+    Converte retorno/volatilidade anuais (%) em parâmetros de log(1 + r)
+    
+    Usa retorno lognormal para que E[1 + r] e o desvio padrão batam com o
+    perfil, sem permitir perdas maiores que 100% em um ano.
+    """
+    media = 1 + retorno_esperado / 100
+    sigma2 = math.log(1 + (volatilidade / 100) ** 2 / media ** 2)
+    return math.log(media) - sigma2 / 2, math.sqrt(sigma2)
+
+
+def _simular_lotes_monte_carlo(patrimonio_inicial, saidas, retorno_esperado, volatilidade, caminhos, semente=None,
+                               lote_inicial=None):
+    """
+    Gera as trajetórias patrimoniais em lotes de matrizes (caminhos × anos)
+    
+    Cada lote sorteia os retornos de uma vez e resolve a recursão do
+    patrimônio com _recursao_patrimonio - nenhum laço por ano ou por caminho.
+    Os sorteios seguem a mesma sequência qualquer que seja o tamanho dos
+    lotes: com a mesma semente as trajetórias são as mesmas.
+    
+    Args:
+        lote_inicial (int): Tamanho do primeiro lote; os seguintes dobram até
+            MONTE_CARLO_CONFIG['lote'] (padrão: todos com o tamanho máximo)
+    
+    Yields:
+        ndarray: Patrimônio ao fim de cada ano para os caminhos do lote
+    """
+    rng = np.random.default_rng(semente)
+    mu, sigma = _parametros_lognormais(retorno_esperado, volatilidade)
+    
+    restantes = caminhos
+    tamanho_lote = lote_inicial or MONTE_CARLO_CONFIG['lote']
+    while restantes > 0:
+        tamanho = min(restantes, tamanho_lote)
+        fatores = np.exp(rng.normal(mu, sigma, size=(tamanho, len(saidas))))
+        patrimonio, _ = _recursao_patrimonio(patrimonio_inicial, fatores, saidas)
+        restantes -= tamanho
+        tamanho_lote = min(tamanho_lote * 2, MONTE_CARLO_CONFIG['lote'])
+        yield patrimonio
+
+
+def _resumir_monte_carlo(patrimonio):
+    """
+    Estatísticas de uma matriz de trajetórias (caminhos × anos)
+    
+    Returns:
+        dict: Probabilidade de sucesso, distribuição do ano de esgotamento,
+              bandas de percentis por ano e distribuição do patrimônio final
+    """
+    caminhos, anos = patrimonio.shape
+    percentis = MONTE_CARLO_CONFIG['percentis']
+    
+    # Ano de esgotamento: primeiro ano com patrimônio zerado (-1 = nunca)
+    esgotado = patrimonio <= 0
+    algum_esgotamento = esgotado.any(axis=1)
+    ano_esgotamento = np.where(algum_esgotamento, esgotado.argmax(axis=1), -1)
+    
+    contagem = np.bincount(ano_esgotamento[algum_esgotamento], minlength=anos)
+    acumulado = np.cumsum(contagem) / caminhos
+    distribuicao_esgotamento = [
+        {
+            'ano': 2025 + indice,
+            'idade_ana': IDADE_ANA + indice + 1,
+            'probabilidade': contagem[indice] / caminhos * 100,
+            'probabilidade_acumulada': acumulado[indice] * 100
+        }
+        for indice in np.flatnonzero(contagem).tolist()
+    ]
+    
+    bandas = np.percentile(patrimonio, percentis, axis=0)
+    final = patrimonio[:, -1]
+    contagens, limites = np.histogram(final, bins=MONTE_CARLO_CONFIG['faixas_histograma'])
+    
+    anos_esgotados = ano_esgotamento[algum_esgotamento]
+    
+    return {
+        'caminhos': caminhos,
+        'probabilidade_sucesso': float((~algum_esgotamento).mean() * 100),
+        'esgotamento': {
+            'probabilidade': float(algum_esgotamento.mean() * 100),
+            'ano_mediano': int(2025 + np.median(anos_esgotados)) if anos_esgotados.size else None,
+            'distribuicao': distribuicao_esgotamento
+        },
+        'bandas': {
+            'anos': (2025 + np.arange(anos)).tolist(),
+            **{f'p{p}': banda.tolist() for p, banda in zip(percentis, bandas)}
+        },
+        'patrimonio_final': {
+            **{f'p{p}': float(valor) for p, valor in zip(percentis, np.percentile(final, percentis))},
+            'media': float(final.mean()),
+            'histograma': {
+                'limites': limites.tolist(),
+                'contagens': contagens.tolist()
+            }
+        }
+    }
+
+
+def _preparar_monte_carlo(expectativa, despesas, inicio_renda_filhos, custo_fazenda, perfil_investimento='moderado',
+                          periodo_compra_fazenda=None, caminhos=None, anos=None, semente=None,
+                          retorno_esperado=None, volatilidade=None):
+    """
+    Parâmetros efetivos e cronograma de saídas da simulação Monte Carlo
+    (ver executar_monte_carlo)
+    
+    Returns:
+        tuple: (dict de parâmetros usados, array de saídas anuais)
+    """
+    perfil_info = ASSET_ALLOCATION_PROFILES.get(perfil_investimento, ASSET_ALLOCATION_PROFILES['moderado'])
+    retorno_esperado = perfil_info['retorno_esperado'] if retorno_esperado is None else retorno_esperado
+    volatilidade = perfil_info['volatilidade'] if volatilidade is None else volatilidade
+    
+    caminhos = min(max(int(caminhos or MONTE_CARLO_CONFIG['caminhos_padrao']), 1), MONTE_CARLO_CONFIG['caminhos_max'])
+    if anos is None:
+        anos = max(expectativa - IDADE_ANA, EXPECTATIVA_FILHOS - IDADE_ESTIMADA_FILHOS)
+    
+    if periodo_compra_fazenda and periodo_compra_fazenda > 0:
+        patrimonio_inicial = PATRIMONIO
+        valor_fazenda_futuro = calcular_valor_futuro_fazenda(custo_fazenda, periodo_compra_fazenda)
+    else:
+        patrimonio_inicial = PATRIMONIO - custo_fazenda
+        valor_fazenda_futuro = 0
+    
+    cronograma = _cronograma_saidas_com_fazenda(expectativa, despesas, anos, inicio_renda_filhos,
+                                                periodo_compra_fazenda, valor_fazenda_futuro)
+    
+    parametros = {
+        'perfil': perfil_investimento,
+        'retorno_esperado': retorno_esperado,
+        'volatilidade': volatilidade,
+        'caminhos': caminhos,
+        'anos': anos,
+        'semente': semente,
+        'patrimonio_inicial': patrimonio_inicial,
+        'periodo_compra_fazenda': periodo_compra_fazenda
+    }
+    return parametros, cronograma['saidas']
+
+
+def executar_monte_carlo(expectativa, despesas, inicio_renda_filhos, custo_fazenda, perfil_investimento='moderado',
+                         periodo_compra_fazenda=None, caminhos=None, anos=None, semente=None,
+                         retorno_esperado=None, volatilidade=None):
+    """
+    Simulação Monte Carlo do plano sobre o fluxo de caixa real
+    
+    PREMISSAS:
+    - Retornos anuais reais lognormais com retorno_esperado e volatilidade
+      do perfil (ASSET_ALLOCATION_PROFILES), salvo override explícito
+    - Saídas anuais = mesmo cronograma da projeção (despesas, doações,
+      renda dos filhos e fazenda)
+    - Fazenda sem período definido é comprada hoje (sai do patrimônio inicial)
+    - Horizonte padrão: até o fim da renda vitalícia dos filhos
+    
+    Args:
+        expectativa, despesas, inicio_renda_filhos, custo_fazenda: Parâmetros do plano
+        perfil_investimento (str): Perfil de ASSET_ALLOCATION_PROFILES
+        periodo_compra_fazenda (int): Anos até a compra da fazenda (None = hoje)
+        caminhos (int): Número de trajetórias simuladas
+        anos (int): Horizonte da simulação (anos)
+        semente (int): Semente do gerador (resultados reprodutíveis)
+        retorno_esperado, volatilidade (float): Overrides do perfil (% a.a.)
+    
+    Returns:
+        dict: Parâmetros usados + estatísticas de _resumir_monte_carlo
+    """
+    parametros, saidas = _preparar_monte_carlo(
+        expectativa, despesas, inicio_renda_filhos, custo_fazenda, perfil_investimento,
+        periodo_compra_fazenda, caminhos, anos, semente, retorno_esperado, volatilidade
+    )
+    
+    patrimonio = np.concatenate(list(_simular_lotes_monte_carlo(
+        parametros['patrimonio_inicial'], saidas, parametros['retorno_esperado'], parametros['volatilidade'],
+        parametros['caminhos'], semente
+    )))
+    
+    return {
+        'parametros': parametros,
+        **_resumir_monte_carlo(patrimonio)
+    }
+
+
+def _intervalo_confianca_sucesso(probabilidade_sucesso, caminhos):
+    """
+    Intervalo de Wilson para a probabilidade de sucesso (%) estimada com
+    `caminhos` trajetórias (não degenera perto de 0% ou 100%)
+    """
+    z = MONTE_CARLO_CONFIG['z_confianca']
+    p = probabilidade_sucesso / 100
+    denominador = 1 + z ** 2 / caminhos
+    centro = (p + z ** 2 / (2 * caminhos)) / denominador
+    meia_largura = z * math.sqrt(p * (1 - p) / caminhos + z ** 2 / (4 * caminhos ** 2)) / denominador
+    
+    return {
+        'inferior': max(0.0, centro - meia_largura) * 100,
+        'superior': min(1.0, centro + meia_largura) * 100,
+        'meia_largura': meia_largura * 100,
+        'z': z
+    }
+
+
+def executar_monte_carlo_progressivo(expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                                     perfil_investimento='moderado', periodo_compra_fazenda=None, caminhos=None,
+                                     anos=None, semente=None, retorno_esperado=None, volatilidade=None,
+                                     precisao=None):
+    """
+    Monte Carlo incremental: resumo acumulado após cada lote de trajetórias
+    
+    O primeiro lote tem MONTE_CARLO_CONFIG['lote_inicial_progresso'] caminhos
+    e os seguintes dobram, então a primeira estimativa sai rápido e o custo
+    total dos resumos fica em ~2× o do resumo final. Com a mesma semente o
+    último resumo é o de executar_monte_carlo.
+    
+    Args:
+        Os de executar_monte_carlo, mais:
+        precisao (float): Encerra antes quando a meia-largura do IC da
+            probabilidade de sucesso chega a esse valor (pontos percentuais)
+    
+    Yields:
+        dict: Parâmetros + _resumir_monte_carlo dos caminhos até aqui, com
+              'intervalo_confianca' e 'progresso'
+    """
+    parametros, saidas = _preparar_monte_carlo(
+        expectativa, despesas, inicio_renda_filhos, custo_fazenda, perfil_investimento,
+        periodo_compra_fazenda, caminhos, anos, semente, retorno_esperado, volatilidade
+    )
+    
+    acumulado = None
+    for lote in _simular_lotes_monte_carlo(parametros['patrimonio_inicial'], saidas, parametros['retorno_esperado'],
+                                           parametros['volatilidade'], parametros['caminhos'], semente,
+                                           lote_inicial=MONTE_CARLO_CONFIG['lote_inicial_progresso']):
+        acumulado = lote if acumulado is None else np.concatenate([acumulado, lote])
+        resumo = _resumir_monte_carlo(acumulado)
+        intervalo = _intervalo_confianca_sucesso(resumo['probabilidade_sucesso'], len(acumulado))
+        
+        convergiu = precisao is not None and intervalo['meia_largura'] <= precisao
+        concluido = convergiu or len(acumulado) >= parametros['caminhos']
+        
+        yield {
+            'parametros': parametros,
+            **resumo,
+            'intervalo_confianca': intervalo,
+            'progresso': {
+                'caminhos_simulados': len(acumulado),
+                'caminhos': parametros['caminhos'],
+                'percentual': len(acumulado) / parametros['caminhos'] * 100,
+                'concluido': concluido,
+                'convergiu': convergiu
+            }
+        }
+        
+        if concluido:
+            return
+
+# ================ CARTEIRA MULTI-CLIENTE ================
+def cadastro_cliente_padrao():
+    """Cadastro equivalente às constantes do módulo (o case de Ana)"""
+    return {
+        'id': 'ana',
+        'nome': 'Ana',
+        **CLIENTE_PADRAO._asdict(),
+        'taxa': 4.0,
+        'expectativa': EXPECTATIVA_ANA_DEFAULT,
+        'inicio_renda_filhos': 'falecimento',
+        'custo_fazenda': 2_000_000,
+        'perfil': 'moderado',
+        'periodo_compra_fazenda': None
+    }
+
+
+def normalizar_cadastro_cliente(dados):
+    """
+    Completa um cadastro com os valores de cadastro_cliente_padrao e tipa os campos
+    
+    Raises:
+        ValueError: Sem 'id' ou com campo numérico inválido
+    """
+    if not isinstance(dados, dict) or not str(dados.get('id', '')).strip():
+        raise ValueError("Cadastro de cliente precisa de um 'id'")
+    
+    cadastro = {**cadastro_cliente_padrao(), 'nome': dados['id'], **dados}
+    for campo in ('patrimonio', 'despesas', 'renda_filhos', 'doacoes', 'taxa', 'custo_fazenda'):
+        cadastro[campo] = float(cadastro[campo])
+    for campo in ('idade', 'periodo_doacoes', 'idade_filhos', 'expectativa_filhos', 'expectativa'):
+        cadastro[campo] = int(cadastro[campo])
+    
+    cadastro['id'] = str(cadastro['id']).strip()
+    cadastro['inicio_renda_filhos'] = str(cadastro['inicio_renda_filhos'])
+    cadastro['periodo_compra_fazenda'] = int(cadastro['periodo_compra_fazenda'] or 0) or None
+    return cadastro
+
+
+def constantes_cliente(cadastro):
+    """ConstantesCliente de um cadastro (ver normalizar_cadastro_cliente)"""
+    return ConstantesCliente(**{campo: cadastro[campo] for campo in ConstantesCliente._fields})
+
+
+def avaliar_cliente(cadastro):
+    """
+    Compromissos, status e projeção de um cliente (executado nos processos do lote)
+    
+    Returns:
+        dict: Resultado resumido, ou 'erro' se o cadastro não passar na validação
+    """
+    avaliacao = {'cliente_id': cadastro['id'], 'avaliado_em': get_current_datetime_sao_paulo().isoformat()}
+    try:
+        cliente = constantes_cliente(cadastro)
+        contexto = ContextoCenario(
+            cadastro['taxa'], cadastro['expectativa'], cadastro['despesas'], cadastro['inicio_renda_filhos'],
+            cadastro['custo_fazenda'], cadastro['perfil'], cadastro['periodo_compra_fazenda'],
+            anos_projecao=max(1, cadastro['expectativa'] - cliente.idade), cliente=cliente
+        )
+        if contexto.periodo_compra_fazenda is None:
+            resultado = contexto.compromissos
+        else:
+            resultado = contexto.compromissos_com_fazenda
+        
+        # Patrimônio projetado quando o cliente atinge a expectativa de vida
+        patrimonio = contexto.projecao.colunas['patrimonio']
+        patrimonio_expectativa = float(patrimonio[min(len(patrimonio), cadastro['expectativa'] - cliente.idade) - 1])
+        
+        avaliacao.update({
+            'status': determinar_status(resultado['fazenda_disponivel'], resultado['percentual_fazenda']),
+            'fazenda_disponivel': resultado['fazenda_disponivel'],
+            'percentual_fazenda': resultado['percentual_fazenda'],
+            'arte': resultado['arte'],
+            'percentual_arte': resultado['percentual_arte'],
+            'total_compromissos': resultado['total_compromissos'],
+            'patrimonio_expectativa': patrimonio_expectativa,
+            'erro': None
         })
+    except Exception as e:
+        avaliacao['erro'] = f"{type(e).__name__}: {e}"
     
-    return fluxo
+    return avaliacao
+
+
+class RegistroClientes:
+    """
+    Cadastro de clientes e resultados dos lotes em um arquivo SQLite
+    
+    Tabelas: clientes (cadastro em JSON), lotes (execuções com vazão) e
+    avaliacoes (status e fazenda/arte por cliente e lote). Cada operação abre
+    a própria conexão, então a mesma instância serve threads e processos.
+    """
+    
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS clientes (
+            id TEXT PRIMARY KEY,
+            nome TEXT NOT NULL,
+            cadastro TEXT NOT NULL,
+            atualizado_em TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS lotes (
+            id TEXT PRIMARY KEY,
+            inicio TEXT NOT NULL,
+            fim TEXT NOT NULL,
+            clientes INTEGER NOT NULL,
+            erros INTEGER NOT NULL,
+            workers INTEGER NOT NULL,
+            segundos REAL NOT NULL,
+            clientes_por_segundo REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS avaliacoes (
+            lote_id TEXT NOT NULL,
+            cliente_id TEXT NOT NULL,
+            avaliado_em TEXT NOT NULL,
+            status TEXT,
+            fazenda_disponivel REAL,
+            percentual_fazenda REAL,
+            arte REAL,
+            percentual_arte REAL,
+            total_compromissos REAL,
+            patrimonio_expectativa REAL,
+            erro TEXT,
+            PRIMARY KEY (lote_id, cliente_id)
+        );
+        CREATE INDEX IF NOT EXISTS avaliacoes_por_cliente ON avaliacoes (cliente_id, avaliado_em);
+    """
+    
+    CAMPOS_AVALIACAO = ('cliente_id', 'avaliado_em', 'status', 'fazenda_disponivel', 'percentual_fazenda', 'arte',
+                        'percentual_arte', 'total_compromissos', 'patrimonio_expectativa', 'erro')
+    
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._esquema_criado = False
+    
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.row_factory = sqlite3.Row
+        if not self._esquema_criado:
+            conexao.executescript(self.ESQUEMA)
+            self._esquema_criado = True
+        return conexao
+    
+    def _executar(self, sql, parametros=(), muitos=False):
+        conexao = self._conectar()
+        try:
+            with conexao:
+                if muitos:
+                    return conexao.executemany(sql, parametros).rowcount
+                return [dict(linha) for linha in conexao.execute(sql, parametros).fetchall()]
+        finally:
+            conexao.close()
+    
+    def salvar(self, dados):
+        """Insere ou atualiza um cadastro (completado por normalizar_cadastro_cliente)"""
+        cadastro = normalizar_cadastro_cliente(dados)
+        self._executar(
+            "INSERT OR REPLACE INTO clientes (id, nome, cadastro, atualizado_em) VALUES (?, ?, ?, ?)",
+            [(cadastro['id'], cadastro['nome'], json.dumps(cadastro, ensure_ascii=False),
+              get_current_datetime_sao_paulo().isoformat())],
+            muitos=True
+        )
+        return cadastro
+    
+    def importar(self, caminho_json):
+        """Salva todos os cadastros de um arquivo JSON (lista ou {"clientes": [...]})"""
+        with open(caminho_json, encoding='utf-8') as arquivo:
+            dados = json.load(arquivo)
+        if isinstance(dados, dict):
+            dados = dados.get('clientes', [])
+        return [self.salvar(item) for item in dados]
+    
+    def obter(self, cliente_id):
+        linhas = self._executar("SELECT cadastro FROM clientes WHERE id = ?", (cliente_id,))
+        return json.loads(linhas[0]['cadastro']) if linhas else None
+    
+    def remover(self, cliente_id):
+        return self._executar("DELETE FROM clientes WHERE id = ?", [(cliente_id,)], muitos=True) > 0
+    
+    def cadastros(self):
+        """Todos os cadastros, em ordem de id (entrada do lote)"""
+        return [json.loads(linha['cadastro']) for linha in self._executar("SELECT cadastro FROM clientes ORDER BY id")]
+    
+    def listar(self):
+        """Clientes com a avaliação mais recente de cada um"""
+        return self._executar("""
+            SELECT c.id, c.nome, c.atualizado_em, a.avaliado_em, a.status, a.fazenda_disponivel,
+                   a.percentual_fazenda, a.arte, a.percentual_arte, a.total_compromissos,
+                   a.patrimonio_expectativa, a.erro
+            FROM clientes c
+            LEFT JOIN avaliacoes a ON a.rowid = (
+                SELECT rowid FROM avaliacoes WHERE cliente_id = c.id ORDER BY avaliado_em DESC LIMIT 1
+            )
+            ORDER BY c.id
+        """)
+    
+    def historico(self, cliente_id, limite=None):
+        return self._executar(
+            "SELECT * FROM avaliacoes WHERE cliente_id = ? ORDER BY avaliado_em DESC LIMIT ?",
+            (cliente_id, limite or CLIENTES_CONFIG['historico'])
+        )
+    
+    def registrar_lote(self, lote, avaliacoes):
+        """Grava o resumo do lote e a avaliação de cada cliente numa transação"""
+        conexao = self._conectar()
+        try:
+            with conexao:
+                conexao.execute(
+                    "INSERT INTO lotes (id, inicio, fim, clientes, erros, workers, segundos, clientes_por_segundo) "
+                    "VALUES (:id, :inicio, :fim, :clientes, :erros, :workers, :segundos, :clientes_por_segundo)",
+                    lote
+                )
+                conexao.executemany(
+                    f"INSERT INTO avaliacoes (lote_id, {', '.join(self.CAMPOS_AVALIACAO)}) "
+                    f"VALUES (?, {', '.join('?' * len(self.CAMPOS_AVALIACAO))})",
+                    [(lote['id'],) + tuple(avaliacao.get(campo) for campo in self.CAMPOS_AVALIACAO)
+                     for avaliacao in avaliacoes]
+                )
+        finally:
+            conexao.close()
+    
+    def lotes(self, limite=10):
+        return self._executar("SELECT * FROM lotes ORDER BY inicio DESC LIMIT ?", (limite,))
+
+
+_registro_clientes = RegistroClientes(CLIENTES_CONFIG['banco'])
+
+
+def executar_lote_clientes(registro=None, workers=None):
+    """
+    Reavalia todos os clientes do registro em um ProcessPoolExecutor
+    
+    Cada cadastro vira um ContextoCenario com as constantes do cliente
+    (constantes_cliente), então as funções de compromissos e projeção são as
+    mesmas do dashboard. Os cadastros vão em blocos (chunksize) para diluir
+    o custo de serialização entre processos.
+    
+    Returns:
+        dict: Resumo do lote (também gravado em `lotes`), com clientes_por_segundo
+    """
+    registro = registro or _registro_clientes
+    workers = max(1, int(workers or CLIENTES_CONFIG['workers']))
+    cadastros = registro.cadastros()
+    
+    inicio_data = get_current_datetime_sao_paulo()
+    inicio = time.perf_counter()
+    
+    if cadastros:
+        chunksize = max(1, len(cadastros) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            avaliacoes = list(executor.map(avaliar_cliente, cadastros, chunksize=chunksize))
+    else:
+        avaliacoes = []
+    
+    segundos = time.perf_counter() - inicio
+    lote = {
+        'id': uuid.uuid4().hex,
+        'inicio': inicio_data.isoformat(),
+        'fim': get_current_datetime_sao_paulo().isoformat(),
+        'clientes': len(avaliacoes),
+        'erros': sum(1 for avaliacao in avaliacoes if avaliacao['erro']),
+        'workers': workers,
+        'segundos': segundos,
+        'clientes_por_segundo': len(avaliacoes) / segundos if segundos > 0 else 0.0
+    }
+    registro.registrar_lote(lote, avaliacoes)
+    
+    logger.info(f"👪 Lote de clientes: {lote['clientes']} avaliados ({lote['erros']} erros) em {segundos:.1f} s "
+                f"- {lote['clientes_por_segundo']:.1f} clientes/s com {workers} processos")
+    return lote
 
 # ================ FORMATAÇÃO MONETÁRIA DOCUMENTADA ================
 def format_currency(value, compact=False):
@@ -1757,10 +4269,57 @@ def format_datetime_report(dt=None):
     
     return dt.strftime('%d/%m/%Y às %H:%M (horário de Brasília)')
 
+# ================ CARREGAMENTO SOB DEMANDA (REPORTLAB / MATPLOTLIB) ================
+@lru_cache(maxsize=None)
+def carregar_reportlab():
+    """
+    Importa o reportlab (platypus e graphics) no primeiro relatório
+    
+    Os nomes viram globais do módulo, então as funções de PDF e de gráficos
+    usam Paragraph, Table, colors, inch etc. normalmente depois da chamada.
+    Workers que só atendem a API nunca pagam essa importação.
+    """
+    global letter, A4, colors, getSampleStyleSheet, ParagraphStyle, inch
+    global SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+    global TA_CENTER, TA_LEFT, TA_RIGHT, Drawing, Line, String, Pie, LinePlot, Legend, makeMarker
+    
+    inicio = time.perf_counter()
+    from reportlab.lib.pagesizes import letter, A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+    from reportlab.platypus.flowables import PageBreak
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+    from reportlab.graphics.shapes import Drawing, Line, String
+    from reportlab.graphics.charts.piecharts import Pie
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.charts.legends import Legend
+    from reportlab.graphics.widgets.markers import makeMarker
+    
+    logger.info(f"📦 reportlab carregado em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return True
+
+
+@lru_cache(maxsize=None)
+def carregar_matplotlib():
+    """Importa matplotlib/pyplot (backend Agg) só quando um fallback PNG é necessário"""
+    global matplotlib, plt
+    
+    inicio = time.perf_counter()
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend
+    import matplotlib.pyplot as plt
+    
+    logger.info(f"📦 matplotlib carregado em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    return True
+
+
 # ================ FUNÇÕES DE GERAÇÃO DE PDF ================
 
 def gerar_pdf_executivo(gerador):
     """Gera PDF do relatório executivo"""
+    carregar_reportlab()
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, 
                            topMargin=0.8*inch, bottomMargin=0.8*inch,
@@ -1806,6 +4365,8 @@ def criar_pagina_sumario_executivo(gerador, styles):
     dados_exec = gerador.gerar_dados_executivo()
     
     # Cabeçalho
+    elementos.append(logo_para_pdf())
+    elementos.append(Spacer(1, 12))
     elementos.append(Paragraph("CIMO MULTI FAMILY OFFICE", styles['CustomTitle']))
     elementos.append(Paragraph("PLANO PATRIMONIAL - ANA", styles['Heading1']))
     elementos.append(Paragraph(f"Data: {gerador.timestamp.strftime('%d/%m/%Y às %H:%M')}", styles['Normal']))
@@ -1915,7 +4476,17 @@ def criar_pagina_breakdown_financeiro(gerador, styles):
     ]))
     
     elementos.append(compromissos_table)
-    elementos.append(Spacer(1, 30))
+    elementos.append(Spacer(1, 20))
+    
+    grafico = elemento_grafico(desenhar_grafico_compromissos, criar_grafico_compromissos, {
+        'despesas': gerador.dados.get('despesas', 0),
+        'filhos': gerador.dados.get('filhos', 0),
+        'doacoes': gerador.dados.get('doacoes', 0),
+        'fazenda': gerador.dados.get('fazenda_disponivel', 0)
+    })
+    if grafico is not None:
+        elementos.append(grafico)
+        elementos.append(Spacer(1, 20))
     
     # Objetivos pessoais
     elementos.append(Paragraph("🏡 OBJETIVOS PESSOAIS:", styles['CustomHeading']))
@@ -2029,6 +4600,7 @@ def criar_pagina_cenarios_recomendacoes(gerador, styles):
 
 def gerar_pdf_tecnico(gerador):
     """Gera PDF do relatório técnico (placeholder)"""
+    carregar_reportlab()
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     
@@ -2043,6 +4615,24 @@ def gerar_pdf_tecnico(gerador):
     dados_tec = gerador.gerar_dados_tecnico()
     story.append(Paragraph("METODOLOGIA:", styles['Heading2']))
     story.append(Paragraph(f"Fórmula VP: {dados_tec['metodologia']['valor_presente']['formula']}", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    # Trajetória do patrimônio (motor mensal agregado por ano)
+    params = gerador.params
+    try:
+        projecao = ContextoCenario(
+            params['taxa'], params['expectativa'], params['despesas'], params['inicio_renda_filhos'],
+            params['custo_fazenda'], params['perfil'],
+            anos_projecao=min(40, max(20, (params['expectativa'] - IDADE_ANA) + 10))
+        ).projecao
+        grafico = elemento_grafico(desenhar_grafico_patrimonio, None, projecao, expectativa=params['expectativa'])
+    except Exception as e:
+        logger.warning(f"⚠️ Erro na projeção do relatório técnico: {e}")
+        grafico = None
+    
+    if grafico is not None:
+        story.append(Paragraph("PROJEÇÃO DO PATRIMÔNIO:", styles['Heading2']))
+        story.append(grafico)
     
     doc.build(story)
     buffer.seek(0)
@@ -2050,6 +4640,7 @@ def gerar_pdf_tecnico(gerador):
 
 def gerar_pdf_simulacao(gerador):
     """Gera PDF do relatório de simulação (placeholder)"""
+    carregar_reportlab()
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     
@@ -2064,22 +4655,515 @@ def gerar_pdf_simulacao(gerador):
     dados_sim = gerador.gerar_dados_simulacao()
     story.append(Paragraph("STRESS TESTS:", styles['Heading2']))
     
+    stress_data = [
+        ['Cenário', 'Fazenda', 'Arte', 'Esgotamento']
+    ]
+    
     for nome, dados in dados_sim['stress_tests'].items():
-        if 'erro' not in dados:
-            story.append(Paragraph(f"• {dados.get('cenario', nome)}", styles['Normal']))
+        if isinstance(dados, dict) and 'cenario' in dados:
+            stress_data.append([
+                Paragraph(dados['cenario'], styles['Normal']),
+                format_currency(dados['fazenda_resultante'], True),
+                format_currency(dados['arte_resultante'], True),
+                str(dados['ano_esgotamento'] or '—')
+            ])
+    
+    stress_table = Table(stress_data, colWidths=[2.8*inch, 1.2*inch, 1.2*inch, 1*inch])
+    stress_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#dc2626')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e2e8f0'))
+    ]))
+    story.append(stress_table)
+    story.append(Spacer(1, 20))
+    
+    sensibilidade = dados_sim['sensibilidade_completa'].get('por_taxa')
+    if sensibilidade:
+        grafico = elemento_grafico(desenhar_grafico_sensibilidade, criar_grafico_sensibilidade, sensibilidade)
+        if grafico is not None:
+            story.append(Paragraph("SENSIBILIDADE À TAXA DE RETORNO:", styles['Heading2']))
+            story.append(grafico)
     
     doc.build(story)
     buffer.seek(0)
     return buffer
 
 
+GERADORES_PDF = {
+    'executivo': gerar_pdf_executivo,
+    'tecnico': gerar_pdf_tecnico,
+    'simulacao': gerar_pdf_simulacao
+}
+
+
+def parametros_relatorio(origem):
+    """
+    Parâmetros do relatório a partir da query string ou do corpo JSON
+    
+    Args:
+        origem (Mapping): request.args ou dict do corpo da requisição
+    
+    Returns:
+        dict: Parâmetros tipados com os padrões do dashboard
+    """
+    return {
+        'taxa': float(origem.get('taxa', 4.0)),
+        'expectativa': int(origem.get('expectativa', 90)),
+        'despesas': float(origem.get('despesas', 150000)),
+        'perfil': origem.get('perfil', 'moderado'),
+        'inicio_renda_filhos': origem.get('inicio_renda_filhos', 'falecimento'),
+        'custo_fazenda': float(origem.get('custo_fazenda', 2000000))
+    }
+
+
+def gerar_relatorio_pdf(tipo, params):
+    """
+    Bytes do relatório PDF, passando pelo cache em disco
+    
+    Args:
+        tipo (str): Chave de GERADORES_PDF
+        params (dict): Saída de parametros_relatorio
+    
+    Returns:
+        bytes: Conteúdo do PDF
+    """
+    def gerar_pdf():
+        # Calcular dados base (memoizado)
+        dados_base = calcular_compromissos_cache(
+            params['taxa'], 
+            params['expectativa'],
+            params['despesas'],
+            params['inicio_renda_filhos'],
+            params['custo_fazenda'],
+            params['perfil']
+        )
+        
+        # Gerar relatório específico
+        gerador = RelatorioGenerator(params, dados_base)
+        return GERADORES_PDF[tipo](gerador).getvalue()
+    
+    # PDF idêntico já gerado? (mesmo tipo, parâmetros, versão do modelo e código:
+    # mudar gráficos ou layout invalida o que o deploy anterior deixou em disco)
+    chave = (VERSAO_MODELO, assinatura_codigo(), tipo) + normalizar_parametros_compromissos(
+        params['taxa'], params['expectativa'], params['despesas'],
+        params['inicio_renda_filhos'], params['custo_fazenda'], params['perfil']
+    )
+    return _cache_relatorios_pdf.obter(chave, gerar_pdf)
+
+
+def resposta_pdf(dados, tipo):
+    """Resposta de download do PDF"""
+    response = make_response(dados)
+    response.headers['Content-Type'] = 'application/pdf'
+    response.headers['Content-Disposition'] = f'attachment; filename=relatorio_{tipo}_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
+    return response
+
+
+# ================ FILA DE RELATÓRIOS ASSÍNCRONOS ================
+class FilaRelatorios:
+    """
+    Jobs de geração de PDF num pool de threads limitado, com estado compartilhado
+    
+    A requisição só registra o job e devolve o id; a renderização roda nas
+    threads do pool do worker que recebeu o pedido, então downloads
+    simultâneos não prendem as threads que atendem /api/dados. Situação,
+    tempos e o PDF pronto ficam numa tabela SQLite (WAL) no diretório do
+    cache de PDFs: com vários workers do gunicorn, a consulta e o download
+    funcionam em qualquer um deles, e o limite da fila vale para todos. O
+    pool é criado no primeiro job (depois de um eventual fork do servidor).
+    Os concluídos expiram após expiracao_segundos; um job pendente além
+    desse prazo (worker encerrado no meio da geração) vira erro.
+    
+    Args:
+        caminho (str): Arquivo SQLite dos jobs
+        workers (int): Threads de geração (por worker)
+        fila_max (int): Jobs pendentes aceitos ao mesmo tempo
+        jobs_max (int): Jobs mantidos no registro
+        expiracao_segundos (float): Validade de um job concluído
+    """
+    
+    PENDENTES = ('na_fila', 'processando')
+    
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            tipo TEXT NOT NULL,
+            parametros TEXT NOT NULL,
+            status TEXT NOT NULL,
+            criado_em REAL NOT NULL,
+            iniciado_em REAL,
+            concluido_em REAL,
+            erro TEXT,
+            pdf BLOB
+        );
+        CREATE INDEX IF NOT EXISTS jobs_por_status ON jobs (status, concluido_em);
+    """
+    
+    def __init__(self, caminho, workers, fila_max, jobs_max, expiracao_segundos):
+        self.caminho = caminho
+        self.workers = workers
+        self.fila_max = fila_max
+        self.jobs_max = jobs_max
+        self.expiracao_segundos = expiracao_segundos
+        self._executor = None
+        self._esquema_criado = False
+    
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cimo-relatorio')
+        return self._executor
+    
+    def _conectar(self):
+        """Conexão própria da operação (serve threads e processos)"""
+        if not self._esquema_criado:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        conexao.row_factory = sqlite3.Row
+        if not self._esquema_criado:
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.executescript(self.ESQUEMA)
+            self._esquema_criado = True
+        return conexao
+    
+    def _transacao(self, operacao):
+        """Executa operacao(conexao) numa transação de escrita (BEGIN IMMEDIATE)"""
+        conexao = self._conectar()
+        try:
+            conexao.execute('BEGIN IMMEDIATE')
+            try:
+                resultado = operacao(conexao)
+            except BaseException:
+                conexao.execute('ROLLBACK')
+                raise
+            conexao.execute('COMMIT')
+            return resultado
+        finally:
+            conexao.close()
+    
+    def _consultar(self, sql, parametros=()):
+        conexao = self._conectar()
+        try:
+            return conexao.execute(sql, parametros).fetchall()
+        finally:
+            conexao.close()
+    
+    def _expirar(self, conexao, agora):
+        """Vence pendentes órfãos, remove concluídos vencidos e o excedente do registro"""
+        conexao.execute(
+            "UPDATE jobs SET status = 'erro', erro = 'Job interrompido (worker encerrado)', concluido_em = ? "
+            "WHERE status IN ('na_fila', 'processando') AND criado_em < ?",
+            (agora, agora - self.expiracao_segundos)
+        )
+        conexao.execute(
+            "DELETE FROM jobs WHERE status NOT IN ('na_fila', 'processando') AND concluido_em < ?",
+            (agora - self.expiracao_segundos,)
+        )
+        conexao.execute("""
+            DELETE FROM jobs WHERE id IN (
+                SELECT id FROM jobs WHERE status NOT IN ('na_fila', 'processando')
+                ORDER BY concluido_em DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.jobs_max,))
+    
+    def submeter(self, tipo, params):
+        """
+        Registra um job e o envia ao pool deste worker
+        
+        Returns:
+            str: Id do job
+        
+        Raises:
+            RuntimeError: Se a fila estiver cheia
+        """
+        def registrar(conexao):
+            agora = time.time()
+            self._expirar(conexao, agora)
+            pendentes = conexao.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('na_fila', 'processando')"
+            ).fetchone()[0]
+            if pendentes >= self.fila_max:
+                raise RuntimeError(f'Fila de relatórios cheia ({pendentes} jobs pendentes)')
+            
+            job_id = uuid.uuid4().hex
+            conexao.execute(
+                "INSERT INTO jobs (id, tipo, parametros, status, criado_em) VALUES (?, ?, ?, 'na_fila', ?)",
+                (job_id, tipo, json.dumps(params, ensure_ascii=False, default=str), agora)
+            )
+            return job_id
+        
+        job_id = self._transacao(registrar)
+        self._pool().submit(self._executar, job_id)
+        return job_id
+    
+    def _executar(self, job_id):
+        def iniciar(conexao):
+            linha = conexao.execute(
+                "SELECT tipo, parametros FROM jobs WHERE id = ? AND status = 'na_fila'", (job_id,)
+            ).fetchone()
+            if linha is not None:
+                conexao.execute(
+                    "UPDATE jobs SET status = 'processando', iniciado_em = ? WHERE id = ?", (time.time(), job_id)
+                )
+            return linha
+        
+        linha = self._transacao(iniciar)
+        if linha is None:
+            return
+        
+        tipo = linha['tipo']
+        try:
+            pdf = gerar_relatorio_pdf(tipo, json.loads(linha['parametros']))
+            resultado = ('concluido', None, pdf)
+        except Exception as e:
+            logger.error(f"❌ Erro no job de relatório {job_id} ({tipo}): {e}")
+            resultado = ('erro', str(e), None)
+        
+        self._transacao(lambda conexao: conexao.execute(
+            "UPDATE jobs SET status = ?, erro = ?, pdf = ?, concluido_em = ? WHERE id = ?",
+            resultado + (time.time(), job_id)
+        ))
+    
+    def consultar(self, job_id):
+        """
+        Situação do job (sem o conteúdo do PDF)
+        
+        Returns:
+            dict/None: Status, tempos em ms e tamanho; None se o job não existe
+        """
+        linhas = self._consultar(
+            "SELECT id, tipo, parametros, status, erro, criado_em, iniciado_em, concluido_em, "
+            "LENGTH(pdf) AS tamanho FROM jobs WHERE id = ?", (job_id,)
+        )
+        if not linhas:
+            return None
+        job = linhas[0]
+        
+        agora = time.time()
+        inicio = job['iniciado_em']
+        fim = job['concluido_em']
+        return {
+            'id': job['id'],
+            'tipo': job['tipo'],
+            'parametros': json.loads(job['parametros']),
+            'status': job['status'],
+            'erro': job['erro'],
+            'criado_em': datetime.fromtimestamp(job['criado_em']).isoformat(),
+            'tempo_fila_ms': ((inicio or agora) - job['criado_em']) * 1000,
+            'tempo_geracao_ms': ((fim or agora) - inicio) * 1000 if inicio else None,
+            'tamanho_bytes': job['tamanho']
+        }
+    
+    def obter_pdf(self, job_id):
+        """(status, bytes do PDF ou None); status None se o job não existe"""
+        linhas = self._consultar("SELECT status, pdf FROM jobs WHERE id = ?", (job_id,))
+        if not linhas:
+            return None, None
+        return linhas[0]['status'], linhas[0]['pdf']
+    
+    def estatisticas(self):
+        """Contagem de jobs por status (todos os workers)"""
+        contagem = {
+            linha['status']: linha['total']
+            for linha in self._consultar("SELECT status, COUNT(*) AS total FROM jobs GROUP BY status")
+        }
+        return {'workers': self.workers, 'fila_max': self.fila_max, 'jobs': contagem}
 
 
+_fila_relatorios = FilaRelatorios(JOBS_CONFIG['banco'], JOBS_CONFIG['workers'], JOBS_CONFIG['fila_max'],
+                                  JOBS_CONFIG['jobs_max'], JOBS_CONFIG['expiracao_segundos'])
 
-# ================ FUNÇÕES DE GRÁFICOS (mantidas do original) ================
+
+# ================ GRÁFICOS VETORIAIS (reportlab.graphics) ================
+# Desenhos vetoriais entram direto na story do PDF: sem rasterizar, sem
+# base64 e nítidos em qualquer zoom. Os gráficos matplotlib abaixo ficam só
+# como fallback (elemento_grafico).
+CORES_GRAFICOS = ['#1e3a8a', '#3b82f6', '#64748b', '#059669']
+LARGURA_GRAFICO, ALTURA_GRAFICO = 6 * 72, 3 * 72  # Pontos (6 × 3 polegadas)
+
+
+def _titulo_grafico(desenho, texto):
+    """Título centralizado no topo do desenho"""
+    desenho.add(String(desenho.width / 2, desenho.height - 14, texto, fontName='Helvetica-Bold',
+                       fontSize=12, fillColor=colors.HexColor('#1e3a8a'), textAnchor='middle'))
+
+
+def _grafico_linha(desenho, pontos, cor, preenchido=True):
+    """LinePlot padrão (área opcional) ocupando o desenho abaixo do título"""
+    xs = [x for x, _ in pontos]
+    ys = [y for _, y in pontos]
+    minimo, maximo = min(min(ys), 0), max(max(ys), 0)
+    margem = (maximo - minimo) * 0.1 or 1
+    
+    grafico = LinePlot()
+    grafico.x, grafico.y = 50, 35
+    grafico.width, grafico.height = desenho.width - 70, desenho.height - 70
+    grafico.data = [pontos]
+    grafico.lines[0].strokeColor = colors.HexColor(cor)
+    grafico.lines[0].strokeWidth = 2
+    if preenchido:
+        grafico.lines[0].inFill = True
+        base = colors.HexColor(cor)
+        grafico.lines[0].fillColor = colors.Color(base.red, base.green, base.blue, alpha=0.3)
+    
+    grafico.xValueAxis.valueMin, grafico.xValueAxis.valueMax = min(xs), max(xs)
+    grafico.yValueAxis.valueMin, grafico.yValueAxis.valueMax = minimo - margem, maximo + margem
+    grafico.yValueAxis.visibleGrid = True
+    grafico.yValueAxis.gridStrokeColor = colors.HexColor('#e2e8f0')
+    for eixo in (grafico.xValueAxis, grafico.yValueAxis):
+        eixo.labels.fontName = 'Helvetica'
+        eixo.labels.fontSize = 8
+    
+    desenho.add(grafico)
+    return grafico
+
+
+def desenhar_grafico_compromissos(resultado, largura=LARGURA_GRAFICO, altura=ALTURA_GRAFICO):
+    """Pizza dos compromissos e da fazenda (vetorial)"""
+    carregar_reportlab()
+    rotulos = ['Despesas Ana', 'Renda Filhos', 'Doações', 'Fazenda']
+    valores = [
+        resultado['despesas'],
+        resultado['filhos'],
+        resultado['doacoes'],
+        max(resultado['fazenda'], 0)
+    ]
+    total = sum(valores)
+    if total <= 0:
+        raise ValueError('Sem valores para o gráfico de compromissos')
+    
+    desenho = Drawing(largura, altura)
+    _titulo_grafico(desenho, 'Breakdown dos Compromissos')
+    
+    pizza = Pie()
+    pizza.x, pizza.y = 20, 10
+    pizza.width = pizza.height = altura - 40
+    pizza.data = valores
+    pizza.labels = [f'{valor / total * 100:.1f}%' if valor / total >= 0.04 else '' for valor in valores]
+    pizza.startAngle = 90
+    pizza.direction = 'clockwise'
+    pizza.slices.strokeColor = colors.white
+    pizza.slices.labelRadius = 0.7
+    pizza.slices.fontName = 'Helvetica-Bold'
+    pizza.slices.fontSize = 8
+    pizza.slices.fontColor = colors.white
+    for indice, cor in enumerate(CORES_GRAFICOS):
+        pizza.slices[indice].fillColor = colors.HexColor(cor)
+    desenho.add(pizza)
+    
+    legenda = Legend()
+    legenda.x = pizza.x + pizza.width + 30
+    legenda.y = pizza.y + pizza.height * 0.75
+    legenda.fontName = 'Helvetica'
+    legenda.fontSize = 9
+    legenda.deltay = 14
+    legenda.alignment = 'right'
+    legenda.colorNamePairs = [
+        (colors.HexColor(cor), f'{rotulo}: {format_currency(valor, True)}')
+        for cor, rotulo, valor in zip(CORES_GRAFICOS, rotulos, valores)
+    ]
+    desenho.add(legenda)
+    
+    return desenho
+
+
+def desenhar_grafico_sensibilidade(sensibilidade, largura=LARGURA_GRAFICO, altura=ALTURA_GRAFICO):
+    """Valor da fazenda por taxa de retorno - linha com área e referência no zero (vetorial)"""
+    carregar_reportlab()
+    pontos = [(item['taxa'], item['fazenda'] / 1000000) for item in sensibilidade]  # Em milhões
+    
+    desenho = Drawing(largura, altura)
+    _titulo_grafico(desenho, 'Análise de Sensibilidade - Taxa de Retorno')
+    
+    grafico = _grafico_linha(desenho, pontos, CORES_GRAFICOS[0])
+    grafico.lines[0].symbol = makeMarker('FilledCircle', size=5, fillColor=colors.HexColor(CORES_GRAFICOS[0]))
+    grafico.xValueAxis.labelTextFormat = '%g%%'
+    grafico.yValueAxis.labelTextFormat = '%.0f'
+    
+    # Linha de referência no zero
+    eixo_y = grafico.yValueAxis
+    if eixo_y.valueMin < 0 < eixo_y.valueMax:
+        y_zero = grafico.y + (0 - eixo_y.valueMin) / (eixo_y.valueMax - eixo_y.valueMin) * grafico.height
+        desenho.add(Line(grafico.x, y_zero, grafico.x + grafico.width, y_zero,
+                         strokeColor=colors.red, strokeDashArray=[4, 3], strokeWidth=1))
+    
+    desenho.add(String(grafico.x + grafico.width / 2, 8, 'Taxa de Retorno Real (%)', fontName='Helvetica',
+                       fontSize=9, textAnchor='middle'))
+    desenho.add(String(grafico.x, grafico.y + grafico.height + 6, 'Valor Fazenda (R$ milhões)', fontName='Helvetica',
+                       fontSize=8, fillColor=colors.HexColor('#64748b')))
+    
+    return desenho
+
+
+def desenhar_grafico_patrimonio(projecao, expectativa=None, largura=LARGURA_GRAFICO, altura=ALTURA_GRAFICO):
+    """Trajetória do patrimônio ano a ano em área, com marca na expectativa de vida (vetorial)"""
+    carregar_reportlab()
+    colunas = projecao.colunas
+    pontos = list(zip(colunas['ano'].tolist(), (colunas['patrimonio'] / 1000000).tolist()))  # Em milhões
+    
+    desenho = Drawing(largura, altura)
+    _titulo_grafico(desenho, 'Projeção do Patrimônio')
+    
+    grafico = _grafico_linha(desenho, pontos, CORES_GRAFICOS[3])
+    grafico.xValueAxis.labelTextFormat = '%d'
+    grafico.yValueAxis.labelTextFormat = '%.0f'
+    
+    if expectativa is not None:
+        ano_falecimento = 2024 + (expectativa - IDADE_ANA)
+        eixo_x = grafico.xValueAxis
+        if eixo_x.valueMin < ano_falecimento < eixo_x.valueMax:
+            x_marco = grafico.x + (ano_falecimento - eixo_x.valueMin) / (eixo_x.valueMax - eixo_x.valueMin) * grafico.width
+            desenho.add(Line(x_marco, grafico.y, x_marco, grafico.y + grafico.height,
+                             strokeColor=colors.HexColor('#64748b'), strokeDashArray=[4, 3], strokeWidth=1))
+            desenho.add(String(x_marco + 3, grafico.y + grafico.height - 10, f'Expectativa ({expectativa} anos)',
+                               fontName='Helvetica', fontSize=7, fillColor=colors.HexColor('#64748b')))
+    
+    desenho.add(String(grafico.x, grafico.y + grafico.height + 6, 'Patrimônio (R$ milhões)', fontName='Helvetica',
+                       fontSize=8, fillColor=colors.HexColor('#64748b')))
+    
+    return desenho
+
+
+def elemento_grafico(vetorial, fallback, *args, largura=LARGURA_GRAFICO, altura=ALTURA_GRAFICO, **kwargs):
+    """
+    Gráfico pronto para a story do PDF
+    
+    Usa o desenho vetorial; se ele falhar e houver fallback matplotlib
+    (função que devolve PNG em base64), insere a imagem rasterizada.
+    
+    Args:
+        vetorial (callable): desenhar_grafico_* (recebe largura/altura)
+        fallback (callable): criar_grafico_* ou None
+        *args, **kwargs: Dados do gráfico
+    
+    Returns:
+        Drawing/Image/None: Flowable do gráfico (None se nenhum backend conseguiu)
+    """
+    try:
+        return vetorial(*args, largura=largura, altura=altura, **kwargs)
+    except Exception as e:
+        logger.warning(f"⚠️ Erro no gráfico vetorial {vetorial.__name__}: {e}")
+    
+    if fallback is not None:
+        png = fallback(*args)
+        if png:
+            carregar_reportlab()
+            imagem = Image(io.BytesIO(base64.b64decode(png)))
+            proporcao = imagem.imageHeight / imagem.imageWidth
+            imagem.drawWidth, imagem.drawHeight = largura, largura * proporcao
+            return imagem
+    
+    return None
+
+
+# ================ FUNÇÕES DE GRÁFICOS (matplotlib - fallback) ================
 def criar_grafico_compromissos(resultado):
     """Cria gráfico de compromissos em base64"""
     try:
+        carregar_matplotlib()
         fig, ax = plt.subplots(figsize=(8, 6))
         
         labels = ['Despesas Ana', 'Renda Filhos', 'Doações', 'Fazenda']
@@ -2109,12 +5193,13 @@ def criar_grafico_compromissos(resultado):
         
         return graphic
     except Exception as e:
-        print(f"❌ Erro ao criar gráfico de compromissos: {e}")
+        logger.error(f"❌ Erro ao criar gráfico de compromissos: {e}")
         return None
 
 def criar_grafico_sensibilidade(sensibilidade):
     """Cria gráfico de sensibilidade em base64"""
     try:
+        carregar_matplotlib()
         fig, ax = plt.subplots(figsize=(10, 6))
         
         taxas = [item['taxa'] for item in sensibilidade]
@@ -2145,81 +5230,154 @@ def criar_grafico_sensibilidade(sensibilidade):
         
         return graphic
     except Exception as e:
-        print(f"❌ Erro ao criar gráfico de sensibilidade: {e}")
+        logger.error(f"❌ Erro ao criar gráfico de sensibilidade: {e}")
+        return None
+
+# ================ SISTEMA DE LOGO IMPLEMENTADO DA PRIMEIRA VERSÃO ================
+
+# Relativo ao módulo (não ao diretório de trabalho): gunicorn iniciado fora
+# do repositório também encontra a logo real
+LOGO_CAMINHO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'logo.png')
+
+
+@lru_cache(maxsize=1)
+def ler_logo_arquivo():
+    """
+    Bytes de templates/logo.png, lidos uma única vez (None se ausente)
+    
+    Fonte única da logo real: obter_logo (rota /logo.png) e logo_para_pdf
+    (relatórios) leem daqui, então nenhum PDF reabre o arquivo e a ausência
+    é registrada uma vez por processo, não a cada renderização.
+    """
+    try:
+        with open(LOGO_CAMINHO, 'rb') as arquivo:
+            return arquivo.read()
+    except OSError as e:
+        logger.warning(f"⚠️ Logo PNG não encontrada, usando fallback: {LOGO_CAMINHO} ({e})")
         return None
 
-# ================ SISTEMA DE LOGO IMPLEMENTADO DA PRIMEIRA VERSÃO ================
+
+def gerar_logo_png_fallback():
+    """Gera o PNG de fallback da logo (texto CIMO) com matplotlib"""
+    carregar_matplotlib()
+    fig, ax = plt.subplots(figsize=(4, 1.2), dpi=100)
+    ax.set_xlim(0, 10)
+    ax.set_ylim(0, 3)
+    ax.axis('off')
+    
+    # Texto CIMO
+    ax.text(5, 1.5, 'CIMO', fontsize=24, fontweight='bold', 
+            ha='center', va='center', color='#1e3a8a')
+    ax.text(5, 0.8, 'Multi Family Office', fontsize=8, 
+            ha='center', va='center', color='#64748b')
+    
+    # Salvar em buffer
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', bbox_inches='tight', 
+               transparent=True, facecolor='none', dpi=150)
+    plt.close()
+    
+    logger.warning("⚠️ Usando logo PNG de fallback")
+    return buffer.getvalue()
+
+
+@lru_cache(maxsize=1)
+def obter_logo():
+    """
+    Logo servida pela aplicação: (bytes PNG, ETag, gerada)
+    
+    O arquivo real é lido uma vez; sem ele, o fallback é gerado uma vez no
+    primeiro pedido (matplotlib fica fora do boot). O ETag é o hash do
+    conteúdo, então também serve de versão para a URL imutável.
+    """
+    dados = ler_logo_arquivo()
+    gerada = dados is None
+    if gerada:
+        dados = gerar_logo_png_fallback()
+    return dados, hashlib.sha256(dados).hexdigest()[:16], gerada
+
+
+def url_logo():
+    """URL versionada da logo (/logo.png?v=<hash>), cacheável para sempre"""
+    try:
+        return f"/logo.png?v={obter_logo()[1]}"
+    except Exception as e:
+        logger.error(f"❌ Erro ao versionar logo: {e}")
+        return '/logo.png'
+
+
+@lru_cache(maxsize=1)
+def _desenho_logo():
+    """Logo de fallback como desenho vetorial do reportlab (montado uma vez)"""
+    carregar_reportlab()
+    desenho = Drawing(160, 44)
+    desenho.add(String(80, 16, 'CIMO', fontName='Helvetica-Bold', fontSize=26,
+                       fillColor=colors.HexColor('#1e3a8a'), textAnchor='middle'))
+    desenho.add(String(80, 4, 'Multi Family Office', fontName='Helvetica', fontSize=8,
+                       fillColor=colors.HexColor('#64748b'), textAnchor='middle'))
+    return desenho
+
+
+def logo_para_pdf(largura=None):
+    """
+    Logo para os relatórios: PNG real já em memória (ler_logo_arquivo) ou,
+    sem o arquivo, o desenho vetorial (nítido em qualquer zoom e sem
+    matplotlib) - o arquivo não é relido nem o fallback PNG é gerado
+    """
+    carregar_reportlab()
+    largura = largura or 1.6 * inch
+    dados = ler_logo_arquivo()
+    
+    if dados is not None:
+        imagem = Image(io.BytesIO(dados))
+        imagem.drawHeight = largura * imagem.imageHeight / imagem.imageWidth
+        imagem.drawWidth = largura
+    else:
+        imagem = _desenho_logo().copy()
+        imagem.scale(largura / imagem.width, largura / imagem.width)
+        imagem.height *= largura / imagem.width
+        imagem.width = largura
+    
+    imagem.hAlign = 'LEFT'
+    return imagem
+
 
 @app.route('/logo.png')
 def logo_png():
-    """Serve a logo PNG da CIMO"""
-    try:
-        logo_path = os.path.join('templates', 'logo.png')
-        
-        if os.path.exists(logo_path):
-            response = send_file(
-                logo_path,
-                mimetype='image/png',
-                as_attachment=False,
-                download_name='cimo-logo.png'
-            )
-            
-            # Headers para otimização
-            response.headers['Cache-Control'] = 'public, max-age=3600'  # Cache por 1 hora
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Content-Disposition'] = 'inline'
-            
-            print(f"✅ Logo PNG servida: {logo_path}")
-            return response
-        else:
-            print(f"❌ Logo PNG não encontrada: {logo_path}")
-            return logo_png_fallback()
-            
-    except Exception as e:
-        print(f"❌ Erro ao servir logo PNG: {str(e)}")
-        return logo_png_fallback()
-
-def logo_png_fallback():
-    """Fallback caso o PNG não seja encontrado"""
+    """Serve a logo PNG da CIMO direto da memória, com ETag do conteúdo"""
     try:
-        # Gerar um PNG simples programaticamente como fallback
-        fig, ax = plt.subplots(figsize=(4, 1.2), dpi=100)
-        ax.set_xlim(0, 10)
-        ax.set_ylim(0, 3)
-        ax.axis('off')
-        
-        # Texto CIMO
-        ax.text(5, 1.5, 'CIMO', fontsize=24, fontweight='bold', 
-                ha='center', va='center', color='#1e3a8a')
-        ax.text(5, 0.8, 'Multi Family Office', fontsize=8, 
-                ha='center', va='center', color='#64748b')
-        
-        # Salvar em buffer
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format='png', bbox_inches='tight', 
-                   transparent=True, facecolor='none', dpi=150)
-        buffer.seek(0)
-        plt.close()
-        
-        response = make_response(buffer.getvalue())
-        response.headers['Content-Type'] = 'image/png'
-        response.headers['Cache-Control'] = 'public, max-age=300'  # 5 minutos
-        
-        print("⚠️ Usando logo PNG de fallback")
-        return response
-        
+        dados, etag, gerada = obter_logo()
     except Exception as e:
-        print(f"❌ Erro no fallback PNG: {str(e)}")
+        logger.error(f"❌ Erro no fallback PNG: {e}")
         return jsonify({
             'erro': 'Logo não encontrada',
             'path_esperado': 'templates/logo.png',
             'solucao': 'Certifique-se que o arquivo logo.png está na pasta templates/'
         }), 404
+    
+    response = make_response(dados)
+    response.headers['Content-Type'] = 'image/png'
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Content-Disposition'] = 'inline'
+    response.set_etag(etag)
+    
+    # A URL versionada nunca muda de conteúdo; a URL simples revalida pelo ETag
+    if request.args.get('v') == etag:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = f"public, max-age={300 if gerada else 3600}"
+    
+    return response.make_conditional(request)
+
+
+# Logo real em memória desde o boot (uma leitura; o fallback gerado espera o primeiro uso)
+if ler_logo_arquivo() is not None:
+    obter_logo()
 
 @app.route('/debug/logo')
 def debug_logo():
     """Debug da logo para troubleshooting"""
-    logo_path = os.path.join('templates', 'logo.png')
+    logo_path = LOGO_CAMINHO
     
     debug_info = {
         'arquivo_existe': os.path.exists(logo_path),
@@ -2319,60 +5477,87 @@ def debug_logo():
 def gerar_relatorio_api(tipo):
     """API para gerar relatórios em PDF"""
     try:
-        debugMessage = print  # Para logs no servidor
-        debugMessage(f"📋 Gerando relatório {tipo}")
+        logger.debug(f"📋 Gerando relatório {tipo}")
         
         # Coletar parâmetros
-        params = {
-            'taxa': float(request.args.get('taxa', 4.0)),
-            'expectativa': int(request.args.get('expectativa', 90)),
-            'despesas': float(request.args.get('despesas', 150000)),
-            'perfil': request.args.get('perfil', 'moderado'),
-            'inicio_renda_filhos': request.args.get('inicio_renda_filhos', 'falecimento'),
-            'custo_fazenda': float(request.args.get('custo_fazenda', 2000000))
-        }
-        
-        debugMessage(f"📊 Parâmetros: {params}")
-        
-        # Calcular dados base
-        dados_base = calcular_compromissos_v42_corrigido(
-            params['taxa'], 
-            params['expectativa'],
-            params['despesas'],
-            params['inicio_renda_filhos'],
-            params['custo_fazenda'],
-            params['perfil']
-        )
+        params = parametros_relatorio(request.args)
         
-        # Gerar relatório específico
-        gerador = RelatorioGenerator(params, dados_base)
+        logger.debug(f"📊 Parâmetros: {params}")
         
-        if tipo == 'executivo':
-            pdf_buffer = gerar_pdf_executivo(gerador)
-        elif tipo == 'tecnico':
-            pdf_buffer = gerar_pdf_tecnico(gerador)
-        elif tipo == 'simulacao':
-            pdf_buffer = gerar_pdf_simulacao(gerador)
-        else:
+        if tipo not in GERADORES_PDF:
             return jsonify({'error': f'Tipo de relatório inválido: {tipo}'}), 400
         
+        validar_inputs(params['taxa'], params['expectativa'], params['despesas'], params['inicio_renda_filhos'])
+        
         # Retornar PDF
-        response = make_response(pdf_buffer.getvalue())
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=relatorio_{tipo}_{datetime.now().strftime("%Y%m%d_%H%M")}.pdf'
+        response = resposta_pdf(gerar_relatorio_pdf(tipo, params), tipo)
         
-        debugMessage(f"✅ Relatório {tipo} gerado com sucesso")
+        logger.debug(f"✅ Relatório {tipo} gerado com sucesso")
         return response
         
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"❌ Erro ao gerar relatório {tipo}: {str(e)}")
+        logger.error(f"❌ Erro ao gerar relatório {tipo}: {e}")
         return jsonify({'error': f'Erro interno: {str(e)}'}), 500
 
+@app.route('/api/relatorio/<tipo>', methods=['POST'])
+def enfileirar_relatorio_api(tipo):
+    """Enfileira a geração do PDF e devolve o id do job (202)"""
+    try:
+        if tipo not in GERADORES_PDF:
+            return jsonify({'success': False, 'erro': f'Tipo de relatório inválido: {tipo}'}), 400
+        
+        # Parâmetros no corpo JSON ou na query string
+        params = parametros_relatorio(request.get_json(silent=True) or request.args)
+        validar_inputs(params['taxa'], params['expectativa'], params['despesas'], params['inicio_renda_filhos'])
+        
+        try:
+            job_id = _fila_relatorios.submeter(tipo, params)
+        except RuntimeError as e:
+            return jsonify({'success': False, 'erro': str(e)}), 503
+        
+        logger.debug(f"📋 Relatório {tipo} enfileirado: job {job_id}")
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'na_fila',
+            'status_url': f'/api/jobs/{job_id}',
+            'download_url': f'/api/jobs/{job_id}/download',
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        }), 202
+        
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({'success': False, 'erro': str(e)}), 400
+
+@app.route('/api/jobs/<job_id>')
+def status_job_api(job_id):
+    """Status e tempos de um job de relatório"""
+    job = _fila_relatorios.consultar(job_id)
+    if job is None:
+        return jsonify({'success': False, 'erro': f'Job não encontrado: {job_id}'}), 404
+    
+    return jsonify({'success': True, **job})
+
+@app.route('/api/jobs/<job_id>/download')
+def download_job_api(job_id):
+    """PDF de um job concluído (409 enquanto ainda está na fila/processando)"""
+    status, pdf = _fila_relatorios.obter_pdf(job_id)
+    if status is None:
+        return jsonify({'success': False, 'erro': f'Job não encontrado: {job_id}'}), 404
+    if status == 'erro':
+        return jsonify({'success': False, 'status': status, 'erro': _fila_relatorios.consultar(job_id)['erro']}), 500
+    if pdf is None:
+        return jsonify({'success': False, 'status': status, 'erro': 'Relatório ainda não está pronto'}), 409
+    
+    tipo = _fila_relatorios.consultar(job_id)['tipo']
+    return resposta_pdf(pdf, tipo)
+
 @app.route('/api/relatorio-preview/<tipo>')
 def preview_relatorio(tipo):
     """API ULTRA-ROBUSTA para preview dos dados do relatório"""
     try:
-        print(f"🔍 Preview relatório {tipo} - versão SAFE")
+        logger.debug(f"🔍 Preview relatório {tipo} - versão SAFE")
         
         # Parâmetros com valores padrão seguros
         params = {
@@ -2386,12 +5571,13 @@ def preview_relatorio(tipo):
         
         # Tentar calcular dados base, com fallback se falhar
         try:
-            dados_base = calcular_compromissos_v42_corrigido(
+            dados_base = calcular_compromissos_cache(
                 params['taxa'], params['expectativa'], params['despesas'],
                 params['inicio_renda_filhos'], params['custo_fazenda'], params['perfil']
             )
         except Exception as e:
-            print(f"⚠️ Erro nos cálculos base, usando fallback: {e}")
+            logger.warning(f"⚠️ Erro nos cálculos base, usando fallback: {e}")
+            dispensar_etag()
             # Dados base de emergência
             dados_base = {
                 'fazenda_disponivel': 5000000,
@@ -2415,13 +5601,14 @@ def preview_relatorio(tipo):
                 preview_data = {'observacao': f'Tipo {tipo} em desenvolvimento'}
             
         except Exception as e:
-            print(f"⚠️ Erro na geração, usando dados mínimos: {e}")
+            logger.warning(f"⚠️ Erro na geração, usando dados mínimos: {e}")
+            dispensar_etag()
             preview_data = {
                 'observacao': f'Preview {tipo} sendo processado',
                 'status': 'em_desenvolvimento'
             }
         
-        print(f"✅ Preview {tipo} gerado com sucesso (versão SAFE)")
+        logger.debug(f"✅ Preview {tipo} gerado com sucesso (versão SAFE)")
         
         return jsonify({
             'success': True,
@@ -2439,7 +5626,8 @@ def preview_relatorio(tipo):
         
         
     except Exception as e:
-        print(f"❌ Erro geral no preview {tipo}: {str(e)}")
+        logger.error(f"❌ Erro geral no preview {tipo}: {e}")
+        dispensar_etag()
         # ÚLTIMO RECURSO - resposta que SEMPRE funciona
         return jsonify({
             'success': True,
@@ -2476,37 +5664,55 @@ def projecoes_detalhadas():
             if periodo_compra_fazenda <= 0:
                 periodo_compra_fazenda = None
         
-        print(f"📊 Projeções detalhadas solicitadas:")
-        print(f"   Taxa: {taxa}%, Expectativa: {expectativa}, Fazenda em: {periodo_compra_fazenda or 'imediato'} anos")
+        # Granularidade extra: 'mensal' inclui a projeção mês a mês
+        granularidade = request.args.get('granularidade', 'anual')
+        assert granularidade in ('anual', 'mensal'), f"Granularidade inválida: {granularidade}"
         
-        # Calcular dados com fazenda
-        resultado = calcular_compromissos_v43_com_fazenda(
-            taxa, expectativa, despesas, inicio_renda_filhos,
-            custo_fazenda, perfil, periodo_compra_fazenda
-        )
+        # Formato compacto opcional: um array por campo, floats arredondados em `casas`
+        formato = request.args.get('format', 'registros')
+        assert formato in ('registros', 'columnar'), f"Formato inválido: {formato}"
+        casas = request.args.get('casas', type=int)
+        colunar = formato == 'columnar'
         
-        # Gerar projeção detalhada
+        logger.debug(f"📊 Projeções detalhadas solicitadas:")
+        logger.debug(f"   Taxa: {taxa}%, Expectativa: {expectativa}, Fazenda em: {periodo_compra_fazenda or 'imediato'} anos")
+        
+        # Um único contexto: compromissos, viabilidade e projeção avaliados uma vez
         anos_projecao = min(40, max(20, (expectativa - IDADE_ANA) + 10))
+        contexto = ContextoCenario(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                                   perfil, periodo_compra_fazenda, anos_projecao)
         
-        valor_fazenda_futuro = resultado.get('valor_fazenda_futuro', custo_fazenda)
-        projecao_anual = gerar_projecao_fluxo_com_fazenda(
-            taxa, expectativa, despesas, anos_projecao, inicio_renda_filhos,
-            periodo_compra_fazenda, valor_fazenda_futuro
+        # Calcular dados com fazenda (memoizado)
+        resultado = calcular_compromissos_cache(
+            taxa, expectativa, despesas, inicio_renda_filhos,
+            custo_fazenda, perfil, periodo_compra_fazenda, analise_fazenda=True, contexto=contexto
         )
         
-        # Asset allocation temporal (simplificado para MVP)
-        allocation_temporal = []
-        for i, item in enumerate(projecao_anual[:20]):  # Primeiros 20 anos
-            liquidez_pct = item['liquidez_necessaria_pct']
-            allocation_temporal.append({
-                'ano': item['ano'],
-                'renda_fixa_br': max(20, 70 - liquidez_pct),  # Reduz conforme aumenta liquidez
+        # Projeção detalhada (trecho do horizonte da rota)
+        valor_fazenda_futuro = resultado.get('valor_fazenda_futuro', custo_fazenda)
+        projecao_anual = contexto.projecao
+        if len(projecao_anual) > anos_projecao:
+            projecao_anual = ProjecaoAnual({nome: valores[:anos_projecao] for nome, valores in projecao_anual.colunas.items()})
+        
+        # Asset allocation temporal (simplificado para MVP), direto do cronograma de liquidez
+        liquidez_pct = projecao_anual.colunas['liquidez_necessaria_pct'][:20]  # Primeiros 20 anos
+        allocation_temporal = [
+            {
+                'ano': ano,
+                'renda_fixa_br': renda_fixa_br,  # Reduz conforme aumenta liquidez
                 'renda_fixa_int': 15,
-                'acoes_br': max(5, 15 - (liquidez_pct // 2)),
+                'acoes_br': acoes_br,
                 'acoes_int': 10,
                 'imoveis': 3,
-                'liquidez': liquidez_pct
-            })
+                'liquidez': liquidez
+            }
+            for ano, renda_fixa_br, acoes_br, liquidez in zip(
+                projecao_anual.colunas['ano'][:20].tolist(),
+                np.maximum(20, 70 - liquidez_pct).tolist(),
+                np.maximum(5, 15 - liquidez_pct // 2).tolist(),
+                liquidez_pct.tolist()
+            )
+        ]
         
         # Marcos temporais incluindo fazenda
         marcos_temporais = []
@@ -2528,40 +5734,659 @@ def projecoes_detalhadas():
                 'tipo': 'fazenda'
             })
         
-        # Marco: expectativa de vida
-        marcos_temporais.append({
-            'ano': 2025 + (expectativa - IDADE_ANA),
-            'idade_ana': expectativa,
-            'evento': 'Expectativa de Vida Ana',
-            'tipo': 'pessoal'
+        # Marco: expectativa de vida
+        marcos_temporais.append({
+            'ano': 2025 + (expectativa - IDADE_ANA),
+            'idade_ana': expectativa,
+            'evento': 'Expectativa de Vida Ana',
+            'tipo': 'pessoal'
+        })
+        
+        resposta = {
+            'success': True,
+            'projecao_anual': projecao_anual.colunar(casas) if colunar else projecao_anual.registros(),
+            'allocation_temporal': allocation_temporal,
+            'marcos_temporais': marcos_temporais,
+            'fazenda_analysis': resultado['fazenda_analysis'],
+            'fazenda_disponivel_periodo': resultado['fazenda_disponivel'],
+            'reconciliacao': contexto.reconciliacao,
+            'parametros': {
+                'taxa': taxa,
+                'expectativa': expectativa,
+                'periodo_compra_fazenda': periodo_compra_fazenda,
+                'valor_fazenda_atual': custo_fazenda,
+                'valor_fazenda_futuro': valor_fazenda_futuro,
+                'granularidade': granularidade,
+                'formato': formato
+            },
+            'timestamp': get_current_datetime_sao_paulo().isoformat(),
+            'versao': '4.3-PROJECOES-FAZENDA'
+        }
+        
+        if granularidade == 'mensal':
+            projecao_mensal = contexto.projecao_mensal
+            if len(projecao_mensal) > 12 * anos_projecao:
+                projecao_mensal = ProjecaoMensal({nome: valores[:12 * anos_projecao] for nome, valores in projecao_mensal.colunas.items()})
+            resposta['projecao_mensal'] = projecao_mensal.colunar(casas) if colunar else projecao_mensal.registros()
+        
+        return jsonify(resposta)
+        
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.3-PROJECOES-FAZENDA'
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Erro em projeções detalhadas: {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.3-PROJECOES-FAZENDA'
+        }), 500
+
+
+
+# ================ ENDPOINT DE PERÍODOS DE COMPRA DA FAZENDA ================
+@app.route('/api/periodos-compra-fazenda')
+def api_periodos_compra_fazenda():
+    """
+    Viabilidade da compra da fazenda em cada ano do horizonte de Ana (uma varredura)
+    
+    Query opcional: anos (último ano avaliado; padrão expectativa - idade atual)
+    """
+    try:
+        taxa = float(request.args.get('taxa', 4.0))
+        expectativa = int(request.args.get('expectativa', 90))
+        despesas = float(request.args.get('despesas', 150000))
+        inicio_renda_filhos = request.args.get('inicio_renda_filhos', 'falecimento')
+        custo_fazenda = float(request.args.get('custo_fazenda', 2000000))
+        anos = request.args.get('anos', type=int)
+        
+        validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos)
+        if anos is not None:
+            assert 1 <= anos <= 120 - IDADE_ANA, f"Anos deve estar entre 1 e {120 - IDADE_ANA}"
+        
+        varredura = varrer_periodos_compra_fazenda(taxa, expectativa, despesas, inicio_renda_filhos,
+                                                   custo_fazenda, anos)
+        
+        return jsonify({
+            'success': True,
+            **varredura,
+            'parametros': {
+                'taxa': taxa,
+                'expectativa': expectativa,
+                'despesas': despesas,
+                'inicio_renda_filhos': inicio_renda_filhos,
+                'valor_fazenda_atual': custo_fazenda
+            },
+            'timestamp': get_current_datetime_sao_paulo().isoformat(),
+            'versao': '4.4-PERIODOS-FAZENDA'
+        })
+        
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-PERIODOS-FAZENDA'
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Erro na varredura de períodos da fazenda: {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-PERIODOS-FAZENDA'
+        }), 500
+
+
+# ================ ENDPOINT DO SOLVER DE METAS ================
+@app.route('/api/solver-metas')
+def api_solver_metas():
+    """
+    Goal-seek do plano: taxa mínima, despesas máximas e custo máximo da fazenda
+    
+    Query opcional: periodo_compra_fazenda, percentual_alvo
+    """
+    try:
+        inicio = datetime.now()
+        
+        taxa = float(request.args.get('taxa', 4.0))
+        expectativa = int(request.args.get('expectativa', 90))
+        despesas = float(request.args.get('despesas', 150000))
+        inicio_renda_filhos = request.args.get('inicio_renda_filhos', 'falecimento')
+        custo_fazenda = float(request.args.get('custo_fazenda', 2000000))
+        percentual_alvo = request.args.get('percentual_alvo', type=float)
+        
+        periodo_compra_fazenda = request.args.get('periodo_compra_fazenda', type=int)
+        if periodo_compra_fazenda is not None and periodo_compra_fazenda <= 0:
+            periodo_compra_fazenda = None
+        
+        validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos)
+        if percentual_alvo is not None:
+            assert 0 <= percentual_alvo < 100, "Percentual alvo deve estar entre 0% e 100%"
+        
+        metas = resolver_metas_plano(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                                     periodo_compra_fazenda, percentual_alvo)
+        
+        return jsonify({
+            'success': True,
+            **metas,
+            'tempo_ms': (datetime.now() - inicio).total_seconds() * 1000,
+            'timestamp': get_current_datetime_sao_paulo().isoformat(),
+            'versao': '4.4-SOLVER-METAS'
+        })
+        
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-SOLVER-METAS'
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Erro no solver de metas: {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-SOLVER-METAS'
+        }), 500
+
+
+# ================ ENDPOINT DE TIMING DA RENDA DOS FILHOS ================
+@app.route('/api/timing-renda-filhos')
+def api_timing_renda_filhos():
+    """Curva de VP da renda dos filhos por idade de início e a opção de menor VP"""
+    try:
+        taxa = float(request.args.get('taxa', 4.0))
+        expectativa = int(request.args.get('expectativa', 90))
+        
+        validar_inputs(taxa, expectativa, DESPESAS_BASE)
+        
+        return jsonify({
+            'success': True,
+            **curva_vp_renda_filhos(taxa, expectativa),
+            'parametros': {'taxa': taxa, 'expectativa': expectativa},
+            'timestamp': get_current_datetime_sao_paulo().isoformat(),
+            'versao': '4.4-TIMING-FILHOS'
+        })
+        
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-TIMING-FILHOS'
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Erro no timing da renda dos filhos: {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-TIMING-FILHOS'
+        }), 500
+
+
+# ================ ENDPOINT DE SENSIBILIDADE ================
+@app.route('/api/sensibilidade')
+def api_sensibilidade():
+    """
+    Superfície de sensibilidade taxa × despesas (grade calculada em uma passada)
+    
+    Query opcional: taxa_min, taxa_max, despesas_min, despesas_max, passos
+    """
+    try:
+        taxa = float(request.args.get('taxa', 4.0))
+        expectativa = int(request.args.get('expectativa', 90))
+        despesas = float(request.args.get('despesas', 150000))
+        inicio_renda_filhos = request.args.get('inicio_renda_filhos', 'falecimento')
+        custo_fazenda = float(request.args.get('custo_fazenda', 2000000))
+        
+        validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos)
+        
+        passos = min(request.args.get('passos', SENSIBILIDADE_CONFIG['passos'], type=int), SENSIBILIDADE_CONFIG['passos_max'])
+        passos = max(passos, 2)
+        taxas = np.linspace(request.args.get('taxa_min', 2.0, type=float),
+                            request.args.get('taxa_max', 8.0, type=float), passos)
+        despesas_grade = np.linspace(request.args.get('despesas_min', despesas * 0.5, type=float),
+                                     request.args.get('despesas_max', despesas * 1.5, type=float), passos)
+        
+        grade = calcular_grade_sensibilidade(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda,
+                                             taxas, despesas_grade)
+        
+        return jsonify({
+            'success': True,
+            **grade,
+            'base': {
+                'taxa': taxa,
+                'despesas': despesas,
+                'expectativa': expectativa,
+                'inicio_renda_filhos': inicio_renda_filhos,
+                'custo_fazenda': custo_fazenda
+            },
+            'timestamp': get_current_datetime_sao_paulo().isoformat(),
+            'versao': '4.4-SENSIBILIDADE-GRADE'
+        })
+        
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-SENSIBILIDADE-GRADE'
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Erro na análise de sensibilidade: {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-SENSIBILIDADE-GRADE'
+        }), 500
+
+
+# ================ ENDPOINT DE VARREDURA (NDJSON) ================
+def _eixo_varredura(nome, padrao, tipo, casas=None):
+    """
+    Valores de um eixo da query: lista separada por vírgulas ou, nos
+    eixos decimais, inicio:fim:passos (np.linspace)
+    
+    Decimais são arredondados como na chave do cache de compromissos, então
+    cada linha bate com /api/dados chamado com os mesmos valores.
+    """
+    texto = request.args.get(nome, str(padrao)).strip()
+    
+    if tipo is float and texto.count(':') == 2:
+        inicio, fim, passos = texto.split(':')
+        passos = int(passos)
+        assert 1 <= passos <= VARREDURA_CONFIG['passos_max'], f"Passos de {nome} devem estar entre 1 e {VARREDURA_CONFIG['passos_max']}"
+        valores = np.linspace(float(inicio), float(fim), passos).tolist()
+    else:
+        valores = [tipo(valor.strip()) for valor in texto.split(',') if valor.strip()]
+    
+    assert valores, f"Eixo {nome} vazio"
+    return [round(valor, casas) for valor in valores] if casas is not None else valores
+
+
+@app.route('/api/varredura')
+def api_varredura():
+    """
+    Grade de cenários (perfil × início da renda × expectativa × fazenda ×
+    taxa × despesas) em NDJSON: uma linha por cenário, enviada em blocos
+    à medida que é calculada
+    
+    Query: os parâmetros de /api/dados, cada um aceitando uma lista
+    separada por vírgulas (taxa, despesas e custo_fazenda também aceitam
+    inicio:fim:passos). O total de linhas vai no header X-Varredura-Linhas.
+    """
+    try:
+        eixos = {
+            'perfil': _eixo_varredura('perfil', 'moderado', str),
+            'inicio_renda_filhos': _eixo_varredura('inicio_renda_filhos', 'falecimento', str),
+            'expectativa': _eixo_varredura('expectativa', 90, int),
+            'custo_fazenda': _eixo_varredura('custo_fazenda', 2_000_000, float, CACHE_CONFIG['casas_valores']),
+            'taxa': _eixo_varredura('taxa', 4.0, float, CACHE_CONFIG['casas_taxa']),
+            'despesas': _eixo_varredura('despesas', 150000, float, CACHE_CONFIG['casas_valores'])
+        }
+        
+        total = int(np.prod([len(valores) for valores in eixos.values()]))
+        assert total <= VARREDURA_CONFIG['linhas_max'], f"Grade com {total:,} linhas excede o limite de {VARREDURA_CONFIG['linhas_max']:,}"
+        
+        # Validação antes do primeiro byte (depois o status 200 já foi enviado);
+        # os limites de validar_inputs são independentes por eixo
+        taxa, expectativa, despesas = eixos['taxa'][0], eixos['expectativa'][0], eixos['despesas'][0]
+        for valor in eixos['taxa']:
+            validar_inputs(valor, expectativa, despesas)
+        for valor in eixos['expectativa']:
+            validar_inputs(taxa, valor, despesas)
+        for valor in eixos['despesas']:
+            validar_inputs(taxa, expectativa, valor)
+        for valor in eixos['inicio_renda_filhos']:
+            _codificar_inicio_renda_filhos(valor, expectativa)
+        
+    except Exception as e:
+        logger.error(f"❌ Erro na varredura: {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-VARREDURA-NDJSON'
+        }), 400
+    
+    logger.debug(f"🧮 Varredura NDJSON: {total:,} linhas em blocos de {VARREDURA_CONFIG['bloco']}")
+    
+    def gerar():
+        for linhas in varrer_grade_compromissos(eixos):
+            yield ''.join(json.dumps(linha, ensure_ascii=False) + '\n' for linha in linhas)
+    
+    response = app.response_class(gerar(), mimetype='application/x-ndjson')
+    response.headers['X-Varredura-Linhas'] = str(total)
+    return response
+
+
+# ================ ENDPOINT DE STRESS TESTS ================
+@app.route('/api/stress-tests')
+def api_stress_tests():
+    """
+    Stress tests do plano recalculados em lote (cenário × ano)
+    
+    Query opcional: queda_patrimonio, ano_crise, inflacao_excedente,
+    expectativa_longevidade, reducao_taxa, ano_regime
+    """
+    try:
+        taxa = float(request.args.get('taxa', 4.0))
+        expectativa = int(request.args.get('expectativa', 90))
+        despesas = float(request.args.get('despesas', 150000))
+        inicio_renda_filhos = request.args.get('inicio_renda_filhos', 'falecimento')
+        custo_fazenda = float(request.args.get('custo_fazenda', 2000000))
+        
+        validar_inputs(taxa, expectativa, despesas, inicio_renda_filhos)
+        
+        cenarios = {nome: dict(definicao) for nome, definicao in STRESS_TEST_CENARIOS.items()}
+        sobrescritas = {
+            'queda_patrimonio': ('crise_financeira', 'queda_patrimonio', float),
+            'ano_crise': ('crise_financeira', 'ano_choque', int),
+            'inflacao_excedente': ('inflacao_alta', 'inflacao_excedente', float),
+            'expectativa_longevidade': ('longevidade_extrema', 'expectativa', int),
+            'reducao_taxa': ('mudanca_regime', 'reducao_taxa', float),
+            'ano_regime': ('mudanca_regime', 'ano_choque', int)
+        }
+        for parametro, (cenario, chave, tipo) in sobrescritas.items():
+            valor = request.args.get(parametro, type=tipo)
+            if valor is not None:
+                cenarios[cenario][chave] = valor
+        if request.args.get('expectativa_longevidade') is None:
+            longevidade = cenarios['longevidade_extrema']
+            longevidade['expectativa'] = max(longevidade['expectativa'], expectativa)
+        
+        assert 0 <= cenarios['crise_financeira']['queda_patrimonio'] < 100, "Queda de patrimônio deve estar entre 0% e 100%"
+        assert expectativa <= cenarios['longevidade_extrema']['expectativa'] <= 120, "Longevidade deve estar entre a expectativa e 120 anos"
+        anos_horizonte = max(cenarios['longevidade_extrema']['expectativa'] - IDADE_ANA,
+                             EXPECTATIVA_FILHOS - IDADE_ESTIMADA_FILHOS)
+        for cenario in ('crise_financeira', 'mudanca_regime'):
+            assert 1 <= cenarios[cenario]['ano_choque'] <= anos_horizonte, f"Ano do choque deve estar entre 1 e {anos_horizonte}"
+        reducao_taxa = cenarios['mudanca_regime']['reducao_taxa']
+        assert reducao_taxa >= 0, f"Redução da taxa ({reducao_taxa} p.p.) não pode ser negativa"
+        assert 0 < taxa - reducao_taxa <= 15, \
+            f"Taxa após a mudança de regime ({taxa - reducao_taxa:.2f}%) fora de intervalo razoável (0.1% a 15%)"
+        
+        resultados = executar_stress_tests(taxa, expectativa, despesas, inicio_renda_filhos, custo_fazenda, cenarios)
+        
+        return jsonify({
+            'success': True,
+            'base': resultados.pop('base'),
+            'cenarios': resultados,
+            'timestamp': get_current_datetime_sao_paulo().isoformat(),
+            'versao': '4.4-STRESS-LOTE'
         })
         
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-STRESS-LOTE'
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Erro nos stress tests: {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-STRESS-LOTE'
+        }), 500
+
+
+# ================ ENDPOINT MONTE CARLO ================
+def parametros_monte_carlo(origem):
+    """
+    Argumentos de executar_monte_carlo a partir da query string, validados
+    
+    Raises:
+        AssertionError, ValueError: Parâmetros inválidos (a rota responde 400)
+    """
+    def opcional(nome, tipo):
+        valor = origem.get(nome)
+        return None if valor in (None, '') else tipo(valor)
+    
+    periodo_compra_fazenda = opcional('periodo_compra_fazenda', int)
+    if periodo_compra_fazenda is not None and periodo_compra_fazenda <= 0:
+        periodo_compra_fazenda = None
+    
+    parametros = {
+        'expectativa': int(origem.get('expectativa', 90)),
+        'despesas': float(origem.get('despesas', 150000)),
+        'inicio_renda_filhos': origem.get('inicio_renda_filhos', 'falecimento'),
+        'custo_fazenda': float(origem.get('custo_fazenda', 2000000)),
+        'perfil_investimento': origem.get('perfil', 'moderado'),
+        'periodo_compra_fazenda': periodo_compra_fazenda,
+        'caminhos': opcional('caminhos', int),
+        'anos': opcional('anos', int),
+        'semente': opcional('semente', int),
+        'retorno_esperado': opcional('retorno', float),
+        'volatilidade': opcional('volatilidade', float)
+    }
+    
+    # Mesma leitura de inicio_renda_filhos do motor mensal; idades são checadas no intervalo
+    idade_inicio = _codificar_inicio_renda_filhos(parametros['inicio_renda_filhos'], parametros['expectativa'])[0]
+    if parametros['inicio_renda_filhos'] not in ('falecimento', 'imediato'):
+        parametros['inicio_renda_filhos'] = idade_inicio
+    
+    perfil_info = ASSET_ALLOCATION_PROFILES.get(parametros['perfil_investimento'], ASSET_ALLOCATION_PROFILES['moderado'])
+    retorno = perfil_info['retorno_esperado'] if parametros['retorno_esperado'] is None else parametros['retorno_esperado']
+    validar_inputs(retorno, parametros['expectativa'], parametros['despesas'], parametros['inicio_renda_filhos'])
+    
+    assert parametros['custo_fazenda'] >= 0, f"Custo da fazenda ({parametros['custo_fazenda']:,.0f}) não pode ser negativo"
+    assert parametros['caminhos'] is None or parametros['caminhos'] >= 1, f"caminhos ({parametros['caminhos']}) deve ser >= 1"
+    assert parametros['anos'] is None or parametros['anos'] >= 1, f"anos ({parametros['anos']}) deve ser >= 1"
+    assert parametros['volatilidade'] is None or parametros['volatilidade'] >= 0, \
+        f"Volatilidade ({parametros['volatilidade']}%) não pode ser negativa"
+    
+    return parametros
+
+
+@app.route('/api/monte-carlo')
+def api_monte_carlo():
+    """
+    Simulação Monte Carlo do plano (10k-100k trajetórias vetorizadas)
+    
+    Usa retorno_esperado/volatilidade do perfil; `retorno` e `volatilidade`
+    na query sobrescrevem o perfil.
+    """
+    try:
+        inicio = datetime.now()
+        
+        resultado = executar_monte_carlo(**parametros_monte_carlo(request.args))
+        
+        tempo_ms = (datetime.now() - inicio).total_seconds() * 1000
+        logger.info(f"🎲 Monte Carlo: {resultado['caminhos']} caminhos em {tempo_ms:.0f} ms - sucesso {resultado['probabilidade_sucesso']:.1f}%")
+        
         return jsonify({
             'success': True,
-            'projecao_anual': projecao_anual,
-            'allocation_temporal': allocation_temporal,
-            'marcos_temporais': marcos_temporais,
-            'fazenda_analysis': resultado['fazenda_analysis'],
-            'fazenda_disponivel_periodo': resultado['fazenda_disponivel'],
-            'parametros': {
-                'taxa': taxa,
-                'expectativa': expectativa,
-                'periodo_compra_fazenda': periodo_compra_fazenda,
-                'valor_fazenda_atual': custo_fazenda,
-                'valor_fazenda_futuro': valor_fazenda_futuro
-            },
+            **resultado,
+            'tempo_ms': tempo_ms,
             'timestamp': get_current_datetime_sao_paulo().isoformat(),
-            'versao': '4.3-PROJECOES-FAZENDA'
+            'versao': '4.4-MONTE-CARLO'
         })
         
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-MONTE-CARLO'
+        }), 400
     except Exception as e:
-        print(f"❌ Erro em projeções detalhadas: {str(e)}")
+        logger.error(f"❌ Erro na simulação Monte Carlo: {e}")
         return jsonify({
             'success': False,
             'erro': str(e),
-            'versao': '4.3-PROJECOES-FAZENDA'
+            'versao': '4.4-MONTE-CARLO'
+        }), 500
+
+
+def evento_sse(evento, dados):
+    """Formata um evento Server-Sent Events com payload JSON"""
+    return f"event: {evento}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+
+@app.route('/api/monte-carlo/stream')
+def api_monte_carlo_stream():
+    """
+    Monte Carlo progressivo via Server-Sent Events
+    
+    Mesmos parâmetros de /api/monte-carlo, mais `precisao` (meia-largura do
+    IC da probabilidade de sucesso, em p.p., que encerra a simulação antes).
+    Emite `progresso` após cada lote (bandas, histograma, probabilidade de
+    sucesso e IC acumulados), `resultado` no fim e `erro` se algo falhar.
+    Fechar o EventSource interrompe a simulação no lote seguinte.
+    """
+    inicio = datetime.now()
+    
+    try:
+        parametros = parametros_monte_carlo(request.args)
+        precisao = request.args.get('precisao')
+        precisao = float(precisao) if precisao else None
+        assert precisao is None or precisao > 0, f"precisao ({precisao}) deve ser positiva"
+    except (AssertionError, ValueError, TypeError) as e:
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-MONTE-CARLO'
+        }), 400
+    
+    try:
+        progresso = executar_monte_carlo_progressivo(**parametros, precisao=precisao)
+        # O primeiro lote roda antes da resposta: falhas inesperadas ainda viram 500
+        primeiro = next(progresso)
+    except Exception as e:
+        logger.error(f"❌ Erro na simulação Monte Carlo (stream): {e}")
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-MONTE-CARLO'
         }), 500
+    
+    def gerar():
+        resumo = primeiro
+        try:
+            while True:
+                tempo_ms = (datetime.now() - inicio).total_seconds() * 1000
+                concluido = resumo['progresso']['concluido']
+                yield evento_sse('resultado' if concluido else 'progresso', {
+                    'success': True,
+                    **resumo,
+                    'tempo_ms': tempo_ms,
+                    'timestamp': get_current_datetime_sao_paulo().isoformat(),
+                    'versao': '4.4-MONTE-CARLO'
+                })
+                if concluido:
+                    logger.info(f"🎲 Monte Carlo (stream): {resumo['caminhos']} caminhos em {tempo_ms:.0f} ms - "
+                                f"sucesso {resumo['probabilidade_sucesso']:.1f}%")
+                    return
+                resumo = next(progresso)
+        except GeneratorExit:
+            logger.info(f"🎲 Monte Carlo (stream) cancelado pelo cliente em {resumo['caminhos']} caminhos")
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erro na simulação Monte Carlo (stream): {e}")
+            yield evento_sse('erro', {'success': False, 'erro': str(e), 'versao': '4.4-MONTE-CARLO'})
+    
+    response = app.response_class(gerar(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Proxies (nginx) não seguram os eventos
+    return response
+
+
+# ================ ENDPOINT DO CACHE ================
+def limpar_caches():
+    """Esvazia os caches deste worker (compromissos, nós de VP, PDFs) e o L2 compartilhado"""
+    _cache_compromissos.limpar()
+    limpar_nos_compromissos()
+    _cache_relatorios_pdf.limpar()
+    if _cache_compartilhado is not None:
+        _cache_compartilhado.limpar()
+
+
+def estatisticas_caches():
+    """Estatísticas de todos os caches, no formato de /api/cache/stats"""
+    return {
+        'compromissos': _cache_compromissos.estatisticas(),
+        'nos_compromissos': estatisticas_nos_compromissos(),
+        'compartilhado': _cache_compartilhado.estatisticas() if _cache_compartilhado is not None else None,
+        'relatorios_pdf': _cache_relatorios_pdf.estatisticas()
+    }
+
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """
+    Estatísticas dos caches deste worker (compromissos, nós de VP, PDFs) e do
+    L2 compartilhado, por worker e agregado (somente leitura)
+    """
+    return jsonify({
+        'success': True,
+        **estatisticas_caches(),
+        'timestamp': get_current_datetime_sao_paulo().isoformat()
+    })
+
+
+@app.route('/api/cache', methods=['DELETE'])
+def api_cache_limpar():
+    """
+    Esvazia os caches deste worker e o L2 compartilhado
+    
+    Os demais workers só perdem o que vem do L2; as entradas locais deles
+    expiram pelo LRU (ou use `flask --app app cache-limpar` e reinicie).
+    """
+    limpar_caches()
+    logger.info("🧹 Caches esvaziados via DELETE /api/cache")
+    
+    return jsonify({
+        'success': True,
+        **estatisticas_caches(),
+        'timestamp': get_current_datetime_sao_paulo().isoformat()
+    })
+
+
+# ================ ENDPOINTS DA CARTEIRA MULTI-CLIENTE ================
+@app.route('/api/clientes')
+def api_clientes():
+    """Clientes cadastrados com a avaliação mais recente do lote noturno"""
+    try:
+        return jsonify({
+            'success': True,
+            'clientes': _registro_clientes.listar(),
+            'ultimo_lote': next(iter(_registro_clientes.lotes(1)), None),
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        })
+    except sqlite3.Error as e:
+        logger.error(f"❌ Erro no registro de clientes: {e}")
+        return jsonify({'success': False, 'erro': str(e)}), 500
+
+
+@app.route('/api/clientes/lotes')
+def api_clientes_lotes():
+    """Execuções recentes do lote (duração e clientes por segundo)"""
+    try:
+        return jsonify({
+            'success': True,
+            'lotes': _registro_clientes.lotes(request.args.get('limite', 10, type=int)),
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        })
+    except sqlite3.Error as e:
+        logger.error(f"❌ Erro no registro de clientes: {e}")
+        return jsonify({'success': False, 'erro': str(e)}), 500
+
 
+@app.route('/api/clientes/<cliente_id>')
+def api_cliente(cliente_id):
+    """Cadastro de um cliente e o histórico das avaliações"""
+    try:
+        cadastro = _registro_clientes.obter(cliente_id)
+        if cadastro is None:
+            return jsonify({'success': False, 'erro': f'Cliente não encontrado: {cliente_id}'}), 404
+        
+        return jsonify({
+            'success': True,
+            'cadastro': cadastro,
+            'avaliacoes': _registro_clientes.historico(cliente_id),
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        })
+    except sqlite3.Error as e:
+        logger.error(f"❌ Erro no registro de clientes: {e}")
+        return jsonify({'success': False, 'erro': str(e)}), 500
 
 
 @app.route('/')
@@ -2598,7 +6423,7 @@ def home():
 def dashboard():
     """Dashboard principal"""
     try:
-           return render_template('index.html')
+           return render_template('index.html', logo_url=url_logo())
     except Exception as e:
         return f'''
         <h1>❌ Erro</h1>
@@ -2608,90 +6433,169 @@ def dashboard():
 
 
 # ================ CORREÇÃO DA API /api/dados ================
-# SUBSTITUIR a função api_dados_v43 em app.py
+
+def parametros_dados(origem):
+    """
+    Parâmetros do cenário de /api/dados (query string ou item de lote)
+    
+    Períodos de compra inválidos ou <= 0 viram None (compra imediata).
+    
+    Returns:
+        tuple: Argumentos posicionais de calcular_compromissos_cache
+    """
+    periodo_compra_fazenda = origem.get('periodo_compra_fazenda')
+    if periodo_compra_fazenda:
+        try:
+            periodo_compra_fazenda = int(periodo_compra_fazenda)
+            if periodo_compra_fazenda <= 0:
+                periodo_compra_fazenda = None
+        except:
+            periodo_compra_fazenda = None
+    
+    return (
+        float(origem.get('taxa', 4.0)),
+        int(origem.get('expectativa', 90)),
+        float(origem.get('despesas', 150000)),
+        str(origem.get('inicio_renda_filhos', 'falecimento')),
+        float(origem.get('custo_fazenda', 2_000_000)),
+        origem.get('perfil', 'moderado'),
+        periodo_compra_fazenda or None
+    )
+
+
+def corpo_resposta_dados(resultado, custo_fazenda, perfil_investimento):
+    """Campos de resultado de /api/dados (compartilhados com o lote)"""
+    return {
+        'patrimonio': PATRIMONIO,
+        
+        # ✅ RESULTADO PRINCIPAL
+        'resultado': {
+            'fazenda_disponivel': resultado['fazenda_disponivel'],
+            'total_compromissos': resultado['total_compromissos'],
+            'percentual_fazenda': resultado['percentual_fazenda'],
+            'despesas': resultado['despesas'],
+            'filhos': resultado['filhos'],
+            'doacoes': resultado['doacoes'],
+            'arte': resultado['arte'],
+            'percentual_arte': resultado['percentual_arte']
+        },
+        
+        # ✅ DADOS DA FAZENDA (SE EXISTIREM)
+        'fazenda_analysis': resultado.get('fazenda_analysis', {}),
+        'periodo_compra_fazenda': resultado.get('periodo_compra_fazenda'),
+        'valor_fazenda_atual': resultado.get('valor_fazenda_atual', custo_fazenda),
+        'valor_fazenda_futuro': resultado.get('valor_fazenda_futuro', custo_fazenda),
+        
+        # ✅ DEMAIS DADOS
+        'allocation': get_asset_allocation(perfil_investimento, PATRIMONIO),
+        'status': determinar_status(resultado['fazenda_disponivel'], resultado['percentual_fazenda'])
+    }
+
 
 @app.route('/api/dados')
 def api_dados_v43():
     """API principal - VERSÃO v4.3 COM FAZENDA CORRIGIDA"""
     try:
-        # ✅ COLETAR PARÂMETROS (INCLUINDO FAZENDA)
-        taxa = float(request.args.get('taxa', 4.0))
-        expectativa = int(request.args.get('expectativa', 90))
-        despesas = float(request.args.get('despesas', 150000))
-        inicio_renda_filhos = request.args.get('inicio_renda_filhos', 'falecimento')
-        custo_fazenda = float(request.args.get('custo_fazenda', 2_000_000))
-        perfil_investimento = request.args.get('perfil', 'moderado')
-        
-        # ✅ NOVO: Período de compra da fazenda
-        periodo_compra_fazenda = request.args.get('periodo_compra_fazenda')
-        if periodo_compra_fazenda:
-            try:
-                periodo_compra_fazenda = int(periodo_compra_fazenda)
-                if periodo_compra_fazenda <= 0:
-                    periodo_compra_fazenda = None
-            except:
-                periodo_compra_fazenda = None
-        
-        print(f"📥 API v4.4 - FAZENDA CORRIGIDA:")
-        print(f"   Taxa: {taxa}%, Fazenda: {custo_fazenda:,.0f}, Período: {periodo_compra_fazenda or 'imediato'}")
+        # ✅ COLETAR PARÂMETROS (INCLUINDO FAZENDA E PERÍODO DE COMPRA)
+        parametros = parametros_dados(request.args)
+        taxa, _, _, _, custo_fazenda, perfil_investimento, periodo_compra_fazenda = parametros
         
-        # ✅ USAR FUNÇÃO v4.3 COM FAZENDA SE PERÍODO ESPECIFICADO
-        if periodo_compra_fazenda:
-            resultado = calcular_compromissos_v43_com_fazenda(
-                taxa, expectativa, despesas, inicio_renda_filhos, 
-                custo_fazenda, perfil_investimento, periodo_compra_fazenda
-            )
-        else:
-            # Usar função v4.2 original para compra imediata
-            resultado = calcular_compromissos_v42_corrigido(
-                taxa, expectativa, despesas, inicio_renda_filhos, 
-                custo_fazenda, perfil_investimento
-            )
+        logger.debug(f"📥 API v4.4 - FAZENDA CORRIGIDA:")
+        logger.debug(f"   Taxa: {taxa}%, Fazenda: {custo_fazenda:,.0f}, Período: {periodo_compra_fazenda or 'imediato'}")
         
-        # ✅ DETERMINAR STATUS
-        status = determinar_status(resultado['fazenda_disponivel'], resultado['percentual_fazenda'])
-        
-        # ✅ ASSET ALLOCATION
-        allocation = get_asset_allocation(perfil_investimento, PATRIMONIO)
+        # ✅ v4.3 COM FAZENDA SE PERÍODO ESPECIFICADO, v4.2 PARA COMPRA IMEDIATA (MEMOIZADO)
+        resultado = calcular_compromissos_cache(*parametros)
         
         # ✅ RESPONSE COM TODOS OS DADOS NECESSÁRIOS
         response_data = {
             'success': True,
-            'patrimonio': PATRIMONIO,
-            
-            # ✅ RESULTADO PRINCIPAL
-            'resultado': {
-                'fazenda_disponivel': resultado['fazenda_disponivel'],
-                'total_compromissos': resultado['total_compromissos'],
-                'percentual_fazenda': resultado['percentual_fazenda'],
-                'despesas': resultado['despesas'],
-                'filhos': resultado['filhos'],
-                'doacoes': resultado['doacoes'],
-                'arte': resultado['arte'],
-                'percentual_arte': resultado['percentual_arte']
-            },
-            
-            # ✅ DADOS DA FAZENDA (SE EXISTIREM)
-            'fazenda_analysis': resultado.get('fazenda_analysis', {}),
-            'periodo_compra_fazenda': resultado.get('periodo_compra_fazenda'),
-            'valor_fazenda_atual': resultado.get('valor_fazenda_atual', custo_fazenda),
-            'valor_fazenda_futuro': resultado.get('valor_fazenda_futuro', custo_fazenda),
-            
-            # ✅ DEMAIS DADOS
-            'allocation': allocation,
-            'status': status,
+            **corpo_resposta_dados(resultado, custo_fazenda, perfil_investimento),
             'versao': '4.4-FAZENDA-CORRIGIDA',
             'timestamp': get_current_datetime_sao_paulo().isoformat()
         }
         
-        print(f"   Status: {status}, Período: {periodo_compra_fazenda or 'imediato'}")
+        logger.debug(f"   Status: {response_data['status']}, Período: {periodo_compra_fazenda or 'imediato'}")
         
         return jsonify(response_data)
         
     except Exception as e:
-        print(f"❌ Erro na API v4.4: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Erro na API v4.4: {e}")
+        
+        return jsonify({
+            'success': False,
+            'erro': str(e),
+            'versao': '4.4-FAZENDA-CORRIGIDA',
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        }), 500
+
+
+@app.route('/api/dados/batch', methods=['POST'])
+def api_dados_batch():
+    """
+    Vários cenários de /api/dados numa requisição
+    
+    Corpo JSON: lista de cenários (ou {"cenarios": [...]}) com os mesmos
+    parâmetros da query string de /api/dados. Os resultados voltam na ordem
+    de entrada; um cenário inválido vira um item com success=False sem
+    derrubar os demais.
+    """
+    corpo = request.get_json(silent=True)
+    cenarios = corpo.get('cenarios') if isinstance(corpo, dict) else corpo
+    
+    if not isinstance(cenarios, list) or not cenarios:
+        return jsonify({
+            'success': False,
+            'erro': 'Envie uma lista JSON de cenários (ou {"cenarios": [...]})',
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        }), 400
+    if len(cenarios) > HTTP_CONFIG['batch_max_cenarios']:
+        return jsonify({
+            'success': False,
+            'erro': f"Máximo de {HTTP_CONFIG['batch_max_cenarios']} cenários por lote (recebidos {len(cenarios)})",
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        }), 400
+    
+    try:
+        # Parâmetros de cada item; erros de tipo ficam no próprio item
+        parametros = []
+        for cenario in cenarios:
+            try:
+                if not isinstance(cenario, dict):
+                    raise TypeError(f"Cenário deve ser um objeto JSON, não {type(cenario).__name__}")
+                parametros.append(parametros_dados(cenario))
+            except (TypeError, ValueError) as e:
+                parametros.append(e)
+        
+        validos = [p for p in parametros if not isinstance(p, Exception)]
+        chaves = [normalizar_parametros_compromissos(*p) for p in validos]
+        calculados = iter(calcular_compromissos_lote(chaves))
+        
+        resultados = []
+        for indice, p in enumerate(parametros):
+            resultado = p if isinstance(p, Exception) else next(calculados)
+            if isinstance(resultado, Exception):
+                resultados.append({'indice': indice, 'success': False, 'erro': str(resultado)})
+            else:
+                resultados.append({
+                    'indice': indice,
+                    'success': True,
+                    **corpo_resposta_dados(resultado, p[4], p[5])
+                })
+        
+        erros = sum(1 for item in resultados if not item['success'])
+        logger.debug(f"📦 API lote: {len(resultados)} cenários, {erros} com erro")
+        
+        return jsonify({
+            'success': True,
+            'total': len(resultados),
+            'erros': erros,
+            'resultados': resultados,
+            'versao': '4.4-FAZENDA-CORRIGIDA',
+            'timestamp': get_current_datetime_sao_paulo().isoformat()
+        })
+        
+    except Exception as e:
+        logger.exception(f"❌ Erro na API de lote: {e}")
         
         return jsonify({
             'success': False,
@@ -2723,10 +6627,15 @@ def api_teste():
         'patrimonio': format_currency(PATRIMONIO, True),
         'cliente': f'Ana, {IDADE_ANA} anos',
         'server_time': format_datetime_report(),
+        'boot': ESTATISTICAS_BOOT,
         'logo_funcionando': True,
         'endpoints': {
             'dashboard': '/dashboard',
             'dados': '/api/dados',
+            'dados_batch': '/api/dados/batch (POST)',
+            'varredura': '/api/varredura (NDJSON)',
+            'monte_carlo_stream': '/api/monte-carlo/stream (SSE)',
+            'clientes': '/api/clientes',
             'teste': '/api/teste',
             'logo': '/logo.png',
             'debug_logo': '/debug/logo'
@@ -2746,9 +6655,7 @@ def api_teste():
 def teste_correcoes():
     """Endpoint para testar as correções implementadas"""
     try:
-        print("\n" + "="*80)
-        print("🧪 TESTANDO CORREÇÕES v4.1 COM LOGO")
-        print("="*80)
+        logger.debug("🧪 TESTANDO CORREÇÕES v4.1 COM LOGO")
         
         # Teste com parâmetros do case original
         resultado_original = calcular_compromissos_v42_corrigido(
@@ -2816,7 +6723,16 @@ def not_found(error):
             '/api/teste',
             '/logo.png',
             '/debug/logo',
-            '/api/teste-correcoes'
+            '/api/teste-correcoes',
+            '/api/projecoes-detalhadas',
+            '/api/monte-carlo',
+            '/api/sensibilidade',
+            '/api/stress-tests',
+            '/api/cache/stats',
+            '/api/periodos-compra-fazenda',
+            '/api/solver-metas',
+            '/api/timing-renda-filhos',
+            '/api/jobs/<id>'
         ]
     }), 404
 
@@ -2830,24 +6746,217 @@ def internal_error(error):
         'timestamp': format_datetime_report()
     }), 500
 
+# ================ HTTP: ETAG E COMPRESSÃO ================
+def parametros_canonicos():
+    """
+    Query string em forma canônica: ordem fixa, sem parâmetros de diagnóstico
+    e com os decimais normalizados (taxa=4 e taxa=4.0 são o mesmo cálculo)
+    
+    Returns:
+        tuple: Pares (nome, valor) ordenados
+    """
+    pares = []
+    for nome, valor in request.args.items(multi=True):
+        if nome in HTTP_CONFIG['parametros_ignorados']:
+            continue
+        valor = valor.strip()
+        if nome in HTTP_CONFIG['parametros_decimais']:
+            try:
+                valor = repr(float(valor))
+            except ValueError:
+                pass
+        pares.append((nome, valor))
+    return tuple(sorted(pares))
+
+
+def calcular_etag_requisicao():
+    """ETag forte: rota + parâmetros canônicos + VERSAO_MODELO"""
+    chave = json.dumps([VERSAO_MODELO, request.path, parametros_canonicos()], ensure_ascii=False)
+    return hashlib.sha256(chave.encode('utf-8')).hexdigest()[:32]
+
+
+def dispensar_etag():
+    """Respostas de fallback não são cacheáveis: a rota chama antes de devolvê-las"""
+    g.etag_requisicao = None
+
+
+def _negociar_codificacao():
+    """Codificação aceita pelo cliente ('gzip', 'deflate' ou None)"""
+    aceitas = request.accept_encodings
+    for codificacao in ('gzip', 'deflate'):
+        if aceitas[codificacao] > 0:
+            return codificacao
+    return None
+
+
+def comprimir_resposta(response, etag=None):
+    """
+    Comprime JSON/PDF acima de HTTP_CONFIG['compressao_min_bytes'] e aplica o ETag
+    
+    Respostas em streaming, já codificadas ou de erro passam intactas. A
+    representação comprimida recebe um ETag próprio (sufixo -gzip/-deflate).
+    """
+    comprimivel = (
+        response.status_code == 200
+        and not response.is_streamed
+        and not response.direct_passthrough
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in HTTP_CONFIG['tipos_comprimidos']
+    )
+    
+    codificacao = None
+    if comprimivel:
+        response.vary.add('Accept-Encoding')
+        codificacao = _negociar_codificacao()
+        if codificacao and response.content_length and response.content_length >= HTTP_CONFIG['compressao_min_bytes']:
+            dados = response.get_data()
+            if codificacao == 'gzip':
+                dados = gzip.compress(dados, compresslevel=HTTP_CONFIG['compressao_nivel'])
+            else:
+                dados = zlib.compress(dados, HTTP_CONFIG['compressao_nivel'])
+            response.set_data(dados)
+            response.headers['Content-Encoding'] = codificacao
+        else:
+            codificacao = None
+    
+    if etag:
+        response.set_etag(etag + (f'-{codificacao}' if codificacao else ''))
+    
+    return response
+
+
 @app.before_request
 def log_request():
-    """Log das requisições (desenvolvimento)"""
-    if app.debug:
-        timestamp = get_current_datetime_sao_paulo().strftime('%H:%M:%S')
-        print(f"[{timestamp}] {request.method} {request.path}")
+    """Liga o diagnóstico da requisição (?debug=1 / X-Cimo-Debug) e registra a chamada"""
+    _diagnostico_requisicao.set(
+        request.args.get('debug') == '1' or request.headers.get('X-Cimo-Debug') == '1'
+    )
+    logger.debug(f"{request.method} {request.path}")
+
+@app.teardown_request
+def encerrar_diagnostico(exc=None):
+    """Desliga o diagnóstico ao fim da requisição (threads são reutilizadas)"""
+    _diagnostico_requisicao.set(False)
+
+@app.before_request
+def responder_get_condicional():
+    """Calcula o ETag da requisição e responde 304 sem recalcular se o cliente já tem o resultado"""
+    g.etag_requisicao = None
+    if request.method != 'GET' or request.endpoint not in ENDPOINTS_CONDICIONAIS:
+        return None
+    
+    etag = calcular_etag_requisicao()
+    g.etag_requisicao = etag
+    
+    # Com diagnóstico ligado o cálculo sempre roda (os traces são o objetivo)
+    if _diagnostico_requisicao.get():
+        return None
+    
+    for variante in (etag, etag + '-gzip', etag + '-deflate'):
+        if request.if_none_match.contains(variante):
+            response = app.response_class(status=304)
+            response.set_etag(variante)
+            response.headers['Cache-Control'] = 'no-cache'
+            response.vary.add('Accept-Encoding')
+            g.etag_requisicao = None
+            return response
+    
+    return None
 
 @app.after_request
 def after_request(response):
-    """Headers de segurança e CORS"""
+    """Headers de segurança e CORS, ETag e compressão"""
     response.headers.add('X-Content-Type-Options', 'nosniff')
     response.headers.add('X-Frame-Options', 'DENY')
     response.headers.add('X-XSS-Protection', '1; mode=block')
     response.headers.add('X-Version', '4.1-CORRIGIDA-COM-LOGO')
-    return response
+    
+    etag = g.get('etag_requisicao')
+    if etag and response.status_code == 200:
+        response.headers['Cache-Control'] = 'no-cache'
+    else:
+        etag = None
+    
+    return comprimir_resposta(response, etag)
+
+# ================ ORÇAMENTO DE BOOT ================
+def medir_boot():
+    """
+    Mede o custo de subir um worker e compara com BOOT_CONFIG['orcamento_ms']
+    
+    Tempo desde o início da importação do app, pico de memória residente e
+    quais módulos pesados já estão carregados. Acima do orçamento vira
+    WARNING no log.
+    
+    Returns:
+        dict: Estatísticas do boot (também em /api/teste)
+    """
+    if BOOT_CONFIG['precarregar_relatorios']:
+        carregar_reportlab()
+    
+    tempo_ms = (time.perf_counter() - _INICIO_BOOT) * 1000
+    try:
+        import resource
+        memoria_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Linux: KB
+    except ImportError:
+        memoria_mb = None
+    
+    estatisticas = {
+        'tempo_ms': tempo_ms,
+        'orcamento_ms': BOOT_CONFIG['orcamento_ms'],
+        'dentro_orcamento': tempo_ms <= BOOT_CONFIG['orcamento_ms'],
+        'memoria_pico_mb': memoria_mb,
+        'modulos_carregados': len(sys.modules),
+        'reportlab_carregado': 'reportlab' in sys.modules,
+        'matplotlib_carregado': 'matplotlib' in sys.modules
+    }
+    
+    mensagem = (f"🚀 Boot em {tempo_ms:.0f} ms (orçamento {BOOT_CONFIG['orcamento_ms']:.0f} ms), "
+                f"{len(sys.modules)} módulos" + (f", pico {memoria_mb:.0f} MB" if memoria_mb else ''))
+    if estatisticas['dentro_orcamento']:
+        logger.info(mensagem)
+    else:
+        logger.warning(f"⚠️ {mensagem} - acima do orçamento")
+    
+    return estatisticas
+
+
+ESTATISTICAS_BOOT = medir_boot()
+
+# ================ COMANDOS DE LINHA (flask --app app ...) ================
+@app.cli.command('clientes-importar')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+def comando_importar_clientes(arquivo):
+    """Importa cadastros de clientes de um arquivo JSON para o registro"""
+    cadastros = _registro_clientes.importar(arquivo)
+    click.echo(f"{len(cadastros)} clientes importados em {_registro_clientes.caminho}")
+
+
+@app.cli.command('avaliar-clientes')
+@click.option('--workers', type=int, default=None, help='Processos (padrão: CIMO_LOTE_WORKERS ou nº de CPUs)')
+def comando_avaliar_clientes(workers):
+    """Lote noturno: reavalia todos os clientes e grava os resultados"""
+    lote = executar_lote_clientes(workers=workers)
+    click.echo(f"Lote {lote['id']}: {lote['clientes']} clientes, {lote['erros']} erros, "
+               f"{lote['segundos']:.2f} s, {lote['clientes_por_segundo']:.1f} clientes/s ({lote['workers']} processos)")
+
+
+@app.cli.command('cache-limpar')
+def comando_limpar_cache():
+    """Esvazia o L2 compartilhado (e os caches deste processo)"""
+    limpar_caches()
+    if _cache_compartilhado is None:
+        click.echo("L2 compartilhado desativado (defina CIMO_CACHE_COMPARTILHADO para ativar); nada a esvaziar")
+    else:
+        click.echo(f"L2 compartilhado esvaziado: {_cache_compartilhado.caminho}")
+
 
 # ================ INICIALIZAÇÃO ================
 if __name__ == '__main__':
+    # Servidor de desenvolvimento: traces completos, salvo se CIMO_LOG_LEVEL definir outro nível
+    if 'CIMO_LOG_LEVEL' not in os.environ:
+        logger.setLevel(logging.DEBUG)
+    
     print("=" * 80)
     print("🚀 Cimo Family Office - v4.1 CORRIGIDA COM LOGO")
     print("=" * 80)
@@ -2878,7 +6987,7 @@ if __name__ == '__main__':
         print("✅ index.html encontrado com sucesso!")
     
     # Verificar se logo.png existe
-    if not os.path.exists('templates/logo.png'):
+    if not os.path.exists(LOGO_CAMINHO):
         print("⚠️  AVISO: logo.png não encontrado na pasta templates/!")
         print("   Será usado fallback automático.")
     else:
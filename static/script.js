@@ -129,7 +129,10 @@ function toggleDebug() {
         dados: '/api/dados',
         teste: '/api/teste',
         teste_correcoes: '/api/teste-correcoes',
-        projecoes_detalhadas: '/api/projecoes-detalhadas'  // NOVO
+        projecoes_detalhadas: '/api/projecoes-detalhadas',  // NOVO
+        monte_carlo: '/api/monte-carlo',
+        monte_carlo_stream: '/api/monte-carlo/stream',  // SSE: bandas refinadas a cada lote
+        sensibilidade: '/api/sensibilidade'
     },
     
     // ✅ PARÂMETROS ATUALIZADOS COM FAZENDA
@@ -165,8 +168,11 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
             taxaMin: 2.5,
             taxaMax: 7.0,
             volatilidade: 15,
-            numSimulacoes: 500
+            numSimulacoes: 10000
         },
+        monteCarlo: null,
+        monteCarloStream: null,
+        sensibilidadeGrid: null,
         reportHistory: []
     };
 
@@ -385,6 +391,125 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
         }
     },
 
+    monteCarloParams() {
+        return new URLSearchParams({
+            expectativa: document.getElementById('expectativaVida').value,
+            despesas: document.getElementById('despesasMensais').value,
+            perfil: document.getElementById('perfilInvestimento').value,
+            inicio_renda_filhos: document.getElementById('inicioRendaFilhos').value,
+            custo_fazenda: document.getElementById('valorFazendaAtual').value,
+            periodo_compra_fazenda: document.getElementById('periodoCompraFazenda').value,
+            caminhos: AppState.simulationParams.numSimulacoes
+        });
+    },
+
+    // ✅ NOVO: Monte Carlo calculado no servidor (perfil define retorno e volatilidade)
+    async fetchMonteCarlo() {
+        const params = this.monteCarloParams();
+
+        const url = `${CONFIG.ENDPOINTS.monte_carlo}?${params}`;
+        debugMessage(`URL Monte Carlo: ${url}`);
+
+        const response = await fetch(url);
+
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+
+        const data = await response.json();
+
+        if (!data.success) {
+            throw new Error(data.erro || 'Erro na simulação Monte Carlo');
+        }
+
+        debugMessage(`Monte Carlo recebido: ${data.caminhos} caminhos em ${data.tempo_ms.toFixed(0)} ms`);
+        return data;
+    },
+
+    // ✅ NOVO: Monte Carlo progressivo (SSE); onProgress recebe o resumo acumulado de cada lote.
+    // Resolve com o resultado final, ou null se a simulação for cancelada.
+    streamMonteCarlo(onProgress) {
+        this.cancelMonteCarloStream();
+
+        const url = `${CONFIG.ENDPOINTS.monte_carlo_stream}?${this.monteCarloParams()}`;
+        debugMessage(`URL Monte Carlo (stream): ${url}`);
+
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(url);
+            AppState.monteCarloStream = source;
+
+            const encerrar = () => {
+                source.close();
+                if (AppState.monteCarloStream === source) {
+                    AppState.monteCarloStream = null;
+                }
+            };
+
+            source.cancelar = () => {
+                encerrar();
+                resolve(null);
+            };
+
+            source.addEventListener('progresso', event => {
+                const data = JSON.parse(event.data);
+                debugMessage(`Monte Carlo parcial: ${data.progresso.caminhos_simulados}/${data.progresso.caminhos} caminhos`);
+                onProgress(data);
+            });
+
+            source.addEventListener('resultado', event => {
+                encerrar();
+                const data = JSON.parse(event.data);
+                debugMessage(`Monte Carlo recebido: ${data.caminhos} caminhos em ${data.tempo_ms.toFixed(0)} ms`);
+                resolve(data);
+            });
+
+            source.addEventListener('erro', event => {
+                encerrar();
+                reject(new Error(JSON.parse(event.data).erro || 'Erro na simulação Monte Carlo'));
+            });
+
+            // Resposta de erro (não-SSE) ou conexão perdida: não deixar o navegador reconectar
+            source.onerror = () => {
+                if (AppState.monteCarloStream !== source) return;
+                encerrar();
+                reject(new Error('Conexão com o Monte Carlo interrompida'));
+            };
+        });
+    },
+
+    cancelMonteCarloStream() {
+        if (AppState.monteCarloStream) {
+            debugMessage('Monte Carlo cancelado (mantida a última estimativa)');
+            AppState.monteCarloStream.cancelar();
+        }
+    },
+
+    // ✅ NOVO: Superfície de sensibilidade taxa × despesas calculada no servidor
+    async fetchSensitivityGrid() {
+        const params = new URLSearchParams({
+            taxa: document.getElementById('taxaRetorno').value,
+            expectativa: document.getElementById('expectativaVida').value,
+            despesas: document.getElementById('despesasMensais').value,
+            inicio_renda_filhos: document.getElementById('inicioRendaFilhos').value,
+            custo_fazenda: document.getElementById('valorFazendaAtual').value
+        });
+
+        const response = await fetch(`${CONFIG.ENDPOINTS.sensibilidade}?${params}`);
+
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+
+        const data = await response.json();
+
+        if (!data.success) {
+            throw new Error(data.erro || 'Erro na análise de sensibilidade');
+        }
+
+        debugMessage(`Sensibilidade recebida: grade ${data.eixos.taxa.length}×${data.eixos.despesas.length}`);
+        return data;
+    },
+
     // Manter métodos existentes...
     async checkBackendHealth() {
         try {
@@ -991,6 +1116,10 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
         },
 
         createSimulationCharts() {
+            if (!AppState.monteCarlo) {
+                SimulationManager.runSimulation();
+                return;
+            }
             this.createMonteCarloChart();
             this.createDistribuicaoChart();
         },
@@ -1001,12 +1130,25 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
             this.createStressTestChart();
         },
 
-        createSensitivityCharts() {
+        async createSensitivityCharts() {
+            try {
+                AppState.sensibilidadeGrid = await ApiClient.fetchSensitivityGrid();
+            } catch (error) {
+                debugMessage(`Erro ao buscar sensibilidade: ${error.message}`, 'error');
+                return;
+            }
+            
             this.createReturnSensitivityChart();
             this.createExpenseSensitivityChart();
             this.createBidimensionalChart();
         },
 
+        statusColor(status) {
+            if (status === 'viável') return this.colors.accent;
+            if (status === 'atenção') return this.colors.orange;
+            return '#dc2626';
+        },
+
         // Implementações dos gráficos adicionais mantidas
         createCurrentAllocationChart() {
             const ctx = document.getElementById('currentAllocationChart');
@@ -1215,48 +1357,76 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
 
         createMonteCarloChart() {
             const ctx = document.getElementById('monteCarloChart');
-            if (!ctx) return;
+            const mc = AppState.monteCarlo;
+            if (!ctx || !mc) return;
 
-            debugMessage('Criando gráfico Monte Carlo');
+            debugMessage('Criando gráfico Monte Carlo (bandas do servidor)');
 
-            const { taxaMin, taxaMax, volatilidade, numSimulacoes } = AppState.simulationParams;
-            const datasets = [];
-            
-            for (let i = 0; i < 20; i++) {
-                const data = [];
-                let value = 65;
-                
-                for (let year = 0; year < 20; year++) {
-                    const baseReturn = taxaMin + Math.random() * (taxaMax - taxaMin);
-                    const volatilityFactor = (Math.random() - 0.5) * (volatilidade / 100);
-                    const totalReturn = (baseReturn + volatilityFactor * 100) / 100;
-                    
-                    value = value * (1 + totalReturn) - 1.8;
-                    data.push(Math.max(value, 0));
-                }
-                
-                datasets.push({
-                    data: data,
-                    borderColor: this.colors.gray + '30',
-                    backgroundColor: 'transparent',
-                    borderWidth: 1,
-                    pointRadius: 0,
-                    tension: 0.2
-                });
-            }
+            const emMilhoes = valores => valores.map(v => v / 1000000);
+            const bandas = mc.bandas;
 
             AppState.charts.monteCarlo = new Chart(ctx, {
                 type: 'line',
                 data: {
-                    labels: Array.from({length: 20}, (_, i) => 2025 + i),
-                    datasets: datasets
+                    labels: bandas.anos,
+                    datasets: [
+                        {
+                            label: 'P90',
+                            data: emMilhoes(bandas.p90),
+                            borderColor: this.colors.gray + '60',
+                            backgroundColor: 'transparent',
+                            borderWidth: 1,
+                            pointRadius: 0
+                        },
+                        {
+                            label: 'P10',
+                            data: emMilhoes(bandas.p10),
+                            borderColor: this.colors.gray + '60',
+                            backgroundColor: this.colors.primary + '15',
+                            borderWidth: 1,
+                            pointRadius: 0,
+                            fill: '-1'
+                        },
+                        {
+                            label: 'P75',
+                            data: emMilhoes(bandas.p75),
+                            borderColor: this.colors.primary + '60',
+                            backgroundColor: 'transparent',
+                            borderWidth: 1,
+                            pointRadius: 0
+                        },
+                        {
+                            label: 'P25',
+                            data: emMilhoes(bandas.p25),
+                            borderColor: this.colors.primary + '60',
+                            backgroundColor: this.colors.primary + '30',
+                            borderWidth: 1,
+                            pointRadius: 0,
+                            fill: '-1'
+                        },
+                        {
+                            label: 'Mediana (P50)',
+                            data: emMilhoes(bandas.p50),
+                            borderColor: this.colors.primary,
+                            backgroundColor: 'transparent',
+                            borderWidth: 3,
+                            pointRadius: 0,
+                            tension: 0.2
+                        }
+                    ]
                 },
                 options: {
                     responsive: true,
                     maintainAspectRatio: false,
                     plugins: {
                         legend: { display: false },
-                        tooltip: { enabled: false }
+                        tooltip: {
+                            callbacks: {
+                                label: function(context) {
+                                    return `${context.dataset.label}: R$ ${context.parsed.y.toFixed(1)}M`;
+                                }
+                            }
+                        }
                     },
                     scales: {
                         y: {
@@ -1278,41 +1448,14 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
 
         createDistribuicaoChart() {
             const ctx = document.getElementById('distribuicaoChart');
-            if (!ctx) return;
+            const mc = AppState.monteCarlo;
+            if (!ctx || !mc) return;
 
             debugMessage('Criando gráfico de distribuição');
 
-            const finalValues = [];
-            const { taxaMin, taxaMax, volatilidade } = AppState.simulationParams;
-            
-            for (let i = 0; i < 1000; i++) {
-                const avgReturn = (taxaMin + taxaMax) / 2;
-                const randomFactor = (Math.random() - 0.5) * (volatilidade / 50);
-                const finalReturn = avgReturn + randomFactor;
-                
-                let finalValue = 65 * Math.pow(1 + finalReturn/100, 20) - (20 * 1.8);
-                finalValues.push(finalValue);
-            }
-
-            const bins = 15;
-            const minVal = Math.min(...finalValues);
-            const maxVal = Math.max(...finalValues);
-            const binSize = (maxVal - minVal) / bins;
-            
-            const histogram = new Array(bins).fill(0);
-            const labels = [];
-            
-            for (let i = 0; i < bins; i++) {
-                const binStart = minVal + i * binSize;
-                const binEnd = minVal + (i + 1) * binSize;
-                labels.push(`${binStart.toFixed(1)}M`);
-                
-                finalValues.forEach(val => {
-                    if (val >= binStart && val < binEnd) {
-                        histogram[i]++;
-                    }
-                });
-            }
+            const { limites, contagens } = mc.patrimonio_final.histograma;
+            const histogram = contagens;
+            const labels = limites.slice(0, -1).map(v => `${(v / 1000000).toFixed(1)}M`);
 
             AppState.charts.distribuicao = new Chart(ctx, {
                 type: 'bar',
@@ -1468,21 +1611,22 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
 
         createReturnSensitivityChart() {
             const ctx = document.getElementById('returnSensitivityChart');
-            if (!ctx || !AppState.currentData) return;
+            const grid = AppState.sensibilidadeGrid;
+            if (!ctx || !grid) return;
             
-            const { sensibilidade } = AppState.currentData;
-            if (!sensibilidade) return;
+            const sensibilidade = grid.por_taxa;
 
             AppState.charts.returnSensitivity = new Chart(ctx, {
                 type: 'line',
                 data: {
-                    labels: sensibilidade.map(item => `${item.taxa}%`),
+                    labels: sensibilidade.map(item => `${item.taxa.toFixed(1)}%`),
                     datasets: [{
                         label: 'Valor Fazenda (R$ milhões)',
                         data: sensibilidade.map(item => item.fazenda / 1000000),
                         borderColor: this.colors.primary,
                         backgroundColor: this.colors.primary + '20',
                         borderWidth: 3,
+                        pointRadius: 0,
                         fill: true
                     }]
                 },
@@ -1504,22 +1648,19 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
 
         createExpenseSensitivityChart() {
             const ctx = document.getElementById('expenseSensitivityChart');
-            if (!ctx) return;
+            const grid = AppState.sensibilidadeGrid;
+            if (!ctx || !grid) return;
+            
+            const sensibilidade = grid.por_despesas;
 
             AppState.charts.expenseSensitivity = new Chart(ctx, {
                 type: 'bar',
                 data: {
-                    labels: ['R$ 120k', 'R$ 135k', 'R$ 150k', 'R$ 165k', 'R$ 180k'],
+                    labels: sensibilidade.map(item => `R$ ${(item.despesas / 1000).toFixed(0)}k`),
                     datasets: [{
                         label: 'Valor Fazenda (R$ milhões)',
-                        data: [11.8, 8.5, 5.2, 1.9, -1.4],
-                        backgroundColor: [
-                            this.colors.accent,
-                            this.colors.secondary,
-                            this.colors.primary,
-                            this.colors.orange,
-                            '#dc2626'
-                        ]
+                        data: sensibilidade.map(item => item.fazenda / 1000000),
+                        backgroundColor: sensibilidade.map(item => this.statusColor(item.status))
                     }]
                 },
                 options: {
@@ -1540,28 +1681,44 @@ const PATRIMONIO = 65_000_000;  // R$ 65 milhões
 
         createBidimensionalChart() {
             const ctx = document.getElementById('bidimensionalChart');
-            if (!ctx) return;
+            const grid = AppState.sensibilidadeGrid;
+            if (!ctx || !grid) return;
+            
+            // Uma bolinha por célula da grade, colorida pelo status do plano
+            const pontos = [];
+            const cores = [];
+            grid.eixos.taxa.forEach((taxa, i) => {
+                grid.eixos.despesas.forEach((despesas, j) => {
+                    pontos.push({ x: taxa, y: despesas / 1000, fazenda: grid.superficie.fazenda_disponivel[i][j] });
+                    cores.push(this.statusColor(grid.superficie.status[i][j]));
+                });
+            });
 
             AppState.charts.bidimensional = new Chart(ctx, {
                 type: 'scatter',
                 data: {
                     datasets: [{
                         label: 'Taxa vs Despesas',
-                        data: [
-                            {x: 3.0, y: 120},
-                            {x: 3.5, y: 135},
-                            {x: 4.0, y: 150},
-                            {x: 4.5, y: 165},
-                            {x: 5.0, y: 180}
-                        ],
-                        backgroundColor: this.colors.primary,
-                        borderColor: this.colors.primary,
-                        pointRadius: 8
+                        data: pontos,
+                        backgroundColor: cores,
+                        borderColor: cores,
+                        pointRadius: 3
                     }]
                 },
                 options: {
                     responsive: true,
                     maintainAspectRatio: false,
+                    plugins: {
+                        legend: { display: false },
+                        tooltip: {
+                            callbacks: {
+                                label: function(context) {
+                                    const ponto = context.raw;
+                                    return `${ponto.x.toFixed(1)}% / R$ ${ponto.y.toFixed(0)}k: R$ ${(ponto.fazenda / 1000000).toFixed(1)}M`;
+                                }
+                            }
+                        }
+                    },
                     scales: {
                         x: {
                             title: {
@@ -2280,63 +2437,63 @@ const FazendaManager = {
             this.runSimulation();
         },
 
-        runSimulation() {
-            debugMessage('Executando nova simulação Monte Carlo');
-            
-            const { taxaMin, taxaMax, volatilidade, numSimulacoes } = AppState.simulationParams;
+        async runSimulation() {
+            debugMessage('Executando nova simulação Monte Carlo (servidor)');
             
-            const results = this.generateSimulationResults();
+            try {
+                // Com SSE os gráficos são refinados a cada lote de trajetórias
+                const data = window.EventSource
+                    ? await ApiClient.streamMonteCarlo(parcial => this.applySimulationData(parcial))
+                    : await ApiClient.fetchMonteCarlo();
+                
+                if (!data) return;  // Cancelada: fica a última estimativa parcial
+                
+                this.applySimulationData(data);
+                
+                Utils.showNotification('Simulação atualizada com sucesso!', 'success');
+            } catch (error) {
+                debugMessage(`Erro na simulação Monte Carlo: ${error.message}`, 'error');
+                Utils.showNotification('Erro ao executar simulação', 'error');
+            }
+        },
+
+        cancelSimulation() {
+            ApiClient.cancelMonteCarloStream();
+        },
+
+        applySimulationData(data) {
+            AppState.monteCarlo = data;
             
-            this.updateSimulationResults(results);
+            this.updateSimulationResults(this.generateSimulationResults(data));
             
             if (AppState.currentPage === 'simulations' && AppState.chartJsLoaded) {
-                setTimeout(() => {
-                    ChartManager.createSimulationCharts();
-                }, 100);
+                ['monteCarlo', 'distribuicao'].forEach(chartKey => {
+                    if (AppState.charts[chartKey]) {
+                        AppState.charts[chartKey].destroy();
+                        delete AppState.charts[chartKey];
+                    }
+                });
+                ChartManager.hideChartPlaceholders(['monteCarloContainer', 'distribuicaoContainer']);
+                ChartManager.createSimulationCharts();
             }
-            
-            Utils.showNotification('Simulação atualizada com sucesso!', 'success');
         },
 
-        generateSimulationResults() {
-            const { taxaMin, taxaMax, volatilidade, numSimulacoes } = AppState.simulationParams;
-            const finalValues = [];
-            
-            for (let i = 0; i < numSimulacoes; i++) {
-                let patrimonio = 65000000;
-                
-                for (let year = 0; year < 20; year++) {
-                    const baseReturn = (taxaMin + Math.random() * (taxaMax - taxaMin)) / 100;
-                    const volatilityFactor = (Math.random() - 0.5) * 2 * (volatilidade / 100);
-                    const yearReturn = baseReturn + volatilityFactor;
-                    
-                    patrimonio = patrimonio * (1 + yearReturn) - 1800000;
-                    patrimonio = Math.max(patrimonio, 0);
-                }
-                
-                finalValues.push(patrimonio);
-            }
-            
-            finalValues.sort((a, b) => a - b);
-            
-            const getPercentile = (arr, p) => {
-                const index = Math.floor(arr.length * p / 100);
-                return arr[Math.min(index, arr.length - 1)];
-            };
+        generateSimulationResults(data) {
+            const finais = data.patrimonio_final;
             
             const results = {
-                p5: getPercentile(finalValues, 5),
-                p10: getPercentile(finalValues, 10),
-                p25: getPercentile(finalValues, 25),
-                p50: getPercentile(finalValues, 50),
-                p75: getPercentile(finalValues, 75),
-                p90: getPercentile(finalValues, 90),
-                p95: getPercentile(finalValues, 95),
-                successRate: (finalValues.filter(v => v > 0).length / finalValues.length) * 100,
-                allValues: finalValues
+                p5: finais.p5,
+                p10: finais.p10,
+                p25: finais.p25,
+                p50: finais.p50,
+                p75: finais.p75,
+                p90: finais.p90,
+                p95: finais.p95,
+                successRate: data.probabilidade_sucesso,
+                successInterval: data.intervalo_confianca || null
             };
             
-            debugMessage(`Simulação completada: ${numSimulacoes} iterações, Taxa de sucesso: ${results.successRate.toFixed(1)}%`);
+            debugMessage(`Simulação completada: ${data.caminhos} caminhos, Taxa de sucesso: ${results.successRate.toFixed(1)}%`);
             
             return results;
         },
@@ -2346,6 +2503,11 @@ const FazendaManager = {
             document.getElementById('simResultP50').textContent = Utils.formatCurrency(results.p50, true);
             document.getElementById('simResultP90').textContent = Utils.formatCurrency(results.p90, true);
             document.getElementById('simSuccessRate').textContent = results.successRate.toFixed(0) + '%';
+            if (results.successInterval) {
+                const ic = results.successInterval;
+                document.getElementById('simSuccessRate').title =
+                    `IC 95%: ${ic.inferior.toFixed(1)}% – ${ic.superior.toFixed(1)}%`;
+            }
             
             document.getElementById('simP5').textContent = Utils.formatCurrency(results.p5, true);
             document.getElementById('simP10').textContent = Utils.formatCurrency(results.p10, true);